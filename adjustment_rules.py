@@ -0,0 +1,284 @@
+import datetime as dt
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from volunteer_schema import DIMENSIONS, dimension_table
+
+logger = logging.getLogger(__name__)
+
+# action -> parameters it requires
+RULE_ACTIONS = {
+    "reassign_branch": ("branchId",),   # credit the matched rows to another branch
+    "cap_hours": ("max",),              # creditedHours = min(creditedHours, max)
+    "scale_hours": ("factor",),         # creditedHours *= factor
+    "set_hours": ("hours",),            # creditedHours = hours
+    "exclude": (),                      # drop the matched rows from the figures
+}
+CONDITION_OPERATORS = ("eq", "ne", "in", "not_in", "contains", "gt", "gte", "lt", "lte")
+# Identifying columns copied into every audit row
+AUDIT_COLUMNS = ['assignmentId', 'volunteerDate', 'contactId']
+
+def load_rules(path: str) -> List[Dict]:
+    """Load adjustment rules from a JSON list, checking every rule before any is applied
+
+    Each rule has a "name", an "action" (see RULE_ACTIONS) with its
+    parameters, and a "where" mapping of column -> condition. A condition is
+    a value (equality), a list (membership) or an {operator: value} dict
+    with CONDITION_OPERATORS, all of which must hold. Rules apply in file
+    order, each seeing the result of the ones before it.
+    """
+    with open(path) as f:
+        rules = json.load(f)
+
+    if not isinstance(rules, list):
+        raise ValueError(f"{path} must contain a JSON list of adjustment rules")
+    for i, rule in enumerate(rules):
+        label = f"Rule #{i + 1} in {path}"
+        if not isinstance(rule, dict) or not rule.get("name"):
+            raise ValueError(f"{label} has no name")
+        if rule.get("action") not in RULE_ACTIONS:
+            raise ValueError(f"{label} ('{rule['name']}') has unknown action {rule.get('action')!r}, "
+                             f"expected one of {sorted(RULE_ACTIONS)}")
+        missing = [param for param in RULE_ACTIONS[rule["action"]] if param not in rule]
+        if missing:
+            raise ValueError(f"{label} ('{rule['name']}') is missing {', '.join(missing)}")
+        if not isinstance(rule.get("where", {}), dict):
+            raise ValueError(f"{label} ('{rule['name']}'): 'where' must map columns to conditions")
+        for col, condition in rule.get("where", {}).items():
+            unknown = set(condition) - set(CONDITION_OPERATORS) if isinstance(condition, dict) else set()
+            if unknown:
+                raise ValueError(f"{label} ('{rule['name']}'): unknown operators {sorted(unknown)} for '{col}'")
+
+    logger.info(f"Loaded {len(rules)} adjustment rules from {path}")
+    return rules
+
+def compile_conditions(where: Dict) -> List[Tuple[str, str, object]]:
+    """Normalize a rule's 'where' into (column, operator, value) terms"""
+    terms = []
+    for col, condition in where.items():
+        if isinstance(condition, dict):
+            terms.extend((col, op, value) for op, value in condition.items())
+        elif isinstance(condition, list):
+            terms.append((col, "in", condition))
+        else:
+            terms.append((col, "eq", condition))
+    return terms
+
+def _compare(values: pd.Series, op: str, value) -> np.ndarray:
+    """Vectorized condition over a column; missing values match no condition"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        value = [pd.Timestamp(v) for v in value] if isinstance(value, list) else pd.Timestamp(value)
+    if op == "eq":
+        mask = values == value
+    elif op == "ne":
+        mask = values != value
+    elif op == "in":
+        mask = values.isin(value)
+    elif op == "not_in":
+        mask = ~values.isin(value)
+    elif op == "contains":
+        mask = values.astype("string").str.contains(str(value), case=False, regex=False)
+    elif op == "gt":
+        mask = values > value
+    elif op == "gte":
+        mask = values >= value
+    elif op == "lt":
+        mask = values < value
+    else:
+        mask = values <= value
+    return mask.fillna(False).to_numpy(dtype=bool) & values.notna().to_numpy()
+
+def evaluate_condition(values: pd.Series, op: str, value) -> np.ndarray:
+    """Boolean mask of one condition; categoricals are tested once per category, not per row"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        category_mask = np.append(_compare(pd.Series(values.cat.categories), op, value), False)
+        return category_mask[values.cat.codes.to_numpy()]   # code -1 (missing) -> the trailing False
+    return _compare(values, op, value)
+
+class ConditionCache:
+    """Masks of the conditions evaluated so far, shared by every rule that repeats one
+
+    A column's masks are dropped as soon as a rule writes to that column,
+    so later rules always see the adjusted values.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.masks = {}
+        self.hits = 0
+
+    def mask(self, col: str, op: str, value) -> np.ndarray:
+        key = (col, op, json.dumps(value, sort_keys=True, default=str))
+        if key in self.masks:
+            self.hits += 1
+        else:
+            self.masks[key] = evaluate_condition(self.df[col], op, value)
+        return self.masks[key]
+
+    def invalidate(self, columns) -> None:
+        self.masks = {key: mask for key, mask in self.masks.items() if key[0] not in columns}
+
+def _audit_rows(df: pd.DataFrame, rows: np.ndarray, rule: Dict, field: str, old, new, row_offset: int) -> pd.DataFrame:
+    audit = pd.DataFrame({'rule': rule['name'], 'action': rule['action'], 'row': rows + row_offset})
+    for col in AUDIT_COLUMNS:
+        if col in df.columns:
+            audit[col] = df[col].to_numpy()[rows]
+    audit['field'] = field
+    audit['oldValue'] = pd.array(old, dtype=object)
+    audit['newValue'] = pd.array(new, dtype=object)
+    return audit
+
+def apply_rules(df: pd.DataFrame, rules: List[Dict], branches: Optional[pd.DataFrame] = None,
+                row_offset: int = 0) -> Tuple[pd.DataFrame, pd.DataFrame, List[Dict]]:
+    """Apply adjustment rules to a cleaned frame in one pass, rule by rule in order
+
+    Every condition is a vectorized mask (computed once per distinct
+    condition, see ConditionCache) and every action a masked array
+    assignment, so the cost grows with the number of distinct conditions
+    rather than rows x rules. `branches` (dimension_table(..., "branches"))
+    supplies the labels of reassigned rows; by default it is taken from df.
+
+    Returns the adjusted frame, an audit trail with one row per changed
+    value (row = position in df + row_offset) and per-rule totals.
+    """
+    df = df.copy()
+    if branches is None and 'branchId' in df.columns:
+        branches = dimension_table(df, "branches")
+    branch_labels = branches.set_index('branchId') if branches is not None else None
+    hours = df['creditedHours'].to_numpy(dtype=float, na_value=np.nan, copy=True) if 'creditedHours' in df.columns else None
+    cache = ConditionCache(df)
+    keep = np.ones(len(df), dtype=bool)
+    audits = []
+    results = []
+
+    for rule in rules:
+        terms = compile_conditions(rule.get("where", {}))
+        action = rule["action"]
+        target = 'branchId' if action == "reassign_branch" else 'creditedHours'
+        missing = sorted({col for col, _, _ in terms if col not in df.columns} | ({target} - set(df.columns)))
+        if missing:
+            logger.warning(f"Skipping adjustment rule '{rule['name']}': missing columns {missing}")
+            continue
+
+        mask = keep.copy()
+        for col, op, value in terms:
+            mask &= cache.mask(col, op, value)
+        rows = np.flatnonzero(mask)
+        hours_before = np.nansum(hours[rows]) if hours is not None else 0.0
+
+        if action == "exclude":
+            keep[rows] = False
+            changed, old, new, hours_after = rows, np.ones(len(rows), dtype=bool), np.zeros(len(rows), dtype=bool), 0.0
+            field = 'included'
+        elif action == "reassign_branch":
+            current = df['branchId'].iloc[rows]
+            changed = rows[current.ne(rule['branchId']).fillna(True).to_numpy(dtype=bool)]
+            old, new = df['branchId'].to_numpy(dtype=object)[changed], np.full(len(changed), rule['branchId'], dtype=object)
+            _reassign_branch(df, changed, rule, branch_labels)
+            cache.invalidate(['branchId'] + DIMENSIONS["branches"][1])
+            hours_after, field = hours_before, 'branchId'
+        else:
+            current = hours[rows]
+            if action == "cap_hours":
+                adjusted = np.minimum(current, float(rule['max']))
+            elif action == "scale_hours":
+                adjusted = current * float(rule['factor'])
+            else:
+                adjusted = np.full(len(rows), float(rule['hours']))
+            differs = ~np.isclose(adjusted, current, equal_nan=True)
+            changed, old, new = rows[differs], current[differs], adjusted[differs]
+            hours[changed] = new
+            df['creditedHours'] = hours
+            cache.invalidate(['creditedHours'])
+            hours_after, field = np.nansum(hours[rows]), 'creditedHours'
+
+        if len(changed):
+            audits.append(_audit_rows(df, changed, rule, field, old, new, row_offset))
+        results.append({'rule': rule['name'], 'action': action, 'matched': len(rows), 'changed': len(changed),
+                        'hoursDelta': float(hours_after - hours_before)})
+
+    audit = pd.concat(audits, ignore_index=True) if audits else pd.DataFrame(
+        columns=['rule', 'action', 'row'] + AUDIT_COLUMNS + ['field', 'oldValue', 'newValue'])
+    if cache.hits:
+        logger.debug(f"Adjustment rules reused {cache.hits} condition masks")
+    return df[keep], audit, results
+
+def _reassign_branch(df: pd.DataFrame, rows: np.ndarray, rule: Dict, branch_labels: Optional[pd.DataFrame]) -> None:
+    """Set branchId and the branch labels of `rows` to the rule's target branch"""
+    df.iloc[rows, df.columns.get_loc('branchId')] = rule['branchId']
+    known = branch_labels is not None and rule['branchId'] in branch_labels.index
+    for attr in DIMENSIONS["branches"][1]:
+        if attr not in df.columns:
+            continue
+        label = branch_labels.at[rule['branchId'], attr] if known else rule.get(attr)
+        if isinstance(df[attr].dtype, pd.CategoricalDtype) and pd.notna(label) and label not in df[attr].cat.categories:
+            df[attr] = df[attr].cat.add_categories([label])
+        df.iloc[rows, df.columns.get_loc(attr)] = label
+    if not known and rows.size and not rule.get('branchName'):
+        logger.warning(f"Adjustment rule '{rule['name']}': branch {rule['branchId']} is not in the data "
+                       f"and the rule gives no branchName")
+
+def log_adjustments(results: List[Dict]) -> None:
+    for result in results:
+        logger.info(f"  • {result['rule']}: {result['matched']} rows matched, {result['changed']} changed, "
+                    f"{result['hoursDelta']:+g} hours")
+
+def audit_file_path(output_dir: str = "processed_data") -> str:
+    Path(output_dir).mkdir(exist_ok=True)
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(output_dir, f"Adjustment_Audit_{timestamp}.csv")
+
+def save_audit(audit: pd.DataFrame, output_dir: str = "processed_data") -> str:
+    """Write the audit trail of adjusted values as CSV"""
+    audit_file = audit_file_path(output_dir)
+    audit.to_csv(audit_file, index=False)
+    logger.info(f"✅ Adjustment audit saved: {audit_file} ({len(audit)} changes)")
+    return audit_file
+
+class BatchAdjuster:
+    """apply_rules() over a stream of batches (chunked preparation)
+
+    Audit rows are appended to one CSV as they are produced (so ordered by
+    batch, then rule) and per-rule totals are summed; rows and totals match
+    a single apply_rules() call on the concatenated batches. `branches`
+    must hold the labels of every reassign_branch target.
+    """
+
+    def __init__(self, rules: List[Dict], branches: Optional[pd.DataFrame], output_dir: str = "processed_data"):
+        self.rules = rules
+        self.branches = branches
+        self.audit_file = audit_file_path(output_dir)
+        self.rows_seen = 0
+        self.audit_rows = 0
+        self.totals = {}
+        self._header_written = False
+
+    def apply(self, batch: pd.DataFrame) -> pd.DataFrame:
+        adjusted, audit, results = apply_rules(batch, self.rules, self.branches, row_offset=self.rows_seen)
+        self.rows_seen += len(batch)
+        audit.to_csv(self.audit_file, index=False, mode="a" if self._header_written else "w",
+                     header=not self._header_written)
+        self._header_written = True
+        self.audit_rows += len(audit)
+        for result in results:
+            total = self.totals.setdefault((result['rule'], result['action']), dict(result, matched=0, changed=0,
+                                                                                     hoursDelta=0.0))
+            for key in ('matched', 'changed', 'hoursDelta'):
+                total[key] += result[key]
+        return adjusted
+
+    @property
+    def results(self) -> List[Dict]:
+        """Per-rule totals over the batches so far"""
+        return list(self.totals.values())
+
+    def close(self) -> List[Dict]:
+        """Per-rule totals over every batch"""
+        logger.info(f"✅ Adjustment audit saved: {self.audit_file} ({self.audit_rows} changes)")
+        return self.results
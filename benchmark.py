@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""End-to-end throughput benchmark against the local mock VolunteerMatters server
+
+Times extraction, preparation, deduplication and reporting at several data
+sizes and records wall time and peak memory per stage:
+
+    python benchmark.py                                  # 1k / 100k / 1M rows
+    python benchmark.py --sizes 1000 100000 --output bench.json
+    python benchmark.py --sizes 100000 --compare bench.json   # exit 1 on regression
+"""
+import argparse
+import datetime as dt
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import volunteer_history_extractor as extractor
+from data_preparation import clean_volunteer_data, create_summary_report, deduplicate_all, load_volunteer_data, update_monthly_cube
+from mock_volunteermatters import start_mock_server
+from pipeline_metrics import METRICS, PeakRssSampler, current_rss_mb
+from volunteer_storage import ParquetBatchSink
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000]
+STAGES = ["extract", "prepare", "dedup", "report"]
+
+def run_stage(results: Dict, name: str, fn: Callable):
+    """Run one stage, recording its wall time and peak RSS"""
+    start_rss = current_rss_mb()
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+    results[name] = {
+        "seconds": round(elapsed, 4),
+        "peak_rss_mb": round(sampler.peak_mb, 1),
+        "rss_growth_mb": round(sampler.peak_mb - start_rss, 1) if start_rss is not None else None,
+    }
+    logger.info(f"  {name:<8} {elapsed:9.3f}s  peak RSS {sampler.peak_mb:8.1f} MB")
+    return value
+
+def extract_to_parquet(base_url: str, path: str, start_date: dt.date, end_date: dt.date, concurrency: int) -> int:
+    """Run the extractor's page loop against the mock server into a Parquet sink"""
+    extractor.BASE = base_url
+    params = {"startDate": start_date.isoformat(), "endDate": end_date.isoformat(), "page": 1,
+              "pageSize": extractor.PAGE_SIZE}
+    session = extractor.create_session(pool_size=concurrency)
+    try:
+        with ParquetBatchSink(path) as sink:
+            for items in extractor.iter_volunteer_pages(session, params, concurrency=concurrency):
+                sink.write_batch(items)
+    finally:
+        session.close()
+    return sink.rows_written
+
+def benchmark_size(records: int, concurrency: int, latency: float, error_rate: float, pagination: str) -> Dict:
+    """Benchmark every stage for one data size"""
+    start_date, end_date = dt.date(2025, 1, 1), dt.date(2025, 9, 1)
+    server, base_url = start_mock_server(records=records, start_date=start_date, end_date=end_date,
+                                         latency=latency, error_rate=error_rate, pagination=pagination)
+    stages = {}
+    METRICS.reset()
+    logger.info(f"{records:,} records:")
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            parquet_path = os.path.join(workdir, "VolunteerHistory_bench.parquet")
+            rows = run_stage(stages, "extract",
+                             lambda: extract_to_parquet(base_url, parquet_path, start_date, end_date, concurrency))
+            df = run_stage(stages, "prepare", lambda: clean_volunteer_data(load_volunteer_data(parquet_path)))
+            dedup_results = run_stage(stages, "dedup", lambda: deduplicate_all(df))
+            run_stage(stages, "report", lambda: create_summary_report(
+                df, workdir, dedup_results=dedup_results, cube=update_monthly_cube(df, workdir)))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    for stage in stages.values():
+        stage["rows_per_second"] = round(rows / stage["seconds"]) if stage["seconds"] else None
+    requests_summary = METRICS.request_summary()
+    logger.info(f"  requests {requests_summary['count']:,} (retries {requests_summary['retries']}), "
+                f"p50 {requests_summary['latency_ms']['p50'] or 0:.1f}ms, p99 {requests_summary['latency_ms']['p99'] or 0:.1f}ms")
+    return {"records": records, "rows_extracted": rows, "stages": stages, "requests": requests_summary}
+
+def compare_results(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+    """Stage timings that are slower than the baseline by more than `tolerance`"""
+    baseline_by_size = {entry["records"]: entry["stages"] for entry in baseline}
+    regressions = []
+    for entry in results:
+        for stage, metrics in entry["stages"].items():
+            reference = baseline_by_size.get(entry["records"], {}).get(stage)
+            if reference and metrics["seconds"] > reference["seconds"] * (1 + tolerance):
+                regressions.append(f"{entry['records']:,} rows / {stage}: {metrics['seconds']:.3f}s "
+                                   f"vs baseline {reference['seconds']:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the volunteer pipeline against the mock API")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="record counts to benchmark")
+    parser.add_argument("--concurrency", type=int, default=extractor.MAX_CONCURRENCY)
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server seconds per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock server fraction of 503s")
+    parser.add_argument("--pagination", default="total", help="mock pagination style")
+    parser.add_argument("--requests-per-second", type=float, default=0,
+                        help="extractor rate limit against the mock (default 0: off, so the pipeline is timed)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from a previous --output run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Pipeline modules log per page / per hours value; keep the benchmark output readable
+    logging.getLogger().setLevel(logging.WARNING)
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler(sys.stdout))
+    logger.propagate = False
+    extractor.configure_rate_limit(args.requests_per_second)
+
+    results = [benchmark_size(records, args.concurrency, args.latency, args.error_rate, args.pagination)
+               for records in args.sizes]
+
+    print(f"\n{'records':>10}  " + "  ".join(f"{stage:>18}" for stage in STAGES))
+    for entry in results:
+        cells = [f"{entry['stages'][stage]['seconds']:8.3f}s {entry['stages'][stage]['peak_rss_mb']:6.0f}MB"
+                 for stage in STAGES]
+        print(f"{entry['records']:>10,}  " + "  ".join(f"{cell:>18}" for cell in cells))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved results: {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
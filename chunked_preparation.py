@@ -0,0 +1,309 @@
+import datetime as dt
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from adjustment_rules import BatchAdjuster, load_rules, log_adjustments
+from data_preparation import (
+    ADJUSTMENTS_METADATA_KEY,
+    DEDUP_METHODS,
+    adjusted_data_path,
+    describe_activity,
+    find_hours_column,
+    first_occurrence_mask,
+    format_date_range,
+    log_cleaning_results,
+    log_hours_distribution,
+    resolve_dedup_keys,
+    write_summary_report,
+)
+from pipeline_metrics import METRICS
+from volunteer_cube import CUBE_FILE, build_cube, load_cube, merge_cube_cells, save_cube
+from volunteer_schema import DIMENSIONS, VOLUNTEER_HISTORY_SCHEMA, dimension_table, month_labels, to_arrow_table
+from volunteer_storage import PARQUET_BATCH_SIZE, export_excel, iter_parquet_batches, read_parquet
+
+logger = logging.getLogger(__name__)
+
+# Partition label for rows without a parseable volunteerDate
+UNDATED_PARTITION = "undated"
+
+class RunningSummary:
+    """The summary report figures, accumulated batch by batch
+
+    Mirrors summarize_volunteer_data() on the whole cleaned frame: counts,
+    hour totals and extremes, the date range, distinct activities and the
+    most common one (ties go to the activity seen first, as in memory),
+    labelled from the first row of each activity.
+    """
+
+    def __init__(self, hours_col):
+        self.hours_col = hours_col
+        self.rows = 0
+        self.has_dates = False
+        self.date_min = None
+        self.date_max = None
+        self.hours_sum = 0.0
+        self.hours_count = 0
+        self.hours_min = None
+        self.hours_max = None
+        self.has_assignments = False
+        self.activity_counts = {}   # insertion order = first appearance
+        self.first_rows = None      # first row's labels of every activity
+
+    def add(self, df):
+        self.rows += len(df)
+        if 'volunteerDate' in df.columns:
+            self.has_dates = True
+            self.date_min = _combine(min, self.date_min, df['volunteerDate'].min())
+            self.date_max = _combine(max, self.date_max, df['volunteerDate'].max())
+        if self.hours_col:
+            hours = df[self.hours_col]
+            self.hours_sum += hours.sum()
+            self.hours_count += int(hours.count())
+            self.hours_min = _combine(min, self.hours_min, hours.min())
+            self.hours_max = _combine(max, self.hours_max, hours.max())
+        if 'assignmentId' in df.columns:
+            self.has_assignments = True
+            for assignment_id, count in df['assignmentId'].value_counts(sort=False).items():
+                self.activity_counts[assignment_id] = self.activity_counts.get(assignment_id, 0) + count
+            labels = [col for col in ('needName', 'projectName', 'branchName') if col in df.columns]
+            firsts = df.drop_duplicates('assignmentId')[['assignmentId'] + labels]
+            if self.first_rows is not None:
+                firsts = pd.concat([self.first_rows, firsts[~firsts['assignmentId'].isin(self.first_rows['assignmentId'])]],
+                                   ignore_index=True)
+            self.first_rows = firsts
+
+    def summary(self):
+        """Same keys and values as summarize_volunteer_data() on the full frame"""
+        summary = {
+            'Total Records': self.rows,
+            'Date Range': format_date_range(self.date_min, self.date_max) if self.has_dates else "N/A"
+        }
+        if self.hours_col:
+            summary['Total Hours'] = self.hours_sum
+            summary['Average Hours per Record'] = round(self.hours_sum / self.hours_count, 2) if self.hours_count else float('nan')
+            summary['Min Hours'] = self.hours_min
+            summary['Max Hours'] = self.hours_max
+        if self.has_assignments:
+            summary['Unique Activities'] = len(self.activity_counts)
+            if self.rows > 0:
+                top = max(self.activity_counts, key=self.activity_counts.get)
+                summary['Most Common Activity'] = describe_activity(self.first_rows, top)
+            else:
+                summary['Most Common Activity'] = "N/A"
+        return summary
+
+def _combine(pick, current, value):
+    """min/max of a running value and a batch value, skipping missing ones"""
+    if pd.isna(value):
+        return current
+    return value if current is None else pick(current, value)
+
+def scan_branch_labels(extract_file, branch_ids, batch_size=PARQUET_BATCH_SIZE):
+    """Labels of `branch_ids` from the branch columns, streamed batch by batch
+
+    A reassigned row may point at a branch that first appears in a later
+    batch, so the labels are collected before pass 1: a dict keyed by
+    branchId, filled from each branch's first non-0-hour row (as
+    dimension_table() on the cleaned frame) and stopping once every id is
+    found. Returns a branches dimension table, or None without branchId.
+    """
+    id_col, attrs = DIMENSIONS["branches"]
+    names = pq.read_schema(extract_file).names
+    if id_col not in names:
+        return None
+    attrs = [attr for attr in attrs if attr in names]
+    columns = [id_col] + attrs + (['creditedHours'] if 'creditedHours' in names else [])
+    labels = {}
+    for batch in iter_parquet_batches(extract_file, batch_size=batch_size, columns=columns):
+        if 'creditedHours' in batch.columns:
+            batch = batch[batch['creditedHours'] != 0]
+        batch = batch[batch[id_col].isin(set(branch_ids) - set(labels))]
+        for row in batch.drop_duplicates(subset=id_col)[[id_col] + attrs].itertuples(index=False):
+            labels[row[0]] = row
+        if len(labels) == len(branch_ids):
+            break
+    return dimension_table(pd.DataFrame(list(labels.values()), columns=[id_col] + attrs), "branches")
+
+def clean_to_partitions(extract_file, raw_data_file, partition_dir, batch_size=PARQUET_BATCH_SIZE, adjuster=None):
+    """Pass 1: drop 0-hour rows batch by batch into the Raw Data file and month partitions
+
+    Every deduplication key includes volunteerDate, so rows in different
+    months can never be duplicates of each other; the month partitions let
+    pass 2 work on one month at a time. With an adjuster (BatchAdjuster) the
+    rules are applied after the Raw Data is written, so the partitions and
+    the running summary hold the adjusted rows, as in memory; the adjusted
+    rows are also written to the Adjusted Data file, with the per-rule
+    totals in its metadata.
+    """
+    logger.info("\n🧹 Step 2: Preparing the Data (chunked)...")
+    raw_writer = None
+    adjusted_writer = None
+    partition_writers = {}
+    initial_count = 0
+    cleaned_count = 0
+    hours_dist = None
+    running = None
+
+    try:
+        for batch in iter_parquet_batches(extract_file, batch_size=batch_size):
+            if running is None:
+                hours_col = find_hours_column(batch.columns)
+                if hours_col is None:
+                    logger.error("❌ No 'Hours' column found. Available columns:")
+                    logger.error(batch.columns.tolist())
+                else:
+                    logger.info(f"Using Hours column: '{hours_col}'")
+                running = RunningSummary(hours_col)
+
+            initial_count += len(batch)
+            if running.hours_col:
+                counts = batch[running.hours_col].value_counts()
+                hours_dist = counts if hours_dist is None else hours_dist.add(counts, fill_value=0).astype('int64')
+                batch = batch[batch[running.hours_col] != 0]
+            if batch.empty:
+                continue
+
+            table = to_arrow_table(batch)
+            if raw_writer is None:
+                raw_writer = pq.ParquetWriter(raw_data_file, VOLUNTEER_HISTORY_SCHEMA)
+            raw_writer.write_table(table)
+            cleaned_count += len(batch)
+
+            if adjuster is not None:
+                batch = adjuster.apply(batch)
+                if batch.empty:
+                    continue
+                table = to_arrow_table(batch)
+                if adjusted_writer is None:
+                    adjusted_writer = pq.ParquetWriter(adjusted_data_path(raw_data_file), VOLUNTEER_HISTORY_SCHEMA)
+                adjusted_writer.write_table(table)
+            running.add(batch)
+
+            months = month_labels(batch['volunteerDate']).fillna(UNDATED_PARTITION).to_numpy()
+            for month in pd.unique(months):
+                if month not in partition_writers:
+                    partition_writers[month] = pq.ParquetWriter(
+                        os.path.join(partition_dir, f"month={month}.parquet"), VOLUNTEER_HISTORY_SCHEMA)
+                partition_writers[month].write_table(table.filter(months == month))
+
+        if adjuster is not None:
+            if adjusted_writer is None:
+                adjusted_writer = pq.ParquetWriter(adjusted_data_path(raw_data_file), VOLUNTEER_HISTORY_SCHEMA)
+            adjusted_writer.add_key_value_metadata({ADJUSTMENTS_METADATA_KEY: json.dumps(adjuster.results)})
+    finally:
+        if raw_writer is not None:
+            raw_writer.close()
+        if adjusted_writer is not None:
+            adjusted_writer.close()
+        for writer in partition_writers.values():
+            writer.close()
+
+    logger.info(f"Initial rows: {initial_count}")
+    if hours_dist is not None:
+        log_hours_distribution(hours_dist)
+    if running is None:
+        running = RunningSummary(None)
+    elif raw_writer is None:
+        # every row was removed: still leave a valid, empty Raw Data file
+        pq.write_table(VOLUNTEER_HISTORY_SCHEMA.empty_table(), raw_data_file)
+    log_cleaning_results(initial_count, cleaned_count)
+    logger.info(f"✅ Saved Raw Data: {raw_data_file}")
+    if adjusted_writer is not None:
+        logger.info(f"✅ Saved Adjusted Data: {adjusted_data_path(raw_data_file)}")
+    return running, sorted(partition_writers)
+
+def dedup_and_cube_partitions(partition_dir, months, key_sets=None):
+    """Pass 2: per-month dedup counts and cube cells, one partition in memory at a time"""
+    strategies = dict(DEDUP_METHODS)
+    strategies.update(key_sets or {})
+
+    totals = {}
+    cells = []
+    for month in months:
+        df = read_parquet(os.path.join(partition_dir, f"month={month}.parquet"))
+        codes = {}
+        for name, keys in strategies.items():
+            if name in DEDUP_METHODS:
+                keys = resolve_dedup_keys(df, name)
+            if 'volunteerDate' not in keys or any(col not in df.columns for col in keys):
+                continue
+            count = int(first_occurrence_mask(df, keys, codes).sum())
+            total = totals.setdefault(name, {'keys': list(keys), 'count': 0, 'removed': 0})
+            total['count'] += count
+            total['removed'] += len(df) - count
+        cells.append(build_cube(df))
+
+    skipped = set(strategies) - set(totals)
+    for name in strategies:
+        if name in totals:
+            result = totals[name]
+            logger.info(f"  • {name}: {result['count']} records ({result['removed']} duplicates) by {result['keys']}")
+    if skipped:
+        logger.warning(f"  • Skipping {sorted(skipped)}: chunked counts need volunteerDate among the keys "
+                       f"and every key column present")
+
+    new_cells = pd.concat(cells, ignore_index=True) if cells else None
+    return totals, new_cells
+
+def prepare_chunked(extract_file, output_dir="processed_data", excel=False, batch_size=PARQUET_BATCH_SIZE,
+                    key_sets=None, rules_file=None):
+    """Out-of-core data preparation for extracts larger than memory
+
+    Produces the same Raw Data and Adjusted Data files, dedup counts, cube,
+    summary report and adjustment audit as the in-memory path, holding at most one batch
+    (pass 1) or one month of cleaned rows (pass 2) at a time. Returns the
+    Raw Data path.
+    """
+    Path(output_dir).mkdir(exist_ok=True)
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    raw_data_file = os.path.join(output_dir, f"Raw_Data_{timestamp}.parquet")
+
+    adjuster = None
+    if rules_file:
+        rules = load_rules(rules_file)
+        targets = {rule['branchId'] for rule in rules if rule['action'] == "reassign_branch"}
+        branches = scan_branch_labels(extract_file, targets, batch_size) if targets else None
+        adjuster = BatchAdjuster(rules, branches, output_dir)
+
+    with tempfile.TemporaryDirectory(prefix="volunteer_partitions_") as partition_dir:
+        with METRICS.stage("clean"):
+            running, months = clean_to_partitions(extract_file, raw_data_file, partition_dir, batch_size, adjuster)
+
+        adjustments = None
+        if adjuster is not None:
+            logger.info("\n🛠️ Adjustment rules:")
+            adjustments = adjuster.close()
+            log_adjustments(adjustments)
+
+        logger.info("\n🔄 Deduplication counts:")
+        with METRICS.stage("dedup_cube"):
+            dedup_results, new_cells = dedup_and_cube_partitions(partition_dir, months, key_sets)
+
+    with METRICS.stage("cube"):
+        logger.info("\n🧊 Updating monthly aggregate cube...")
+        cube_path = os.path.join(output_dir, CUBE_FILE)
+        cube = load_cube(cube_path)
+        if new_cells is not None:
+            cube = merge_cube_cells(cube, new_cells)
+            save_cube(cube, cube_path)
+            logger.info(f"✅ Cube covers {cube['month'].nunique()} months, {len(cube)} cells")
+
+    if excel:
+        with METRICS.stage("excel_export"):
+            excel_path = raw_data_file.replace('.parquet', '.xlsx')
+            export_excel(raw_data_file, excel_path)
+            logger.info(f"✅ Exported Raw Data to Excel: {excel_path}")
+
+    with METRICS.stage("summary"):
+        logger.info("\n📝 Creating Summary Report...")
+        report_months = [month for month in months if month != UNDATED_PARTITION] if running.has_dates else None
+        write_summary_report(running.summary(), output_dir, dedup_results=dedup_results,
+                             cube=cube, months=report_months, adjustments=adjustments)
+
+    return raw_data_file
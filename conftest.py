@@ -0,0 +1,45 @@
+"""Shared pytest fixtures: a small synthetic extract served by the mock VolunteerMatters API"""
+import datetime as dt
+
+import pytest
+
+import volunteer_history_extractor as extractor
+from mock_volunteermatters import start_mock_server
+from volunteer_storage import read_parquet
+
+# The extractor's default report window (REPORT_MONTH 2025-08), which the mock data covers
+MOCK_START_DATE = dt.date(2025, 1, 1)
+MOCK_END_DATE = dt.date(2025, 9, 1)
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory: the extractor and data preparation read and write the working directory"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Start a mock server (start_mock_server options) and point the extractor's BASE at it"""
+    servers = []
+
+    def start(**overrides):
+        server, base_url = start_mock_server(start_date=MOCK_START_DATE, end_date=MOCK_END_DATE, **overrides)
+        servers.append(server)
+        monkeypatch.setattr(extractor, "BASE", base_url)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def extract_file(mock_api, workdir):
+    """VolunteerHistory_*.parquet of 4000 mock records in the working directory"""
+    mock_api(records=4000)
+    return extractor.main(run_report=False)
+
+@pytest.fixture
+def volunteer_frame(extract_file):
+    """The extract as data preparation loads it (compact, typed)"""
+    return read_parquet(extract_file)
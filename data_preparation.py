@@ -1,17 +1,34 @@
+import numpy as np
 import pandas as pd
 import datetime as dt
+import json
 import os
 from pathlib import Path
 import logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from adjustment_rules import apply_rules, load_rules, log_adjustments, save_audit
+from pipeline_metrics import METRICS
+from volunteer_cube import CUBE_FILE, load_cube, rollup, save_cube, update_cube
+from volunteer_schema import apply_volunteer_dtypes, flatten_assignment_column, month_labels
+from volunteer_storage import PARQUET_BATCH_SIZE, iter_parquet_batches, read_file_metadata, read_parquet, write_parquet
+
 logger = logging.getLogger(__name__)
 
+# Parquet metadata key holding the per-rule totals of an Adjusted Data file
+ADJUSTMENTS_METADATA_KEY = "adjustments"
+
+def setup_logging(level=logging.INFO):
+    """Configure progress logging (called by the entry points, not on import)"""
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s')
+
 def load_volunteer_data(file_path):
-    """Load volunteer data from Excel file"""
+    """Load volunteer data from a typed Parquet extract (or a legacy Excel file)"""
     try:
-        df = pd.read_excel(file_path)
+        if str(file_path).endswith('.parquet'):
+            df = read_parquet(file_path)
+        else:
+            # Older Excel extracts carry the nested 'assignment' object as text and dates as strings
+            df = apply_volunteer_dtypes(flatten_assignment_column(pd.read_excel(file_path)), compact=True)
         logger.info(f"✅ Loaded {len(df)} rows from {file_path}")
         logger.info(f"Columns: {list(df.columns)}")
         return df
@@ -19,6 +36,42 @@ def load_volunteer_data(file_path):
         logger.error(f"❌ Error loading file: {e}")
         return None
 
+def iter_volunteer_batches(file_path, batch_size=PARQUET_BATCH_SIZE, columns=None):
+    """Read volunteer data lazily, one DataFrame batch at a time (Parquet only)"""
+    return iter_parquet_batches(file_path, batch_size=batch_size, columns=columns)
+
+def find_latest_extract(directory="."):
+    """Find the newest extraction output, preferring Parquet sinks over Excel files"""
+    for pattern in ("VolunteerHistory_*.parquet", "VolunteerHistory_*.xlsx"):
+        files = list(Path(directory).glob(pattern))
+        if files:
+            return max(files, key=os.path.getctime)
+    return None
+
+def find_latest_raw_data(output_dir="processed_data"):
+    """Find the newest Raw_Data_*.parquet written by save_raw_data"""
+    files = list(Path(output_dir).glob("Raw_Data_*.parquet"))
+    return max(files, key=os.path.getctime) if files else None
+
+def find_hours_column(columns):
+    """First column whose name mentions hours (case insensitive), or None"""
+    for col in columns:
+        if 'hour' in col.lower():
+            return col
+    return None
+
+def log_hours_distribution(hours_dist):
+    """Log the record count of every hours value (a value_counts() Series)"""
+    logger.info(f"\nHours distribution:")
+    for hours, count in hours_dist.sort_index().items():
+        logger.info(f"  {hours} hours: {count} records")
+
+def log_cleaning_results(initial_count, remaining_count):
+    logger.info(f"\n📊 Data Cleaning Results:")
+    logger.info(f"  • Removed {initial_count - remaining_count} rows with 0 hours")
+    logger.info(f"  • Remaining rows: {remaining_count}")
+    logger.info(f"  • Volunteers with 0 hours only registered but did not complete the activity")
+
 def clean_volunteer_data(df):
     """🧹 Step 2: Prepare the Data - Remove 0 hours and clean data"""
     logger.info("\n🧹 Step 2: Preparing the Data...")
@@ -28,11 +81,7 @@ def clean_volunteer_data(df):
     logger.info(f"Initial rows: {initial_count}")
     
     # Find the hours column (case insensitive)
-    hours_col = None
-    for col in df.columns:
-        if 'hour' in col.lower():
-            hours_col = col
-            break
+    hours_col = find_hours_column(df.columns)
     
     if hours_col is None:
         logger.error("❌ No 'Hours' column found. Available columns:")
@@ -42,98 +91,243 @@ def clean_volunteer_data(df):
     logger.info(f"Using Hours column: '{hours_col}'")
     
     # Show hours distribution
-    logger.info(f"\nHours distribution:")
-    hours_dist = df[hours_col].value_counts().sort_index()
-    for hours, count in hours_dist.items():
-        logger.info(f"  {hours} hours: {count} records")
+    log_hours_distribution(df[hours_col].value_counts())
     
     # Remove rows where Hours = 0
     df_cleaned = df[df[hours_col] != 0].copy()
-    removed_count = initial_count - len(df_cleaned)
-    
-    logger.info(f"\n📊 Data Cleaning Results:")
-    logger.info(f"  • Removed {removed_count} rows with 0 hours")
-    logger.info(f"  • Remaining rows: {len(df_cleaned)}")
-    logger.info(f"  • Volunteers with 0 hours only registered but did not complete the activity")
+    log_cleaning_results(initial_count, len(df_cleaned))
     
     return df_cleaned
 
-def save_raw_data(df, output_dir="processed_data"):
-    """Save cleaned data as 'Raw Data' file for multiple deduplication/pivot steps"""
+def save_raw_data(df, output_dir="processed_data", excel=False):
+    """Save cleaned data as 'Raw Data' file for multiple deduplication/pivot steps
+    
+    The Raw Data is written as typed Parquet; pass excel=True to also export
+    an Excel copy for the dashboard.
+    """
     # Create output directory
     Path(output_dir).mkdir(exist_ok=True)
     
     # Generate filename with timestamp
     timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"Raw_Data_{timestamp}.xlsx"
+    filename = f"Raw_Data_{timestamp}.parquet"
     filepath = os.path.join(output_dir, filename)
     
-    # Save to Excel
-    df.to_excel(filepath, index=False)
+    # Save to Parquet
+    write_parquet(df, filepath)
     logger.info(f"✅ Saved Raw Data: {filepath}")
     
+    if excel:
+        excel_path = filepath.replace('.parquet', '.xlsx')
+        export_frame = df.copy()
+        if 'volunteerDate' in export_frame.columns:
+            export_frame['volunteerDate'] = export_frame['volunteerDate'].dt.date
+        export_frame.to_excel(excel_path, index=False)
+        logger.info(f"✅ Exported Raw Data to Excel: {excel_path}")
+    
     return filepath
 
+def adjusted_data_path(raw_data_file):
+    """Adjusted Data file that goes with a Raw Data file (Raw_Data_<ts> -> Adjusted_Data_<ts>)"""
+    path = Path(raw_data_file)
+    return str(path.with_name(path.name.replace("Raw_Data_", "Adjusted_Data_", 1)))
+
+def readjusted_data_path(output_dir="processed_data"):
+    """File for rows re-adjusted at report time (report --rules), kept apart from the prepared Adjusted Data"""
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(output_dir, f"Readjusted_Data_{timestamp}.parquet")
+
+def save_adjusted_data(df, raw_data_file, adjustments, filepath=None):
+    """Save the rows after adjustment rules next to their Raw Data, with the per-rule totals in the file metadata"""
+    filepath = filepath or adjusted_data_path(raw_data_file)
+    write_parquet(df, filepath, metadata={ADJUSTMENTS_METADATA_KEY: json.dumps(adjustments)})
+    logger.info(f"✅ Saved Adjusted Data: {filepath}")
+    return filepath
+
+def load_adjustments(data_file):
+    """Per-rule totals saved with an Adjusted Data file (None for Raw Data)"""
+    value = read_file_metadata(str(data_file)).get(ADJUSTMENTS_METADATA_KEY)
+    return json.loads(value) if value else None
+
+def latest_report_data(output_dir="processed_data", rules_file=None):
+    """The data reports should read, and its per-rule totals: (path, adjustments), or (None, None)
+    
+    With rules_file the rules are applied to the latest Raw Data now (saving
+    a new audit and a Readjusted Data file; the prepared Adjusted Data is
+    left alone); otherwise the Adjusted Data saved with the latest Raw Data
+    is used when there is one, else the Raw Data.
+    """
+    raw_data_file = find_latest_raw_data(output_dir)
+    if raw_data_file is None:
+        return None, None
+    
+    if rules_file:
+        df, adjustments = apply_adjustment_rules(read_parquet(str(raw_data_file)), rules_file, output_dir)
+        return save_adjusted_data(df, raw_data_file, adjustments, readjusted_data_path(output_dir)), adjustments
+    
+    adjusted_file = adjusted_data_path(raw_data_file)
+    if os.path.exists(adjusted_file):
+        return adjusted_file, load_adjustments(adjusted_file)
+    return str(raw_data_file), None
+
+# Timestamped files a prepare run leaves in output_dir (see prune_outputs)
+RUN_OUTPUT_PATTERNS = (
+    "Raw_Data_*.parquet", "Raw_Data_*.xlsx", "Adjusted_Data_*.parquet", "Readjusted_Data_*.parquet",
+    "Adjustment_Audit_*.csv",
+    "Summary_Report_*.txt", "Run_Report_*.json",
+)
+
+def prune_outputs(output_dir="processed_data", keep=3):
+    """Delete all but the newest `keep` files of each RUN_OUTPUT_PATTERNS kind; returns the number removed"""
+    removed = 0
+    for pattern in RUN_OUTPUT_PATTERNS:
+        files = sorted(Path(output_dir).glob(pattern), key=os.path.getmtime)
+        for path in files[:max(0, len(files) - keep)]:
+            path.unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        logger.info(f"🧹 Removed {removed} old run outputs from {output_dir} (kept the newest {keep} of each)")
+    return removed
+
+# Key columns for each counting method
+DEDUP_METHODS = {
+    # same person, same activity, same date: each unique activity completion
+    "activity": ['volunteerDate', 'assignmentId'],
+    # same person, same date: each unique volunteer
+    "person": ['volunteerDate', 'contactId'],
+    # same date, same branch/location: counts by branch/location
+    "location": ['volunteerDate', 'branchId'],
+}
+
+def find_location_column(df):
+    """Find the branch/location column, preferring the flattened branchId"""
+    if 'branchId' in df.columns:
+        return 'branchId'
+    for col in df.columns:
+        if 'location' in col.lower() or 'branch' in col.lower():
+            return col
+    return None
+
+def resolve_dedup_keys(df, method):
+    """Key columns for a counting method, or None if the method is unknown"""
+    if method == "location":
+        location_col = find_location_column(df)
+        if location_col is None:
+            logger.warning("  • No location/branch column found, using activity method")
+            return DEDUP_METHODS["activity"]
+        return ['volunteerDate', location_col]
+    return DEDUP_METHODS.get(method)
+
+def first_occurrence_mask(df, keys, codes=None):
+    """Boolean mask of the first row for every distinct combination of the key columns
+    
+    Each key column is factorized to integer codes (reused from `codes` when
+    given) and the codes are packed into one int64 key, so the duplicate scan
+    is a single hash pass over integers instead of over Python objects.
+    """
+    codes = {} if codes is None else codes
+    combined = np.zeros(len(df), dtype=np.int64)
+    cardinality = 1
+    for col in keys:
+        if col not in codes:
+            col_codes, uniques = pd.factorize(df[col])
+            codes[col] = (col_codes.astype(np.int64) + 1, len(uniques) + 1)  # missing values -> 0
+        col_codes, col_cardinality = codes[col]
+        if cardinality * col_cardinality >= 2 ** 62:
+            # re-pack before the mixed-radix key could overflow int64
+            packed, uniques = pd.factorize(combined)
+            combined, cardinality = packed.astype(np.int64), len(uniques)
+        combined = combined * col_cardinality + col_codes
+        cardinality *= col_cardinality
+    return ~pd.Series(combined).duplicated(keep='first').to_numpy()
+
+def deduplicate_all(df, key_sets=None):
+    """Run every deduplication strategy in one pass over shared key columns
+    
+    Computes the built-in methods (activity, person, location) plus any
+    user-defined key sets, e.g. {"branch": ['volunteerDate', 'contactId', 'branchId']}.
+    Each key column is factorized only once and no copies of the frame are
+    made. Returns {name: {'keys', 'count', 'removed', 'mask'}} where `mask`
+    selects the rows kept by that strategy (df[mask]).
+    """
+    strategies = {method: resolve_dedup_keys(df, method) for method in DEDUP_METHODS}
+    strategies.update(key_sets or {})
+    
+    codes = {}
+    results = {}
+    for name, keys in strategies.items():
+        missing = [col for col in keys if col not in df.columns]
+        if missing:
+            logger.warning(f"  • Skipping '{name}': missing columns {missing}")
+            continue
+        mask = first_occurrence_mask(df, keys, codes)
+        count = int(mask.sum())
+        results[name] = {'keys': list(keys), 'count': count, 'removed': len(df) - count, 'mask': mask}
+        logger.info(f"  • {name}: {count} records ({len(df) - count} duplicates) by {keys}")
+    
+    return results
+
 def deduplicate_data(df, method="activity"):
     """Deduplicate data based on different methods"""
     logger.info(f"\n🔄 Deduplication by {method}...")
     
-    initial_count = len(df)
-    
-    if method == "activity":
-        # Remove duplicate activities (same person, same activity, same date)
-        # This counts each unique activity completion
-        df_dedup = df.drop_duplicates(subset=['volunteerDate', 'assignment'], keep='first')
-        logger.info("  • Counting by activity: Each unique activity completion")
-        
-    elif method == "person":
-        # Remove duplicate people (keep first occurrence)
-        # This counts unique volunteers
-        df_dedup = df.drop_duplicates(subset=['volunteerDate'], keep='first')
-        logger.info("  • Counting by person: Each unique volunteer")
-        
-    elif method == "location":
-        # Remove duplicate locations (same person, same location, same date)
-        # This counts by branch/location
-        location_col = None
-        for col in df.columns:
-            if 'location' in col.lower() or 'branch' in col.lower():
-                location_col = col
-                break
-        
-        if location_col:
-            df_dedup = df.drop_duplicates(subset=['volunteerDate', location_col], keep='first')
-            logger.info(f"  • Counting by location: Using column '{location_col}'")
-        else:
-            logger.warning("  • No location/branch column found, using activity method")
-            df_dedup = df.drop_duplicates(subset=['volunteerDate', 'assignment'], keep='first')
-            
-    else:
+    keys = resolve_dedup_keys(df, method)
+    if keys is None:
         logger.error("❌ Invalid deduplication method. Use: 'activity', 'person', or 'location'")
         return df
+    logger.info(f"  • Counting by {method}: Using columns {keys}")
+    
+    df_dedup = df[first_occurrence_mask(df, keys)]
     
-    removed_count = initial_count - len(df_dedup)
+    removed_count = len(df) - len(df_dedup)
     logger.info(f"  • Removed {removed_count} duplicate rows")
     logger.info(f"  • Remaining rows: {len(df_dedup)}")
     
     return df_dedup
 
-def create_summary_report(df, output_dir="processed_data"):
-    """Create summary report for monthly review"""
-    logger.info("\n📝 Creating Summary Report...")
+def describe_activity(df, assignment_id):
+    """Readable label for an assignment: need, project and branch names"""
+    row = df.loc[df['assignmentId'] == assignment_id].iloc[0]
+    names = [row.get(col) for col in ('needName', 'projectName', 'branchName')]
+    label = " | ".join(str(name) for name in names if pd.notna(name))
+    return f"{label} (assignment {assignment_id})" if label else f"assignment {assignment_id}"
+
+def apply_adjustment_rules(df, rules_file, output_dir="processed_data"):
+    """Apply the manual adjustment / branch credit rules in rules_file to the cleaned data
     
-    # Generate summary statistics
+    The audit trail of every changed value is saved to output_dir. Returns
+    the adjusted frame and the per-rule totals for the summary report.
+    """
+    logger.info("\n🛠️ Applying adjustment rules...")
+    df_adjusted, audit, results = apply_rules(df, load_rules(rules_file))
+    log_adjustments(results)
+    save_audit(audit, output_dir)
+    return df_adjusted, results
+
+def update_monthly_cube(df, output_dir="processed_data"):
+    """Fold the cleaned data into the month x branch x project x need cube kept in output_dir"""
+    logger.info("\n🧊 Updating monthly aggregate cube...")
+    cube_path = os.path.join(output_dir, CUBE_FILE)
+    cube = update_cube(load_cube(cube_path), df)
+    save_cube(cube, cube_path)
+    logger.info(f"✅ Cube covers {cube['month'].nunique()} months, {len(cube)} cells")
+    return cube
+
+def format_date_range(first, last):
+    """'YYYY-MM-DD to YYYY-MM-DD', or "N/A" when there are no dated rows (e.g. every row was removed)"""
+    if pd.isna(first) or pd.isna(last):
+        return "N/A"
+    return f"{first:%Y-%m-%d} to {last:%Y-%m-%d}"
+
+def summarize_volunteer_data(df):
+    """Headline figures of the summary report for a cleaned frame"""
     summary = {
         'Total Records': len(df),
-        'Date Range': f"{df['volunteerDate'].min()} to {df['volunteerDate'].max()}" if 'volunteerDate' in df.columns else "N/A"
+        'Date Range': format_date_range(df['volunteerDate'].min(), df['volunteerDate'].max()) if 'volunteerDate' in df.columns else "N/A"
     }
     
     # Add hours summary if available
-    hours_col = None
-    for col in df.columns:
-        if 'hour' in col.lower():
-            hours_col = col
-            break
+    hours_col = find_hours_column(df.columns)
     
     if hours_col:
         summary['Total Hours'] = df[hours_col].sum()
@@ -142,22 +336,66 @@ def create_summary_report(df, output_dir="processed_data"):
         summary['Max Hours'] = df[hours_col].max()
     
     # Count unique assignments if available
-    if 'assignment' in df.columns:
-        summary['Unique Activities'] = df['assignment'].nunique()
-        summary['Most Common Activity'] = df['assignment'].value_counts().index[0] if len(df) > 0 else "N/A"
+    if 'assignmentId' in df.columns:
+        summary['Unique Activities'] = df['assignmentId'].nunique()
+        # ties go to the activity seen first, so chunked runs pick the same one
+        summary['Most Common Activity'] = describe_activity(df, df['assignmentId'].value_counts(sort=False).idxmax()) if len(df) > 0 else "N/A"
+    
+    return summary
+
+def create_summary_report(df, output_dir="processed_data", dedup_results=None, cube=None, adjustments=None):
+    """Create summary report for monthly review
+    
+    Pass the output of deduplicate_all() to include the record count of each
+    counting method, the aggregate cube to include per-branch totals for
+    the months in df (for the branch credit check), and the per-rule totals
+    of apply_adjustment_rules() to list the adjustments made.
+    """
+    logger.info("\n📝 Creating Summary Report...")
+    
+    summary = summarize_volunteer_data(df)
+    months = sorted(month_labels(df['volunteerDate']).dropna().unique()) if 'volunteerDate' in df.columns else None
+    return write_summary_report(summary, output_dir, dedup_results=dedup_results, cube=cube, months=months,
+                                adjustments=adjustments)
+
+def write_summary_report(summary, output_dir="processed_data", dedup_results=None, cube=None, months=None,
+                         summary_file=None, title="YMCA Volunteer Data Summary Report", adjustments=None):
+    """Write the summary figures, dedup counts and per-branch cube totals for `months` to a text report
+    
+    The report goes to output_dir/Summary_Report_<timestamp>.txt unless summary_file is given.
+    """
+    summary = dict(summary)
+    
+    # Record counts under each deduplication method
+    for name, result in (dedup_results or {}).items():
+        summary[f"Records by {name}"] = result['count']
     
     # Save summary
-    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
-    summary_file = os.path.join(output_dir, f"Summary_Report_{timestamp}.txt")
+    if summary_file is None:
+        timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+        summary_file = os.path.join(output_dir, f"Summary_Report_{timestamp}.txt")
     
     with open(summary_file, 'w') as f:
-        f.write("YMCA Volunteer Data Summary Report\n")
+        f.write(f"{title}\n")
         f.write("=" * 50 + "\n")
         f.write(f"Generated: {dt.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
         
         for key, value in summary.items():
             f.write(f"{key}: {value}\n")
         
+        if cube is not None and months is not None:
+            branches = rollup(cube, ['branchId'], where={'month': months})
+            f.write("\n🏢 Hours by Branch:\n")
+            for branch in branches.sort_values('hours', ascending=False).itertuples():
+                f.write(f"• {branch.branchName}: {branch.hours:g} hours, {branch.records} records, "
+                        f"{branch.volunteers} volunteers\n")
+        
+        if adjustments is not None:
+            f.write("\n🛠️ Adjustments Applied:\n")
+            for result in adjustments:
+                f.write(f"• {result['rule']} ({result['action']}): {result['changed']} of {result['matched']} "
+                        f"matched rows changed, {result['hoursDelta']:+g} hours\n")
+        
         f.write("\n📋 Notes for Monthly Review:\n")
         f.write("• Check for reporting errors before pulling data\n")
         f.write("• Verify branch credit calculations\n")
@@ -168,40 +406,96 @@ def create_summary_report(df, output_dir="processed_data"):
     logger.info(f"✅ Summary report saved: {summary_file}")
     return summary_file
 
-def main():
-    """Main processing function"""
+def main(export_excel=False, output_dir="processed_data", profile_dir=None, chunked=False,
+         batch_size=PARQUET_BATCH_SIZE, rules_file=None, return_adjustments=False, extract_file=None):
+    """Main processing function
+
+    Stage timings and peak memory are saved as Run_Report_*.json in output_dir;
+    pass profile_dir to also cProfile each stage into that directory.
+    
+    chunked=True processes a Parquet extract out of core (batch_size rows, then
+    one month, at a time) for histories that do not fit in memory; the outputs
+    are the same, and the Raw Data path is returned instead of the frame.
+    
+    rules_file (JSON, see adjustment_rules.load_rules) applies manual
+    adjustments and branch credits after the Raw Data is saved; the adjusted
+    rows are saved next to it as Adjusted_Data_*.parquet, and the dedup
+    counts, cube and summary reflect the adjusted figures. Pass
+    return_adjustments=True to get (frame, per-rule totals) back instead of
+    the frame alone (in-memory mode).
+    
+    extract_file prepares that extract; by default the newest
+    VolunteerHistory_* file in the working directory is used.
+    """
     logger.info("🏊‍♂️ YMCA Volunteer Data Preparation - Step 2")
     logger.info("=" * 60)
     
+    METRICS.reset()
+    if profile_dir:
+        METRICS.enable_profiling(profile_dir)
+    
     # Find the most recent volunteer history file
-    excel_files = list(Path(".").glob("VolunteerHistory_*.xlsx"))
-    if not excel_files:
-        logger.error("❌ No VolunteerHistory_*.xlsx files found")
+    latest_file = extract_file or find_latest_extract()
+    if latest_file is None:
+        logger.error("❌ No VolunteerHistory_*.parquet or VolunteerHistory_*.xlsx files found")
         return
     
-    # Use the most recent file
-    latest_file = max(excel_files, key=os.path.getctime)
     logger.info(f"📁 Using file: {latest_file}")
     
+    if chunked:
+        if str(latest_file).endswith('.parquet'):
+            from chunked_preparation import prepare_chunked
+            raw_data_file = prepare_chunked(latest_file, output_dir, excel=export_excel, batch_size=batch_size,
+                                            rules_file=rules_file)
+            timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+            METRICS.write_report(os.path.join(output_dir, f"Run_Report_{timestamp}.json"))
+            return raw_data_file
+        logger.warning("⚠️ Chunked mode needs a Parquet extract; processing the Excel file in memory")
+    
     # Load data
-    df = load_volunteer_data(latest_file)
+    with METRICS.stage("load"):
+        df = load_volunteer_data(latest_file)
     if df is None:
         return
     
     # Step 2: Clean data (remove 0 hours)
-    df_cleaned = clean_volunteer_data(df)
+    with METRICS.stage("clean"):
+        df_cleaned = clean_volunteer_data(df)
     
     # Save raw data
-    raw_data_file = save_raw_data(df_cleaned)
+    with METRICS.stage("save_raw"):
+        raw_data_file = save_raw_data(df_cleaned, output_dir, excel=export_excel)
+    
+    # Manual adjustments and branch credits, with an audit trail
+    adjustments = None
+    if rules_file:
+        with METRICS.stage("adjust"):
+            df_cleaned, adjustments = apply_adjustment_rules(df_cleaned, rules_file, output_dir)
+            save_adjusted_data(df_cleaned, raw_data_file, adjustments)
+    
+    # Count records under every deduplication method in one pass
+    logger.info("\n🔄 Deduplication counts:")
+    with METRICS.stage("dedup"):
+        dedup_results = deduplicate_all(df_cleaned)
+    
+    # Keep the monthly aggregate cube up to date
+    with METRICS.stage("cube"):
+        cube = update_monthly_cube(df_cleaned, output_dir)
     
     # Create summary report
-    summary_file = create_summary_report(df_cleaned)
+    with METRICS.stage("summary"):
+        summary_file = create_summary_report(df_cleaned, output_dir, dedup_results=dedup_results, cube=cube,
+                                             adjustments=adjustments)
+    
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    METRICS.write_report(os.path.join(output_dir, f"Run_Report_{timestamp}.json"))
     
     # Show deduplication options
     logger.info("\n🎯 Deduplication Options Available:")
-    logger.info("1. By Activity: df.drop_duplicates(subset=['volunteerDate', 'assignment'])")
-    logger.info("2. By Person: df.drop_duplicates(subset=['volunteerDate'])")
-    logger.info("3. By Location: df.drop_duplicates(subset=['volunteerDate', 'branch'])")
+    logger.info("1. By Activity: df[dedup_results['activity']['mask']]")
+    logger.info("2. By Person: df[dedup_results['person']['mask']]")
+    logger.info("3. By Location: df[dedup_results['location']['mask']]")
+    logger.info("4. Custom keys: deduplicate_all(df, {'branch': ['volunteerDate', 'contactId', 'branchId']})")
     
     logger.info("\n📋 Next Steps:")
     logger.info("1. Review the Raw Data file for accuracy")
@@ -209,7 +503,31 @@ def main():
     logger.info("3. Check monthly for reporting errors")
     logger.info("4. Apply manual adjustments for special programs")
     
+    if return_adjustments:
+        return df_cleaned, adjustments
     return df_cleaned
 
+def rebuild_report(output_dir="processed_data", rules_file=None):
+    """Regenerate the summary report from the latest Raw Data and the saved cube, without re-cleaning
+    
+    Reports the Adjusted Data saved by the prepare run when there is one;
+    pass rules_file to apply (other) rules to the Raw Data instead, in which
+    case the report's cube has the re-adjusted months rebuilt in memory (the
+    saved cube keeps the prepared figures).
+    """
+    data_file, adjustments = latest_report_data(output_dir, rules_file)
+    if data_file is None:
+        logger.error(f"❌ No Raw_Data_*.parquet found in {output_dir} - run the prepare step first")
+        return None
+    
+    logger.info(f"📁 Using file: {data_file}")
+    df = read_parquet(data_file)
+    dedup_results = deduplicate_all(df)
+    cube = load_cube(os.path.join(output_dir, CUBE_FILE))
+    if rules_file:
+        cube = update_cube(cube, df)
+    return create_summary_report(df, output_dir, dedup_results=dedup_results, cube=cube, adjustments=adjustments)
+
 if __name__ == "__main__":
+    setup_logging()
     df = main()
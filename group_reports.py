@@ -0,0 +1,169 @@
+import datetime as dt
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from data_preparation import (
+    DEDUP_METHODS,
+    find_hours_column,
+    first_occurrence_mask,
+    resolve_dedup_keys,
+    summarize_volunteer_data,
+    write_summary_report,
+)
+from pipeline_metrics import METRICS
+from volunteer_schema import apply_volunteer_dtypes
+from volunteer_storage import PARQUET_BATCH_SIZE, write_excel
+
+logger = logging.getLogger(__name__)
+
+# Report dimension -> (id column the rows are partitioned on, label column used in names)
+REPORT_DIMENSIONS = {
+    "branch": ("branchId", "branchName"),
+    "project": ("projectId", "projectName"),
+}
+REPORT_FORMATS = ("csv", "excel")
+MAX_REPORT_WORKERS = 8          # worker processes at most, however many cores there are
+UNASSIGNED_LABEL = "Unassigned"  # rows without an id for the dimension
+
+def partition_table(table: pa.Table, id_col: str, label_col: Optional[str] = None) -> Tuple[pa.Table, List[Dict]]:
+    """Sort the rows by `id_col` once and locate each group as a contiguous row range
+
+    Returns the sorted table and one {'key', 'label', 'offset', 'rows'} per
+    group, largest first. Rows keep their original order within a group
+    (the sort is stable) and rows without an id form the last group.
+    """
+    table = table.sort_by([(id_col, "ascending")])
+    codes, _ = pd.factorize(table[id_col].to_numpy(zero_copy_only=False), use_na_sentinel=True)
+    starts = [0] + (np.flatnonzero(codes[1:] != codes[:-1]) + 1).tolist() if len(codes) else []
+    ends = starts[1:] + [len(codes)]
+
+    groups = []
+    for start, end in zip(starts, ends):
+        key = table[id_col][start].as_py()
+        label = table[label_col][start].as_py() if label_col in table.column_names else None
+        groups.append({
+            "key": key,
+            "label": label or (UNASSIGNED_LABEL if key is None else f"{id_col} {key}"),
+            "offset": start,
+            "rows": end - start,
+        })
+    return table, sorted(groups, key=lambda group: group["rows"], reverse=True)
+
+def group_file_stem(dimension: str, group: Dict) -> str:
+    """File-system safe name of a group's outputs, e.g. 'branch_12_Downtown_YMCA'"""
+    label = re.sub(r"[^A-Za-z0-9]+", "_", str(group["label"])).strip("_")
+    key = "none" if group["key"] is None else group["key"]
+    return f"{dimension}_{key}_{label}"[:120]
+
+def dedup_counts(df: pd.DataFrame) -> Dict[str, Dict]:
+    """Record count under each built-in counting method, without deduplicate_all()'s per-method logging"""
+    codes = {}
+    counts = {}
+    for method in DEDUP_METHODS:
+        keys = resolve_dedup_keys(df, method)
+        if all(col in df.columns for col in keys):
+            counts[method] = {'count': int(first_occurrence_mask(df, keys, codes).sum())}
+    return counts
+
+def write_group_report(arrow_path: str, dimension: str, group: Dict, report_dir: str,
+                       formats: Sequence[str] = REPORT_FORMATS) -> Dict:
+    """Summary report plus CSV / Excel export of one group (runs in a worker process)
+
+    The partitioned rows are memory-mapped from `arrow_path`, so a worker
+    only pages in its own row range and nothing is pickled between processes
+    but the group's offsets.
+    """
+    stem = os.path.join(report_dir, group_file_stem(dimension, group))
+    files = []
+    with pa.memory_map(arrow_path) as source:
+        rows = pa.ipc.open_file(source).read_all().slice(group["offset"], group["rows"])
+        df = apply_volunteer_dtypes(rows.to_pandas(), compact=True)
+
+        summary = summarize_volunteer_data(df)
+        files.append(write_summary_report(summary, dedup_results=dedup_counts(df), summary_file=f"{stem}_Summary.txt",
+                                          title=f"YMCA Volunteer Data Summary Report - {group['label']}"))
+        if "csv" in formats:
+            pa_csv.write_csv(rows, f"{stem}.csv")
+            files.append(f"{stem}.csv")
+        if "excel" in formats:
+            write_excel(rows.column_names, rows.to_batches(max_chunksize=PARQUET_BATCH_SIZE), f"{stem}.xlsx")
+            files.append(f"{stem}.xlsx")
+
+    hours_col = find_hours_column(df.columns)
+    return {
+        "key": group["key"],
+        "label": group["label"],
+        "rows": group["rows"],
+        "hours": float(df[hours_col].sum()) if hours_col else None,
+        "files": files,
+    }
+
+def generate_group_reports(raw_data_file: str, by: str = "branch", output_dir: str = "processed_data",
+                           formats: Sequence[str] = REPORT_FORMATS, max_workers: Optional[int] = None) -> List[Dict]:
+    """Per-branch (or per-project) summary reports and exports, generated in parallel
+
+    Pass the Adjusted Data file (data_preparation.latest_report_data) to
+    report branch credits and other adjustments. The file is read and
+    partitioned once, then written as one uncompressed Arrow file that
+    every worker memory-maps; the groups are spread over a pool of at most
+    max_workers processes (default: one per core, capped at
+    MAX_REPORT_WORKERS). Outputs go to
+    output_dir/<By>_Reports_<timestamp>/ with an Index.csv of every group.
+    """
+    if by not in REPORT_DIMENSIONS:
+        raise ValueError(f"Unknown report dimension '{by}', expected one of {sorted(REPORT_DIMENSIONS)}")
+    id_col, label_col = REPORT_DIMENSIONS[by]
+
+    with METRICS.stage("partition"):
+        table = pq.read_table(raw_data_file)
+        if id_col not in table.column_names:
+            logger.error(f"❌ {raw_data_file} has no '{id_col}' column to split reports by")
+            return []
+        table, groups = partition_table(table, id_col, label_col)
+
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    report_dir = Path(output_dir) / f"{by.title()}_Reports_{timestamp}"
+    report_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(max_workers or os.cpu_count() or 1, MAX_REPORT_WORKERS, len(groups)))
+    logger.info(f"📊 {len(groups)} {by} reports from {table.num_rows} rows on {workers} worker(s)")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="volunteer_reports_") as tmp_dir:
+        arrow_path = os.path.join(tmp_dir, "partitioned.arrow")
+        with pa.OSFile(arrow_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        del table
+
+        with METRICS.stage("group_reports"):
+            if workers == 1:
+                # no pool for a single worker: same code path, no process start-up
+                results = [write_group_report(arrow_path, by, group, str(report_dir), formats) for group in groups]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {executor.submit(write_group_report, arrow_path, by, group, str(report_dir), formats): group
+                               for group in groups}
+                    for future in as_completed(futures):
+                        group = futures[future]
+                        try:
+                            results.append(future.result())
+                        except Exception as e:
+                            logger.error(f"❌ Report for {by} '{group['label']}' failed: {e}")
+
+    results.sort(key=lambda result: result["rows"], reverse=True)
+    index_file = report_dir / "Index.csv"
+    index = pd.DataFrame([{k: v for k, v in result.items() if k != "files"} for result in results],
+                         columns=["key", "label", "rows", "hours"])
+    index.astype({"key": "Int64"}).to_csv(index_file, index=False)
+    logger.info(f"✅ {len(results)} of {len(groups)} {by} reports saved in {report_dir}")
+    return results
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Local stand-in for the VolunteerMatters /api/v2/volunteerHistory endpoint
+
+Serves deterministic synthetic volunteer history with the same record shape
+as the real API, so the pipeline can be exercised and benchmarked offline:
+
+    python mock_volunteermatters.py --records 100000 --latency 0.05 --error-rate 0.01
+
+then point BASE in volunteer_history_extractor.py at http://127.0.0.1:8765/api/v2
+"""
+import argparse
+import datetime as dt
+import hashlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+logger = logging.getLogger(__name__)
+
+PAGINATION_STYLES = ("total", "hasNextPage", "nextPage", "none")
+DEFAULT_CONFIG = {
+    "records": 10000,
+    "start_date": dt.date(2025, 1, 1),
+    "end_date": dt.date(2025, 9, 1),
+    "max_page_size": 1000,
+    "latency": 0.0,         # seconds added to every response
+    "error_rate": 0.0,      # fraction of requests answered with a 503
+    "pagination": "total",  # how the response advertises further pages
+    "seed": 42,
+}
+
+BRANCH_NAMES = [
+    "Blue Ash YMCA", "Campbell County YMCA", "Central Parkway YMCA", "Clermont YMCA",
+    "Clippard YMCA", "Gamble-Nippert YMCA", "Highland County YMCA", "M.E. Lyons YMCA",
+    "Powel Crosley YMCA", "R.C. Durr YMCA", "Lindner YMCA", "Camp Ernst",
+    "Countryside YMCA", "Fairfield YMCA", "Middletown YMCA", "Hamilton YMCA",
+    "Kentucky Y Campus", "Association Office", "Music Resource Center", "Youth Development & Education",
+]
+PROGRAMS = ["Swim Lesson Sidekick", "Tai Chi", "Garden Volunteer", "Kids' Club", "Group Leader",
+            "Reading Buddy", "Front Desk", "Special Events", "Camp Counselor", "Fitness Coach"]
+COMMENTS = ["Cycling", "Tai Chi", "swim lessons", "Yard work", "Registration prep", "", "Event setup"]
+HOURS = [0, 0.25, 0.5, 1.0, 1.5, 2.0, 2.0, 3.0, 4.0, 8.0]
+
+class SyntheticHistory:
+    """Deterministic synthetic records, generated on demand by index
+
+    Record i falls on start_date + i * days // records, so dates are sorted
+    by index and a startDate/endDate window maps to a contiguous index range.
+    """
+
+    def __init__(self, records: int, start_date: dt.date, end_date: dt.date, seed: int = 42):
+        self.records = records
+        self.start_date = start_date
+        self.days = (end_date - start_date).days
+        self.seed = seed
+        self.contacts = max(1, records // 20)
+
+        rng = random.Random(seed)
+        self.branches = [
+            {"id": i + 1, "code": str(4800 + i), "name": name, "timeZoneId": "America/New_York", "active": True}
+            for i, name in enumerate(BRANCH_NAMES)
+        ]
+        self.projects = []
+        self.needs = []
+        for branch in self.branches:
+            for program in rng.sample(PROGRAMS, 5):
+                project = {"id": 1000 + len(self.projects), "name": f"{branch['name']} - {program}", "branch": branch}
+                self.projects.append(project)
+                for role in ("Leader", "Assistant"):
+                    self.needs.append({
+                        "id": 30000 + len(self.needs),
+                        "needType": "Position",
+                        "name": f"{program} {role} 2025",
+                        "startDateTime": "2025-01-01",
+                        "endDateTime": "2026-01-01",
+                        "project": project,
+                    })
+
+    def index_range(self, start_date: dt.date, end_date: dt.date) -> Tuple[int, int]:
+        """Indexes [first, last) of the records dated within [start_date, end_date)"""
+        def first_index_on_or_after(day_offset: int) -> int:
+            day_offset = min(max(day_offset, 0), self.days)
+            return min(self.records, -(-day_offset * self.records // max(1, self.days)))
+        return (first_index_on_or_after((start_date - self.start_date).days),
+                first_index_on_or_after((end_date - self.start_date).days))
+
+    def record(self, i: int) -> Dict:
+        """Build record i"""
+        rng = random.Random(self.seed * 1_000_003 + i)
+        contact_id = rng.randrange(self.contacts) + 1
+        need = self.needs[(contact_id * 7 + rng.randrange(3)) % len(self.needs)]
+        return {
+            "volunteerDate": (self.start_date + dt.timedelta(days=i * self.days // self.records)).isoformat(),
+            "volunteerComments": rng.choice(COMMENTS),
+            "creditedHours": rng.choice(HOURS),
+            "manuallyReported": rng.random() < 0.8,
+            "assignment": {
+                "id": contact_id * 1000 + need["id"] % 1000,
+                "pledgeCount": 1,
+                "deliveredCount": 1,
+                "assignedById": rng.randrange(self.contacts) + 1,
+                "contact": {
+                    "id": contact_id,
+                    "externalId": f"mock{contact_id:08d}",
+                    "email": f"volunteer{contact_id}@example.org",
+                    "name": {"title": "", "last": f"Volunteer{contact_id}", "first": "Mock", "middle": "",
+                             "suffix": "", "nickname": ""},
+                },
+                "need": need,
+            },
+        }
+
+    def page(self, start_date: dt.date, end_date: dt.date, page: int, page_size: int) -> Tuple[List[Dict], int]:
+        """Records of one page of the window, plus the window's total count"""
+        first, last = self.index_range(start_date, end_date)
+        page_first = first + (page - 1) * page_size
+        page_last = min(last, page_first + page_size)
+        return [self.record(i) for i in range(page_first, page_last)], max(0, last - first)
+
+def make_handler(history: SyntheticHistory, config: Dict):
+    """Request handler class bound to a dataset and server config"""
+    rng = random.Random(config["seed"])
+    lock = threading.Lock()
+
+    class VolunteerHistoryHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def send_json(self, status: int, payload) -> None:
+            body = json.dumps(payload).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if status == 200 and self.headers.get("If-None-Match") == etag:
+                # the client's cached copy is current (the data is deterministic, so it never changes)
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 200:
+                self.send_header("ETag", etag)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path.rstrip("/") != "/api/v2/volunteerHistory":
+                self.send_json(404, {"message": "Not Found"})
+                return
+
+            if config["latency"]:
+                time.sleep(config["latency"])
+            with lock:
+                failed = rng.random() < config["error_rate"]
+            if failed:
+                self.send_json(503, {"message": "Service Unavailable (mock)"})
+                return
+
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            try:
+                start_date = dt.date.fromisoformat(query["startDate"])
+                end_date = dt.date.fromisoformat(query["endDate"])
+                page = int(query.get("page", 1))
+                page_size = min(int(query.get("pageSize", 100)), config["max_page_size"])
+            except (KeyError, ValueError) as e:
+                self.send_json(400, {"message": f"Bad request: {e}"})
+                return
+
+            items, total = history.page(start_date, end_date, page, page_size)
+            has_next = page * page_size < total
+            payload = {"items": items}
+            if config["pagination"] == "total":
+                payload["totalCount"] = total
+            elif config["pagination"] == "hasNextPage":
+                payload["hasNextPage"] = has_next
+            elif config["pagination"] == "nextPage":
+                payload["nextPage"] = page + 1 if has_next else None
+            self.send_json(200, payload)
+
+    return VolunteerHistoryHandler
+
+def start_mock_server(host: str = "127.0.0.1", port: int = 0, **overrides) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the mock server on a background thread; returns the server and its API base URL"""
+    config = dict(DEFAULT_CONFIG, **overrides)
+    if config["pagination"] not in PAGINATION_STYLES:
+        raise ValueError(f"Invalid pagination '{config['pagination']}'. Use: {', '.join(PAGINATION_STYLES)}")
+
+    history = SyntheticHistory(config["records"], config["start_date"], config["end_date"], config["seed"])
+    server = ThreadingHTTPServer((host, port), make_handler(history, config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    base_url = f"http://{host}:{server.server_address[1]}/api/v2"
+    logger.info(f"Mock VolunteerMatters serving {config['records']} records at {base_url}")
+    return server, base_url
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock VolunteerMatters volunteerHistory API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--records", type=int, default=DEFAULT_CONFIG["records"])
+    parser.add_argument("--max-page-size", type=int, default=DEFAULT_CONFIG["max_page_size"])
+    parser.add_argument("--latency", type=float, default=DEFAULT_CONFIG["latency"], help="seconds per response")
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"], help="fraction of 503s")
+    parser.add_argument("--pagination", choices=PAGINATION_STYLES, default=DEFAULT_CONFIG["pagination"])
+    parser.add_argument("--seed", type=int, default=DEFAULT_CONFIG["seed"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.StreamHandler(sys.stdout)])
+    server, base_url = start_mock_server(
+        args.host, args.port, records=args.records, max_page_size=args.max_page_size, latency=args.latency,
+        error_rate=args.error_rate, pagination=args.pagination, seed=args.seed,
+    )
+    print(f"Serving {base_url}/volunteerHistory  (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""Long-running pipeline service: scheduled refreshes and a local JSON endpoint
+
+Keeps the interpreter, imports, the HTTP connection pool and the latest
+aggregates warm between runs. Each refresh extracts the current report
+window incrementally, prepares it and swaps the in-memory state; the
+endpoint keeps serving the previous state until the new one is ready.
+
+    GET  /status                       last refresh, next scheduled one, errors
+    GET  /summary                      summary figures, dedup counts, adjustments
+    GET  /aggregates?by=month,branchId&month=2025-08   cube roll-up (filters: any cube key)
+    GET  /dimensions/<branches|projects|needs|contacts>
+    POST /refresh                      start a refresh now (202; 409 if one is running)
+"""
+import datetime as dt
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import data_preparation
+import volunteer_history_extractor as extractor
+from group_reports import dedup_counts
+from volunteer_cube import CUBE_FILE, CUBE_KEYS, load_cube, rollup
+from volunteer_schema import DIMENSIONS, split_dimensions
+from volunteer_storage import read_parquet
+
+logger = logging.getLogger(__name__)
+
+DAEMON_HOST = "127.0.0.1"      # local only: the front-end runs on the same machine
+DAEMON_PORT = 8780             # the mock API server (mock_volunteermatters.py) uses 8765
+REFRESH_INTERVAL = 6 * 3600.0  # seconds between scheduled refreshes
+REFRESH_JITTER = 0.1           # +/- fraction of the interval, so tenants do not refresh in lockstep
+RETRY_INTERVAL = 15 * 60.0     # seconds before retrying a failed refresh
+AGGREGATE_CACHE_SIZE = 256     # roll-up responses kept per state
+KEEP_RUNS = 3                  # timestamped prepare outputs kept per kind (Raw Data, Summary, ...)
+
+class PipelineState:
+    """Everything the endpoint serves, from one prepared dataset (replaced, never mutated)"""
+
+    def __init__(self, df: pd.DataFrame, cube: Optional[pd.DataFrame], data_file: str,
+                 adjustments: Optional[List[Dict]] = None, report_month: Optional[dt.date] = None):
+        self.data_file = data_file
+        self.report_month = report_month
+        self.loaded_at = dt.datetime.now()
+        self.cube = cube
+        self.summary = data_preparation.summarize_volunteer_data(df)
+        self.dedup_counts = {name: result['count'] for name, result in dedup_counts(df).items()}
+        self.adjustments = adjustments
+        _, self.dimensions = split_dimensions(df)
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+    def aggregates(self, by: Tuple[str, ...], where: Tuple[Tuple[str, Tuple], ...]) -> bytes:
+        """JSON roll-up of the cube, computed once per distinct query"""
+        key = (by, where)
+        with self._lock:
+            body = self._aggregates.get(key)
+        if body is None:
+            result = rollup(self.cube, list(by), where={col: list(values) for col, values in where})
+            body = result.to_json(orient="records").encode()
+            with self._lock:
+                if len(self._aggregates) >= AGGREGATE_CACHE_SIZE:
+                    self._aggregates.clear()
+                self._aggregates[key] = body
+        return body
+
+def next_refresh_delay(interval: float = REFRESH_INTERVAL, jitter: float = REFRESH_JITTER) -> float:
+    """Seconds until the next scheduled refresh: interval +/- up to jitter * interval"""
+    return interval * (1 + random.uniform(-jitter, jitter))
+
+class PipelineDaemon:
+    """Scheduler plus warm state for the extract -> prepare pipeline
+
+    Refreshes run on a background thread every `interval` seconds (with
+    jitter) or when triggered; only one runs at a time. The report month is
+    the last complete month and the window starts in January of its year.
+    After each successful refresh only the newest `keep_runs` timestamped
+    prepare outputs of each kind are kept in output_dir.
+    """
+
+    def __init__(self, output_dir: str = "processed_data", interval: float = REFRESH_INTERVAL,
+                 jitter: float = REFRESH_JITTER, rules_file: Optional[str] = None,
+                 concurrency: int = extractor.MAX_CONCURRENCY, lookback_months: int = extractor.LOOKBACK_MONTHS,
+                 keep_runs: int = KEEP_RUNS):
+        self.output_dir = output_dir
+        self.keep_runs = keep_runs
+        self.interval = interval
+        self.jitter = jitter
+        self.rules_file = rules_file
+        self.concurrency = concurrency
+        self.lookback_months = lookback_months
+        self.state: Optional[PipelineState] = None
+        self.session = None
+        self.last_refresh: Optional[Dict] = None
+        self.next_refresh_at: Optional[dt.datetime] = None
+        self._refresh_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_lock.locked()
+
+    def load_latest(self) -> bool:
+        """Warm start: build the state from the newest (Adjusted) Raw Data and cube already on disk"""
+        data_file, adjustments = data_preparation.latest_report_data(self.output_dir)
+        if data_file is None:
+            return False
+        df = read_parquet(data_file)
+        self.state = PipelineState(df, load_cube(os.path.join(self.output_dir, CUBE_FILE)), data_file, adjustments)
+        logger.info(f"Loaded {data_file} ({len(df)} rows) into the service state")
+        return True
+
+    def refresh(self) -> bool:
+        """Extract the current window with the warm session, prepare it and swap in the new state
+
+        Returns False without doing anything when a refresh is already running.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return False
+        started = time.perf_counter()
+        report_month = extractor.current_report_month()
+        record = {"startedAt": dt.datetime.now().isoformat(timespec="seconds"),
+                  "reportMonth": f"{report_month:%Y-%m}", "ok": False}
+        try:
+            if self.session is None:
+                self.session = extractor.create_session(pool_size=self.concurrency * extractor.SHARD_CONCURRENCY)
+            logger.info(f"🔄 Refreshing report month {report_month:%Y-%m}")
+            extract_file = extractor.main(concurrency=self.concurrency, incremental=True,
+                                          lookback_months=self.lookback_months, report_month=report_month,
+                                          start_date=report_month.replace(month=1), session=self.session)
+            record["extract"] = extract_file
+
+            prepared = data_preparation.main(output_dir=self.output_dir, rules_file=self.rules_file,
+                                             return_adjustments=True, extract_file=extract_file)
+            if prepared is None:
+                raise RuntimeError("data preparation produced no data")
+            df, adjustments = prepared
+            data_file = str(data_preparation.find_latest_raw_data(self.output_dir))
+            if self.rules_file:
+                data_file = data_preparation.adjusted_data_path(data_file)
+            self.state = PipelineState(df, load_cube(os.path.join(self.output_dir, CUBE_FILE)), data_file,
+                                       adjustments, report_month)
+            record.update(ok=True, rows=len(df))
+            # every refresh writes a new timestamped set of outputs; keep the newest few
+            data_preparation.prune_outputs(self.output_dir, self.keep_runs)
+        except (Exception, SystemExit) as e:   # the extractor exits on fatal errors; the service keeps running
+            record["error"] = str(e) or type(e).__name__
+            logger.error(f"❌ Refresh failed, still serving the previous data: {record['error']}")
+        finally:
+            record["seconds"] = round(time.perf_counter() - started, 2)
+            self.last_refresh = record
+            self._refresh_lock.release()
+        return True
+
+    def trigger(self) -> bool:
+        """Ask the scheduler for a refresh now; False if one is already running"""
+        if self.refreshing:
+            return False
+        self._wake.set()
+        return True
+
+    def run_scheduler(self, refresh_on_start: bool = True) -> None:
+        delay = 0.0 if refresh_on_start or self.state is None else next_refresh_delay(self.interval, self.jitter)
+        while not self._stop.is_set():
+            self.next_refresh_at = dt.datetime.now() + dt.timedelta(seconds=delay)
+            self._wake.wait(timeout=delay)
+            if self._stop.is_set():
+                break
+            self._wake.clear()
+            self.refresh()
+            ok = self.last_refresh is not None and self.last_refresh["ok"]
+            delay = next_refresh_delay(self.interval, self.jitter) if ok else min(RETRY_INTERVAL, self.interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self.session is not None:
+            self.session.close()
+
+    def status(self) -> Dict:
+        state = self.state
+        return {
+            "refreshing": self.refreshing,
+            "lastRefresh": self.last_refresh,
+            "nextRefreshAt": self.next_refresh_at.isoformat(timespec="seconds") if self.next_refresh_at else None,
+            "data": None if state is None else {
+                "dataFile": state.data_file,
+                "loadedAt": state.loaded_at.isoformat(timespec="seconds"),
+                "reportMonth": f"{state.report_month:%Y-%m}" if state.report_month else None,
+                "records": state.summary.get('Total Records'),
+            },
+        }
+
+def _query_values(col: str, values: List[str]) -> Tuple:
+    """Comma-separated query values, as ints for the cube's id keys"""
+    items = [item for value in values for item in value.split(",") if item]
+    return tuple(int(item) for item in items) if col.endswith("Id") else tuple(items)
+
+def make_handler(daemon: PipelineDaemon):
+    """Request handler class bound to a daemon"""
+
+    class PipelineHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def send_body(self, status: int, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, status: int, payload) -> None:
+            self.send_body(status, json.dumps(payload, default=str).encode())
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = [part for part in url.path.split("/") if part]
+            if parts == ["status"]:
+                self.send_json(200, daemon.status())
+                return
+
+            state = daemon.state
+            if state is None:
+                self.send_json(503, {"message": "No data loaded yet", "status": daemon.status()})
+                return
+
+            if parts == ["summary"]:
+                self.send_json(200, {"summary": state.summary, "dedupCounts": state.dedup_counts,
+                                     "adjustments": state.adjustments, "loadedAt": state.loaded_at})
+            elif parts == ["aggregates"]:
+                if state.cube is None:
+                    self.send_json(503, {"message": "No cube saved yet"})
+                    return
+                query = parse_qs(url.query)
+                by = tuple(item for value in query.pop("by", []) for item in value.split(",") if item)
+                unknown = [col for col in list(by) + list(query) if col not in CUBE_KEYS]
+                if unknown:
+                    self.send_json(400, {"message": f"Unknown cube keys {unknown}, expected {CUBE_KEYS}"})
+                    return
+                try:
+                    where = tuple(sorted((col, _query_values(col, values)) for col, values in query.items()))
+                except ValueError as e:
+                    self.send_json(400, {"message": f"Bad filter value: {e}"})
+                    return
+                self.send_body(200, state.aggregates(by, where))
+            elif len(parts) == 2 and parts[0] == "dimensions" and parts[1] in state.dimensions:
+                self.send_body(200, state.dimensions[parts[1]].to_json(orient="records").encode())
+            else:
+                self.send_json(404, {"message": "Not Found",
+                                     "dimensions": sorted(DIMENSIONS)})
+
+        def do_POST(self):
+            if urlparse(self.path).path.rstrip("/") != "/refresh":
+                self.send_json(404, {"message": "Not Found"})
+                return
+            if daemon.trigger():
+                self.send_json(202, {"message": "Refresh started"})
+            else:
+                self.send_json(409, {"message": "A refresh is already running", "status": daemon.status()})
+
+    return PipelineHandler
+
+def serve(host: str = DAEMON_HOST, port: int = DAEMON_PORT, refresh_on_start: bool = True, **options) -> None:
+    """Run the daemon until interrupted: warm-start from disk, schedule refreshes, serve the endpoint"""
+    daemon = PipelineDaemon(**options)
+    if not daemon.load_latest():
+        logger.info("No prepared data yet; the first refresh will provide it")
+    scheduler = threading.Thread(target=daemon.run_scheduler, args=(refresh_on_start,), daemon=True)
+    scheduler.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(daemon))
+    server.daemon_threads = True
+    logger.info(f"🚀 Pipeline service on http://{host}:{server.server_address[1]} "
+                f"(refresh every {daemon.interval / 3600:g}h ± {daemon.jitter:.0%})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down")
+    finally:
+        server.server_close()
+        daemon.stop()
@@ -0,0 +1,223 @@
+import bisect
+import datetime as dt
+import json
+import logging
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the request latency histogram buckets; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000]
+RSS_SAMPLE_INTERVAL = 0.01   # seconds
+PROFILE_TOP_N = 30
+
+def current_rss_mb() -> Optional[float]:
+    """Resident set size of this process in MB (Linux /proc), or None if unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        return None
+
+class PeakRssSampler:
+    """Track the peak RSS while a block runs by sampling on a background thread"""
+
+    def __init__(self, interval: float = RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak_mb = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self) -> None:
+        rss = current_rss_mb()
+        if rss is not None and (self.peak_mb is None or rss > self.peak_mb):
+            self.peak_mb = rss
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        if self.peak_mb is None:
+            # no /proc: fall back to the process-wide high-water mark (KB on Linux)
+            self.peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return False
+
+def percentile(sorted_values, fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class RunMetrics:
+    """Thread-safe collector for request, timer and stage metrics of one pipeline run
+
+    - record_request(): per-request latency, bytes and status (for the histogram)
+    - timer(): accumulates time spent in a hot section across calls
+      (e.g. JSON decoding or Parquet writes inside the page loop)
+    - stage(): wall time and peak RSS of a whole stage, optionally profiled
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = dt.datetime.now()
+            self.latencies_ms = []
+            self.bytes_received = 0
+            self.status_counts = {}
+            self.retries = 0
+            self.counters = {}
+            self.timers = {}
+            self.stages = {}
+            self.profile_dir = None
+            self.profile_stages = None
+
+    def record_request(self, seconds: float, nbytes: int, status: Optional[int]) -> None:
+        with self._lock:
+            self.latencies_ms.append(seconds * 1000)
+            self.bytes_received += nbytes
+            key = str(status) if status is not None else "error"
+            self.status_counts[key] = self.status_counts.get(key, 0) + 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def increment(self, name: str, count: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            timer = self.timers.setdefault(name, {"seconds": 0.0, "calls": 0})
+            timer["seconds"] += seconds
+            timer["calls"] += 1
+
+    @contextmanager
+    def timer(self, name: str):
+        """Accumulate the time spent in a block under `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def enable_profiling(self, output_dir: str, stages: Optional[Iterable[str]] = None) -> None:
+        """Profile stages with cProfile (all stages, or only the named ones) into output_dir"""
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        self.profile_dir = output_dir
+        self.profile_stages = set(stages) if stages else None
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record the wall time and peak RSS of a pipeline stage"""
+        profiler = None
+        if self.profile_dir and (self.profile_stages is None or name in self.profile_stages):
+            import cProfile
+            profiler = cProfile.Profile()
+
+        start_rss = current_rss_mb()
+        with PeakRssSampler() as sampler:
+            start = time.perf_counter()
+            if profiler:
+                profiler.enable()
+            try:
+                yield
+            finally:
+                if profiler:
+                    profiler.disable()
+                elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.stages[name] = {
+                "seconds": round(elapsed, 4),
+                "peak_rss_mb": round(sampler.peak_mb, 1),
+                "rss_growth_mb": round(sampler.peak_mb - start_rss, 1) if start_rss is not None else None,
+            }
+        logger.debug(f"Stage {name}: {elapsed:.3f}s, peak RSS {sampler.peak_mb:.1f} MB")
+
+        if profiler:
+            self._write_profile(name, profiler)
+
+    def _write_profile(self, name: str, profiler) -> None:
+        import io
+        import pstats
+
+        prof_path = os.path.join(self.profile_dir, f"{name}.prof")
+        profiler.dump_stats(prof_path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        with open(os.path.join(self.profile_dir, f"{name}_profile.txt"), "w") as f:
+            f.write(text.getvalue())
+        with self._lock:
+            self.stages[name]["profile"] = prof_path
+        logger.info(f"Profile of stage '{name}' saved: {prof_path}")
+
+    def request_summary(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self.latencies_ms)
+            histogram = {}
+            previous = 0
+            for bound in LATENCY_BUCKETS_MS:
+                upto = bisect.bisect_right(latencies, bound)
+                histogram[f"<={bound}ms"] = upto - previous
+                previous = upto
+            histogram[f">{LATENCY_BUCKETS_MS[-1]}ms"] = len(latencies) - previous
+
+            return {
+                "count": len(latencies),
+                "retries": self.retries,
+                "bytes_received": self.bytes_received,
+                "status_counts": dict(self.status_counts),
+                "latency_ms": {
+                    "p50": percentile(latencies, 0.50),
+                    "p90": percentile(latencies, 0.90),
+                    "p99": percentile(latencies, 0.99),
+                    "max": latencies[-1] if latencies else None,
+                    "histogram": histogram,
+                },
+            }
+
+    def snapshot(self) -> Dict:
+        """Everything collected so far, as a JSON-serializable dict"""
+        requests_summary = self.request_summary()
+        with self._lock:
+            return {
+                "started_at": self.started_at.isoformat(timespec="seconds"),
+                "finished_at": dt.datetime.now().isoformat(timespec="seconds"),
+                "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "requests": requests_summary,
+                "counters": dict(self.counters),
+                "timers": {name: {"seconds": round(t["seconds"], 4), "calls": t["calls"]}
+                           for name, t in self.timers.items()},
+                "stages": {name: dict(stage) for name, stage in self.stages.items()},
+            }
+
+    def write_report(self, path: str) -> str:
+        """Write the run report as JSON"""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        logger.info(f"Run report saved: {path}")
+        return path
+
+# Process-wide collector used by the extractor's request layer and the pipeline stages
+METRICS = RunMetrics()
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import json
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Optional
+
+if TYPE_CHECKING:
+    import requests
+
+try:
+    import orjson   # optional: several times faster than the standard library parser
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth retrying: throttling and transient upstream failures.
+# Any other 4xx (e.g. a 404 for a wrong path) will fail the same way every time.
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5      # seconds; first retry waits up to this long
+BACKOFF_MAX = 30.0      # seconds; cap on a single backoff
+RETRY_AFTER_MAX = 300.0 # seconds; never honor a Retry-After longer than this
+THROTTLE_RETRIES = 10   # 429s in a row before a request gives up (apart from its max_retries)
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream that the circuit breaker considers down"""
+
+def is_retryable(exc: Exception) -> bool:
+    """Whether a failed request is worth retrying"""
+    import requests
+
+    if isinstance(exc, CircuitOpenError):
+        return False
+    if isinstance(exc, requests.exceptions.HTTPError):
+        response = exc.response
+        return response is None or response.status_code in RETRYABLE_STATUS
+    return isinstance(exc, (requests.exceptions.RequestException, ValueError))
+
+def parse_retry_after(response: Optional[requests.Response]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), if present"""
+    import email.utils
+
+    if response is None:
+        return None
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            retry_at = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = retry_at.timestamp() - time.time()
+    return min(max(0.0, seconds), RETRY_AFTER_MAX)
+
+def decode_json(body: bytes) -> Any:
+    """Decode a JSON response body, with orjson when it is installed
+
+    Raises ValueError on malformed JSON either way, so callers can retry.
+    """
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Exponential backoff with full jitter; a server-provided Retry-After takes precedence"""
+    if retry_after is not None:
+        return retry_after
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+class TokenBucket:
+    """Thread-safe token-bucket rate limiter shared by every request worker
+
+    Allows bursts of up to `capacity` requests and `rate` requests per second
+    on average (rate 0: unlimited). pause() blocks all workers either way,
+    e.g. after a 429 with Retry-After.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a request may be sent"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif not self.rate:
+                    return  # unlimited, but a pause after a 429 still holds
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every worker for `seconds`"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+class CircuitBreaker:
+    """Stop calling an upstream after too many consecutive failures
+
+    Once `failure_threshold` failures happen in a row the circuit opens and
+    every request raises CircuitOpenError. After `reset_timeout` seconds a
+    trial request is let through; a success closes the circuit again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def before_request(self) -> None:
+        """Raise CircuitOpenError if the upstream is considered down"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return  # half-open: let a trial request through
+            raise CircuitOpenError(
+                f"Circuit open after {self._failures} consecutive failures; upstream appears to be down"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("Upstream recovered, closing circuit")
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(f"Opening circuit after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+HTTP_CACHE_DIR = "http_cache"
+HTTP_CACHE_TTL = 3600.0                 # seconds a cached page is served without asking the server
+HTTP_CACHE_MAX_BYTES = 2 * 1024 ** 3    # least recently used pages are evicted beyond this
+# Request headers that select different data for the same URL (tenants share one cache)
+VARY_HEADERS = ("X-VM-Customer-Code",)
+EVICT_EVERY = 64                        # stores between eviction scans of the cache directory
+
+class CacheMissError(Exception):
+    """Raised in offline mode when a request has no cached response to replay"""
+
+class CachedResponse:
+    """A stored response body with the validators needed to revalidate it"""
+
+    def __init__(self, key: str, body: bytes, meta: Dict):
+        self.key = key
+        self.body = body
+        self.stored_at = meta["storedAt"]
+        self.etag = meta.get("etag")
+        self.last_modified = meta.get("lastModified")
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a revalidation request"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """On-disk cache of successful GET responses, keyed by URL, params and tenant
+
+    Entries younger than `ttl` are served without a request. Older ones are
+    revalidated with If-None-Match / If-Modified-Since when the server sent
+    an ETag or Last-Modified, so an unchanged page costs a bodiless 304.
+    With offline=True every cached entry is replayed regardless of age and a
+    miss raises CacheMissError instead of touching the network.
+    """
+
+    def __init__(self, directory: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES, offline: bool = False):
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+
+    def key(self, url: str, params: Optional[Mapping] = None, headers: Optional[Mapping] = None) -> str:
+        """Stable cache key; auth is deliberately not part of it"""
+        vary = {name: (headers or {}).get(name) for name in VARY_HEADERS}
+        material = json.dumps([url, sorted((params or {}).items()), vary], default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _paths(self, key: str):
+        base = self.directory / key[:2] / key
+        return base.with_suffix(".body"), base.with_suffix(".meta")
+
+    def lookup(self, url: str, params: Optional[Mapping] = None,
+               headers: Optional[Mapping] = None) -> Optional[CachedResponse]:
+        """The stored response for a request, or None"""
+        key = self.key(url, params, headers)
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            body = body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+        if len(body) != meta.get("size"):
+            logger.warning(f"Ignoring truncated cache entry {key}")
+            return None
+        os.utime(meta_path)   # mtime of the meta file tracks last use for LRU eviction
+        return CachedResponse(key, body, meta)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return self.offline or entry.age < self.ttl
+
+    def store(self, url: str, params: Optional[Mapping], headers: Optional[Mapping], body: bytes,
+              response_headers: Optional[Mapping] = None) -> None:
+        """Save a 200 response; the body is written before the meta file so a crash never leaves a short entry"""
+        key = self.key(url, params, headers)
+        body_path, meta_path = self._paths(key)
+        response_headers = response_headers or {}
+        meta = {
+            "url": url,
+            "params": {name: str(value) for name, value in (params or {}).items()},
+            "storedAt": time.time(),
+            "size": len(body),
+            "etag": response_headers.get("ETag"),
+            "lastModified": response_headers.get("Last-Modified"),
+        }
+
+        body_path.parent.mkdir(parents=True, exist_ok=True)
+        for path, data, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp_path = path.with_name(path.name + f".{threading.get_ident()}.tmp")
+            with open(tmp_path, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._stores_since_evict += 1
+            due = self._stores_since_evict >= EVICT_EVERY
+        if due:
+            self.evict()
+
+    def refresh(self, entry: CachedResponse) -> None:
+        """Restart an entry's TTL after the server confirmed it unchanged (304)"""
+        _, meta_path = self._paths(entry.key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            meta["storedAt"] = entry.stored_at = time.time()
+            tmp_path = meta_path.with_name(meta_path.name + f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not refresh cache entry {entry.key}: {e}")
+
+    def evict(self) -> int:
+        """Drop expired entries that cannot be revalidated, then least recently used ones over max_bytes"""
+        with self._lock:
+            self._stores_since_evict = 0
+            entries = []
+            for meta_path in self.directory.glob("*/*.meta"):
+                body_path = meta_path.with_suffix(".body")
+                try:
+                    with open(meta_path) as f:
+                        meta = json.load(f)
+                    entries.append((meta_path.stat().st_mtime, meta_path, body_path, meta))
+                except (OSError, ValueError):
+                    continue
+
+            now = time.time()
+            removed = 0
+            total = sum(meta.get("size", 0) for _, _, _, meta in entries)
+            # Oldest use first; unvalidatable expired entries go regardless of size (but are kept for offline replay)
+            for last_used, meta_path, body_path, meta in sorted(entries, key=lambda entry: entry[0]):
+                expired = (not self.offline and now - meta["storedAt"] >= self.ttl
+                           and not (meta.get("etag") or meta.get("lastModified")))
+                if not expired and total <= self.max_bytes:
+                    continue
+                meta_path.unlink(missing_ok=True)
+                body_path.unlink(missing_ok=True)
+                total -= meta.get("size", 0)
+                removed += 1
+
+            if removed:
+                logger.info(f"Evicted {removed} cached responses from {self.directory}")
+            return removed
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        for path in self.directory.glob("*/*"):
+            path.unlink(missing_ok=True)
@@ -0,0 +1,173 @@
+import datetime as dt
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from volunteer_schema import VOLUNTEER_HISTORY_COLUMNS, month_labels
+
+logger = logging.getLogger(__name__)
+
+# A record is identified by its assignment and date; repeats of the same key
+# (several entries for one assignment on one day) are told apart by content
+DIFF_KEY = ['assignmentId', 'volunteerDate']
+# Carried into the change list so reviewers can see what changed without the raw files
+DIFF_LABELS = ['contactName', 'needName', 'projectName', 'branchName']
+CHANGE_TYPES = ('inserted', 'deleted', 'modified')
+
+def find_snapshots(directory=".", count=2):
+    """The newest `count` extraction snapshots, oldest first (Parquet preferred over Excel)"""
+    for pattern in ("VolunteerHistory_*.parquet", "VolunteerHistory_*.xlsx"):
+        files = sorted(Path(directory).glob(pattern), key=os.path.getmtime)
+        if len(files) >= count:
+            return files[-count:]
+    return []
+
+HASH_MULTIPLIER = np.uint64(1000003)
+NULL_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+def _string_hashes(values: pd.Series) -> np.ndarray:
+    """Per-row hash of a string column, hashing each distinct value only once"""
+    array = pa.array(values, type=pa.string())
+    if isinstance(array, pa.ChunkedArray):   # Arrow-backed pandas strings
+        array = array.combine_chunks()
+    encoded = array.dictionary_encode()
+    value_hashes = pd.util.hash_array(np.asarray(encoded.dictionary.to_pylist(), dtype=object))
+    value_hashes = np.append(value_hashes, NULL_HASH)   # index -1: missing value
+    return value_hashes[pc.fill_null(encoded.indices, -1).to_numpy()]
+
+def _column_hashes(values: pd.Series) -> np.ndarray:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # hash the categories once; categorical and plain string columns of the same values hash the same
+        category_hashes = np.append(_column_hashes(pd.Series(values.cat.categories)), NULL_HASH)
+        return category_hashes[values.cat.codes.to_numpy()]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        # one resolution, so an Excel snapshot and a Parquet snapshot of the same rows hash the same
+        values = values.astype('datetime64[ns]')
+    elif pd.api.types.is_string_dtype(values):
+        try:
+            return _string_hashes(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass   # mixed types in an object column
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def fingerprint_rows(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """64-bit hash of each row's values in `columns`, built column by column without touching rows"""
+    fingerprint = np.zeros(len(df), dtype=np.uint64)
+    with np.errstate(over='ignore'):
+        for col in columns:
+            fingerprint = fingerprint * HASH_MULTIPLIER ^ _column_hashes(df[col])
+    return fingerprint
+
+def _keyed(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """Key, fingerprint, hours and labels of every row, with the row's month"""
+    keep = [col for col in DIFF_KEY + ['creditedHours'] + DIFF_LABELS if col in df.columns]
+    # labels as plain strings: the two snapshots' categoricals have different categories
+    keyed = df[keep].astype({'volunteerDate': 'datetime64[ns]', **{col: 'string' for col in keep if col in DIFF_LABELS}})
+    keyed['_fingerprint'] = fingerprint_rows(df, columns)
+    keyed['month'] = month_labels(keyed['volunteerDate'])
+    return keyed
+
+def _match(old: pd.DataFrame, new: pd.DataFrame, on: List[str]) -> pd.DataFrame:
+    """Outer-join rows on `on` plus their occurrence number within `on`"""
+    old = old.assign(_occurrence=old.groupby(on, dropna=False).cumcount())
+    new = new.assign(_occurrence=new.groupby(on, dropna=False).cumcount())
+    return old.merge(new, on=on + ['_occurrence'], how='outer', suffixes=('_old', '_new'), indicator=True)
+
+def overlap_months(old: pd.DataFrame, new: pd.DataFrame) -> Tuple[Optional[str], Optional[str]]:
+    """First and last month covered by both snapshots (months outside are new or dropped periods, not edits)"""
+    if old.empty or new.empty:
+        return None, None
+    first = max(old['volunteerDate'].min(), new['volunteerDate'].min())
+    last = min(old['volunteerDate'].max(), new['volunteerDate'].max())
+    return f"{first:%Y-%m}", f"{last:%Y-%m}"
+
+def diff_snapshots(old: pd.DataFrame, new: pd.DataFrame) -> Dict:
+    """Inserted, deleted and modified records between two flattened extractions
+
+    Rows are matched on DIFF_KEY. Rows whose fingerprint (hash of every
+    volunteer history column) is unchanged are paired first, so exact
+    repeats never show up as edits; the remaining rows of a key are paired
+    in order and count as modified, and leftovers as inserted or deleted.
+    Only months covered by both snapshots are compared.
+
+    Returns {'changes': one row per changed record, 'months': per-month
+    counts and hour totals, 'window': (first, last) compared month}.
+    """
+    columns = [col for col in VOLUNTEER_HISTORY_COLUMNS if col in old.columns and col in new.columns]
+    first, last = overlap_months(old, new)
+    old_keyed, new_keyed = _keyed(old, columns), _keyed(new, columns)
+    if first is not None:
+        old_keyed = old_keyed[old_keyed['month'].between(first, last)]
+        new_keyed = new_keyed[new_keyed['month'].between(first, last)]
+
+    # 1) identical rows (same key and content) cancel out
+    exact = _match(old_keyed, new_keyed, DIFF_KEY + ['_fingerprint'])
+    unchanged = exact['_merge'] == 'both'
+    old_rest = _unmatched(exact[exact['_merge'] == 'left_only'], '_old')
+    new_rest = _unmatched(exact[exact['_merge'] == 'right_only'], '_new')
+
+    # 2) what is left of a key on both sides was edited; the rest was added or removed
+    paired = _match(old_rest.drop(columns='_fingerprint'), new_rest.drop(columns='_fingerprint'), DIFF_KEY)
+    paired['change'] = paired['_merge'].map({'both': 'modified', 'left_only': 'deleted', 'right_only': 'inserted'})
+    paired['month'] = paired['month_new'].fillna(paired['month_old'])
+
+    changes = pd.DataFrame({
+        'change': paired['change'].astype('string'),
+        'month': paired['month'],
+        **{col: paired[col] for col in DIFF_KEY},
+        'hoursOld': paired.get('creditedHours_old'),
+        'hoursNew': paired.get('creditedHours_new'),
+    })
+    for label in DIFF_LABELS:
+        if f'{label}_new' in paired.columns:
+            changes[label] = paired[f'{label}_new'].fillna(paired[f'{label}_old'])
+    changes = changes.sort_values(['month', 'change'] + DIFF_KEY, ignore_index=True)
+
+    months = _month_summary(old_keyed, new_keyed, changes)
+    logger.info(f"Snapshot diff {first} -> {last}: {int(unchanged.sum())} unchanged, "
+                + ", ".join(f"{(changes['change'] == kind).sum()} {kind}" for kind in CHANGE_TYPES))
+    return {'changes': changes, 'months': months, 'window': (first, last)}
+
+def _unmatched(rows: pd.DataFrame, side: str) -> pd.DataFrame:
+    """One side's columns of the rows an outer merge left unmatched"""
+    columns = {col: col[:-len(side)] for col in rows.columns if col.endswith(side)}
+    return rows[DIFF_KEY + ['_fingerprint'] + list(columns)].rename(columns=columns)
+
+def _month_summary(old_keyed: pd.DataFrame, new_keyed: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    counts = changes.pivot_table(index='month', columns='change', values='assignmentId', aggfunc='size', fill_value=0)
+    counts = counts.reindex(columns=list(CHANGE_TYPES), fill_value=0)
+    hours = pd.DataFrame({
+        'hoursOld': old_keyed.groupby('month')['creditedHours'].sum(),
+        'hoursNew': new_keyed.groupby('month')['creditedHours'].sum(),
+    }).fillna(0.0)
+    months = hours.join(counts, how='outer').fillna(0)
+    months[list(CHANGE_TYPES)] = months[list(CHANGE_TYPES)].astype('int64')
+    months['hoursDelta'] = months['hoursNew'] - months['hoursOld']
+    months.index.name = 'month'
+    return months.reset_index()
+
+def changed_months(diff: Dict, before: Optional[dt.date] = None) -> List[str]:
+    """Months (YYYY-MM) with any change, optionally only those before a date (e.g. the closed months)"""
+    months = diff['months']
+    changed = months.loc[months[list(CHANGE_TYPES)].sum(axis=1) > 0, 'month']
+    if before is not None:
+        changed = changed[changed < f"{before:%Y-%m}"]
+    return sorted(changed)
+
+def save_diff(diff: Dict, output_dir: str = "processed_data") -> str:
+    """Write the change list as CSV for review, with the per-month summary alongside"""
+    Path(output_dir).mkdir(exist_ok=True)
+    timestamp = dt.datetime.now().strftime("%Y%m%d_%H%M%S")
+    changes_file = os.path.join(output_dir, f"Snapshot_Diff_{timestamp}.csv")
+    changes = diff['changes'].copy()
+    changes['volunteerDate'] = changes['volunteerDate'].dt.strftime('%Y-%m-%d')
+    changes.to_csv(changes_file, index=False)
+    diff['months'].to_csv(changes_file.replace('.csv', '_by_month.csv'), index=False)
+    logger.info(f"✅ Snapshot diff saved: {changes_file}")
+    return changes_file
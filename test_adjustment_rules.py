@@ -0,0 +1,71 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from adjustment_rules import BatchAdjuster, apply_rules, load_rules
+from volunteer_schema import dimension_table
+
+def test_cap_hours_audit_has_one_row_per_change(volunteer_frame):
+    rules = [{"name": "Cap at 2 hours", "action": "cap_hours", "where": {}, "max": 2}]
+    adjusted, audit, results = apply_rules(volunteer_frame, rules)
+
+    over = volunteer_frame['creditedHours'] > 2
+    assert results == [{'rule': "Cap at 2 hours", 'action': "cap_hours", 'matched': len(volunteer_frame),
+                        'changed': int(over.sum()),
+                        'hoursDelta': pytest.approx(float((2 - volunteer_frame.loc[over, 'creditedHours']).sum()))}]
+    assert len(audit) == int(over.sum())
+    assert (audit['field'] == 'creditedHours').all()
+    assert audit['row'].tolist() == np.flatnonzero(over.to_numpy()).tolist()
+    assert audit['oldValue'].tolist() == volunteer_frame.loc[over, 'creditedHours'].tolist()
+    assert (audit['newValue'] == 2).all()
+    assert adjusted['creditedHours'].max() == 2
+
+def test_reassign_branch_relabels_rows(volunteer_frame):
+    rules = [{"name": "Branch 1 credited to 2", "action": "reassign_branch", "where": {"branchId": 1}, "branchId": 2}]
+    adjusted, audit, results = apply_rules(volunteer_frame, rules)
+
+    moved = (volunteer_frame['branchId'] == 1).to_numpy()
+    branch_2 = volunteer_frame.loc[volunteer_frame['branchId'] == 2, 'branchName'].iloc[0]
+    assert results[0]['changed'] == moved.sum() > 0
+    assert (adjusted.loc[moved, 'branchId'] == 2).all()
+    assert (adjusted.loc[moved, 'branchName'] == branch_2).all()
+    assert (adjusted['branchId'] != 1).all()
+    assert audit['oldValue'].eq(1).all() and audit['newValue'].eq(2).all()
+
+def test_exclude_drops_rows_and_audits_them(volunteer_frame):
+    rules = [{"name": "No cycling", "action": "exclude", "where": {"volunteerComments": {"contains": "cycling"}}}]
+    adjusted, audit, results = apply_rules(volunteer_frame, rules)
+
+    cycling = volunteer_frame['volunteerComments'].astype('string').str.contains('cycling', case=False).fillna(False)
+    assert len(adjusted) == len(volunteer_frame) - cycling.sum()
+    assert len(audit) == results[0]['matched'] == cycling.sum()
+    assert results[0]['hoursDelta'] == pytest.approx(-volunteer_frame.loc[cycling, 'creditedHours'].sum())
+
+def test_batch_adjuster_matches_one_pass(volunteer_frame, tmp_path):
+    rules = [
+        {"name": "Branch 1 credited to 2", "action": "reassign_branch", "where": {"branchId": 1}, "branchId": 2},
+        {"name": "Double short shifts", "action": "scale_hours", "where": {"creditedHours": {"lt": 1}}, "factor": 2},
+        {"name": "No cycling", "action": "exclude", "where": {"volunteerComments": "Cycling"}},
+    ]
+    adjusted, audit, results = apply_rules(volunteer_frame, rules)
+
+    adjuster = BatchAdjuster(rules, dimension_table(volunteer_frame, "branches"), str(tmp_path))
+    batches = [adjuster.apply(volunteer_frame.iloc[start:start + 1500])
+               for start in range(0, len(volunteer_frame), 1500)]
+    batch_results = adjuster.close()
+
+    pd.testing.assert_frame_equal(pd.concat(batches).astype(adjusted.dtypes), adjusted)
+    assert batch_results == results
+    batch_audit = pd.read_csv(adjuster.audit_file)
+    assert sorted(batch_audit['row']) == sorted(audit['row'])
+
+def test_load_rules_rejects_invalid_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"name": "Typo", "action": "cap_hour", "max": 4}]))
+    with pytest.raises(ValueError, match="unknown action"):
+        load_rules(str(path))
+    path.write_text(json.dumps([{"name": "No max", "action": "cap_hours"}]))
+    with pytest.raises(ValueError, match="missing max"):
+        load_rules(str(path))
@@ -0,0 +1,103 @@
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import data_preparation
+from chunked_preparation import RunningSummary, scan_branch_labels
+from volunteer_cube import CUBE_FILE, CUBE_KEYS, load_cube
+from volunteer_schema import dimension_table, to_arrow_table
+from volunteer_storage import read_parquet
+
+RULES = [
+    {"name": "Branches 1 and 2 credited to 3", "action": "reassign_branch", "where": {"branchId": [1, 2]},
+     "branchId": 3},
+    {"name": "Cap at 4 hours", "action": "cap_hours", "where": {"creditedHours": {"gt": 4}}, "max": 4},
+    {"name": "Drop registration prep", "action": "exclude",
+     "where": {"volunteerComments": {"contains": "registration"}}},
+]
+
+def _outputs(output_dir):
+    """What a prepare run left in output_dir, minus run-specific details"""
+    raw_data_file = data_preparation.find_latest_raw_data(output_dir)
+    report = next(Path(output_dir).glob("Summary_Report_*.txt")).read_text().splitlines()
+    return {
+        "raw": read_parquet(str(raw_data_file)),
+        "adjusted": read_parquet(data_preparation.adjusted_data_path(raw_data_file)),
+        "adjustments": data_preparation.load_adjustments(data_preparation.adjusted_data_path(raw_data_file)),
+        "cube": load_cube(os.path.join(output_dir, CUBE_FILE)).sort_values(CUBE_KEYS, ignore_index=True),
+        "report": [line for line in report if not line.startswith("Generated:")],
+    }
+
+def test_extract_keeps_its_types(volunteer_frame):
+    assert pd.api.types.is_datetime64_any_dtype(volunteer_frame['volunteerDate'])
+    assert pd.api.types.is_float_dtype(volunteer_frame['creditedHours'])
+    assert pd.api.types.is_integer_dtype(volunteer_frame['assignmentId'])
+
+def test_summary_of_no_rows(volunteer_frame):
+    summary = data_preparation.summarize_volunteer_data(volunteer_frame.iloc[:0])
+    assert summary["Total Records"] == 0
+    assert summary["Date Range"] == "N/A"
+
+    running = RunningSummary("creditedHours")
+    running.add(volunteer_frame.iloc[:0])
+    assert running.summary()["Date Range"] == "N/A"
+
+def test_dedup_counts_match_drop_duplicates(volunteer_frame):
+    results = data_preparation.deduplicate_all(volunteer_frame, {"branch": ["volunteerDate", "contactId", "branchId"]})
+    assert set(results) == {"activity", "person", "location", "branch"}
+    for name, result in results.items():
+        kept = volunteer_frame.drop_duplicates(result["keys"])
+        assert result["count"] == len(kept)
+        assert result["removed"] == len(volunteer_frame) - len(kept)
+        assert volunteer_frame.index[result["mask"]].equals(kept.index)
+        if name in data_preparation.DEDUP_METHODS:
+            assert data_preparation.deduplicate_data(volunteer_frame, name).index.equals(kept.index)
+
+def test_chunked_matches_in_memory(extract_file, workdir):
+    rules_file = workdir / "rules.json"
+    rules_file.write_text(json.dumps(RULES))
+    data_preparation.main(output_dir="in_memory", rules_file=str(rules_file))
+    data_preparation.main(output_dir="chunked", chunked=True, batch_size=700, rules_file=str(rules_file))
+
+    in_memory, chunked = _outputs("in_memory"), _outputs("chunked")
+    pd.testing.assert_frame_equal(in_memory["raw"], chunked["raw"])
+    pd.testing.assert_frame_equal(in_memory["adjusted"], chunked["adjusted"])
+    pd.testing.assert_frame_equal(in_memory["cube"], chunked["cube"])
+    assert in_memory["adjustments"] == chunked["adjustments"]
+    assert all(result["changed"] > 0 for result in in_memory["adjustments"])
+    assert in_memory["report"] == chunked["report"]
+
+def test_branch_labels_found_in_later_batches(volunteer_frame, workdir):
+    # branch 3 only appears at the end, and its first row has 0 hours
+    target = volunteer_frame["branchId"].eq(3)
+    late = volunteer_frame[target].copy()
+    late.iloc[0, late.columns.get_loc("creditedHours")] = 0
+    late.iloc[0, late.columns.get_loc("branchName")] = None
+    pq.write_table(to_arrow_table(pd.concat([volunteer_frame[~target], late])), "extract.parquet")
+
+    branches = scan_branch_labels("extract.parquet", {3}, batch_size=100)
+    expected = dimension_table(late[late["creditedHours"] != 0], "branches")
+    assert branches.astype(object).equals(expected.astype(object))
+
+def test_report_rules_leave_prepared_output_alone(extract_file, workdir):
+    rules_file, other_rules_file = workdir / "rules.json", workdir / "other_rules.json"
+    rules_file.write_text(json.dumps(RULES))
+    other_rules_file.write_text(json.dumps(RULES[:1]))
+    data_preparation.main(output_dir="prepared", rules_file=str(rules_file))
+    prepared = _outputs("prepared")
+    data_preparation.main(output_dir="expected", rules_file=str(other_rules_file))
+    expected = _outputs("expected")
+
+    summary_file = data_preparation.rebuild_report("prepared", rules_file=str(other_rules_file))
+    pd.testing.assert_frame_equal(_outputs("prepared")["adjusted"], prepared["adjusted"])
+    assert _outputs("prepared")["adjustments"] == prepared["adjustments"]
+    pd.testing.assert_frame_equal(_outputs("prepared")["cube"], prepared["cube"])
+
+    readjusted = next(Path("prepared").glob("Readjusted_Data_*.parquet"))
+    pd.testing.assert_frame_equal(read_parquet(str(readjusted)), expected["adjusted"])
+    assert data_preparation.load_adjustments(readjusted) == expected["adjustments"]
+    report = Path(summary_file).read_text().splitlines()
+    assert [line for line in report if not line.startswith("Generated:")] == expected["report"]
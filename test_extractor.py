@@ -0,0 +1,170 @@
+import datetime as dt
+import email.utils
+import json
+import threading
+import time
+
+import pyarrow.parquet as pq
+import pytest
+import requests
+
+import volunteer_history_extractor as extractor
+from request_control import RETRY_AFTER_MAX, CircuitBreaker, CircuitOpenError, TokenBucket, parse_retry_after
+
+def _response(status, body=b'{"items": []}', headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.headers.update(headers or {})
+    response.url = "http://mock.test/api/v2/volunteerHistory"
+    return response
+
+class ScriptedSession:
+    """Answers get() with the given responses in order, recording each call"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def get(self, url, **kwargs):
+        self.calls += 1
+        return self.responses.pop(0)
+
+class ThrottledSession(requests.Session):
+    """Answers requests `first` to `last` (1-based) with 429 and Retry-After, the rest normally"""
+
+    def __init__(self, first, last, retry_after="1"):
+        super().__init__()
+        self.first, self.last, self.retry_after = first, last, retry_after
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if self.first <= call <= self.last:
+            return _response(429, b'{"message": "Too Many Requests"}', {"Retry-After": self.retry_after})
+        return super().get(url, **kwargs)
+
+def test_capped_page_size_extracts_every_record(mock_api, workdir):
+    mock_api(records=5000, max_page_size=500)
+    out = extractor.main(run_report=False)
+    assert pq.read_metadata(out).num_rows == 5000
+
+def test_total_pages_follow_the_served_page_size():
+    assert extractor.get_total_pages({"totalCount": 5000}, 1000, items_on_page=1000) == 5
+    assert extractor.get_total_pages({"totalCount": 5000}, 1000, items_on_page=500) == 10
+    assert extractor.get_total_pages({"totalCount": 5000, "pageSize": 250}, 1000, items_on_page=250) == 20
+    assert extractor.get_total_pages({"totalCount": 300}, 1000, items_on_page=300) == 1
+    assert extractor.get_total_pages({"totalPages": 7, "totalCount": 5000}, 1000) == 7
+    assert extractor.get_total_pages({"items": []}, 1000) is None
+
+def test_cache_dir_is_scoped_per_upstream(monkeypatch):
+    scoped = extractor.scoped_cache_dir("volunteer_cache")
+    monkeypatch.setitem(extractor.HDRS, "X-VM-Customer-Code", "otherymca")
+    assert extractor.scoped_cache_dir("volunteer_cache") != scoped
+    monkeypatch.setattr(extractor, "BASE", "http://127.0.0.1:8765/api/v2")
+    assert extractor.scoped_cache_dir("volunteer_cache") not in (scoped, "volunteer_cache")
+
+def test_checkpoint_fetched_before_its_shard_ended_is_ignored(tmp_path):
+    shard_start, shard_end = dt.date(2025, 1, 1), dt.date(2025, 2, 1)
+    path = extractor.shard_checkpoint_path(str(tmp_path), shard_start, shard_end)
+    extractor.save_shard_checkpoint(path, shard_start, shard_end, [{"volunteerDate": "2025-01-02"}])
+    assert extractor.load_shard_checkpoint(path, fetched_after=shard_end) == [{"volunteerDate": "2025-01-02"}]
+
+    checkpoint = json.loads(path.read_text())
+    checkpoint["fetchedAt"] = "2025-01-20T10:00:00"
+    path.write_text(json.dumps(checkpoint))
+    assert extractor.load_shard_checkpoint(path, fetched_after=shard_end) is None
+    assert extractor.load_shard_checkpoint(path) is not None
+
+def test_incremental_run_caches_months_per_upstream(mock_api, workdir):
+    mock_api(records=2000)
+    rows = pq.read_metadata(extractor.main(incremental=True, run_report=False)).num_rows
+    cache_dir = workdir / extractor.scoped_cache_dir(extractor.CACHE_DIR)
+    assert len(list(cache_dir.glob("volunteerHistory_*.json"))) == 8   # 2025-01 .. 2025-08
+
+    mock_api(records=2000)   # another upstream gets a cache of its own
+    assert workdir / extractor.scoped_cache_dir(extractor.CACHE_DIR) != cache_dir
+    assert pq.read_metadata(extractor.main(incremental=True, run_report=False)).num_rows == rows == 2000
+
+def test_token_bucket_pause_holds_every_worker():
+    for bucket in (TokenBucket(rate=1000, capacity=1000), TokenBucket(rate=0, capacity=1)):
+        bucket.pause(0.2)
+        started = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - started >= 0.19
+        started = time.monotonic()
+        bucket.acquire()
+        assert time.monotonic() - started < 0.1
+
+def test_parse_retry_after():
+    assert parse_retry_after(_response(429, headers={"Retry-After": "3"})) == 3.0
+    in_ten_seconds = email.utils.formatdate(time.time() + 10, usegmt=True)
+    assert 8 <= parse_retry_after(_response(503, headers={"Retry-After": in_ten_seconds})) <= 10
+    assert parse_retry_after(_response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})) == 0.0
+    assert parse_retry_after(_response(429, headers={"Retry-After": "86400"})) == RETRY_AFTER_MAX
+    assert parse_retry_after(_response(429, headers={"Retry-After": "soon"})) is None
+    assert parse_retry_after(_response(429)) is None
+    assert parse_retry_after(None) is None
+
+def test_client_error_fails_fast():
+    session = ScriptedSession(_response(404, b'{"message": "Not Found"}'))
+    breaker = CircuitBreaker(failure_threshold=1)
+    with pytest.raises(requests.exceptions.HTTPError):
+        extractor.make_api_request("http://mock.test/api/v2/volunteerHistory", {}, ("u", "p"), {}, session=session,
+                                   rate_limiter=TokenBucket(rate=0, capacity=1), circuit_breaker=breaker)
+    assert session.calls == 1
+    assert not breaker.is_open
+
+def test_throttling_does_not_trip_the_circuit_breaker():
+    throttled = {"Retry-After": "0"}
+    session = ScriptedSession(_response(429, headers=throttled), _response(429, headers=throttled),
+                              _response(200, b'{"items": [{"id": 1}]}'))
+    breaker = CircuitBreaker(failure_threshold=1)
+    data = extractor.make_api_request("http://mock.test/api/v2/volunteerHistory", {}, ("u", "p"), {},
+                                      session=session, rate_limiter=TokenBucket(rate=0, capacity=1),
+                                      circuit_breaker=breaker)
+    assert data == {"items": [{"id": 1}]}
+    assert session.calls == 3
+    assert not breaker.is_open
+
+    session = ScriptedSession(_response(503), _response(200))
+    with pytest.raises(requests.exceptions.HTTPError):
+        extractor.make_api_request("http://mock.test/api/v2/volunteerHistory", {}, ("u", "p"), {}, max_retries=1,
+                                   session=session, rate_limiter=TokenBucket(rate=0, capacity=1),
+                                   circuit_breaker=breaker)
+    assert breaker.is_open
+
+def test_extraction_rides_out_a_burst_of_429s(mock_api, workdir, monkeypatch):
+    mock_api(records=12000)   # 12 pages: 8 workers in flight, as in a real run
+    monkeypatch.setattr(extractor, "RATE_LIMITER", TokenBucket(rate=0, capacity=1))
+    monkeypatch.setattr(extractor, "CIRCUIT_BREAKER", CircuitBreaker(extractor.CIRCUIT_FAILURE_THRESHOLD))
+    session = ThrottledSession(2, 12, retry_after="0.25")
+    out = extractor.main(run_report=False, session=session)
+    assert pq.read_metadata(out).num_rows == 12000
+    assert session.calls > 12
+    assert not extractor.CIRCUIT_BREAKER.is_open
+
+def test_each_tenant_has_its_own_circuit_breaker():
+    base = "http://127.0.0.1:1/api/v2"
+    limiter_a, breaker_a = extractor.request_controls({"customer_code": "test-a", "base": base})
+    limiter_b, breaker_b = extractor.request_controls({"customer_code": "test-b", "base": base})
+    assert limiter_a is limiter_b   # one request budget per upstream
+    assert breaker_a is not breaker_b
+
+    for _ in range(breaker_a.failure_threshold):
+        breaker_a.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker_a.before_request()
+    breaker_b.before_request()
+    extractor.CIRCUIT_BREAKER.before_request()
+
+def test_batch_reports_a_failing_tenant_and_extracts_the_rest(mock_api, workdir):
+    base_url = mock_api(records=3000)
+    tenants = [{"customer_code": "good", "base": base_url}, {"customer_code": "wrong-path", "base": base_url + "/x"}]
+    results = {result["customer_code"]: result for result in extractor.run_batch(tenants)}
+    assert results["good"]["ok"] and results["good"]["rows"] == 3000
+    assert pq.read_metadata(results["good"]["path"]).num_rows == 3000
+    assert not results["wrong-path"]["ok"] and "404" in results["wrong-path"]["error"]
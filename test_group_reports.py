@@ -0,0 +1,37 @@
+from pathlib import Path
+
+import pytest
+
+import data_preparation
+from group_reports import generate_group_reports
+from volunteer_storage import read_parquet
+
+def _report_files(results):
+    """Contents of every output file by name, minus the report timestamp"""
+    contents = {}
+    for result in results:
+        for path in result["files"]:
+            lines = Path(path).read_text().splitlines()
+            contents[Path(path).name] = [line for line in lines if not line.startswith("Generated:")]
+    return contents
+
+@pytest.mark.parametrize("by", ["branch", "project"])
+def test_process_pool_matches_serial_reports(extract_file, workdir, by):
+    data_preparation.main(output_dir="prepared")
+    raw_data_file = str(data_preparation.find_latest_raw_data("prepared"))
+    df = read_parquet(raw_data_file)
+
+    serial = generate_group_reports(raw_data_file, by=by, output_dir="serial", formats=["csv"], max_workers=1)
+    pooled = generate_group_reports(raw_data_file, by=by, output_dir="pooled", formats=["csv"], max_workers=3)
+
+    def without_paths(results):
+        return sorted(({k: v for k, v in result.items() if k != "files"} for result in results),
+                      key=lambda result: result["key"])
+    assert without_paths(pooled) == without_paths(serial)
+    assert _report_files(pooled) == _report_files(serial)
+
+    id_col = {"branch": "branchId", "project": "projectId"}[by]
+    expected = df.groupby(id_col)["creditedHours"].agg(["size", "sum"])
+    assert {result["key"]: result["rows"] for result in pooled} == expected["size"].to_dict()
+    assert {result["key"]: result["hours"] for result in pooled} == pytest.approx(expected["sum"].to_dict())
+    assert len(list(Path(pooled[0]["files"][0]).parent.glob("*_Summary.txt"))) == len(expected)
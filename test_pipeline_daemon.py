@@ -0,0 +1,74 @@
+import datetime as dt
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import pipeline_daemon
+import volunteer_history_extractor as extractor
+from volunteer_storage import read_parquet, write_parquet
+
+@pytest.fixture
+def daemon(mock_api, workdir, monkeypatch):
+    """A daemon with nothing loaded yet and its endpoint on a free port (no scheduler running yet)"""
+    mock_api(records=4000)
+    monkeypatch.setattr(extractor, "current_report_month", lambda today=None: dt.date(2025, 8, 1))
+    daemon = pipeline_daemon.PipelineDaemon(output_dir="processed_data", concurrency=2)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), pipeline_daemon.make_handler(daemon))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    daemon.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield daemon
+    daemon.stop()
+    server.shutdown()
+    server.server_close()
+
+def _wait_for_refresh(daemon, previous=None, timeout=60):
+    """GET /status once a refresh other than `previous` (a daemon.last_refresh record) has finished"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        last = daemon.last_refresh
+        if last is not None and last is not previous and not daemon.refreshing:
+            return requests.get(f"{daemon.url}/status").json()
+        time.sleep(0.2)
+    raise AssertionError("refresh did not finish")
+
+def test_refresh_serves_the_new_extract(daemon, monkeypatch):
+    # a newer extract lands in the working directory while the refresh runs: the daemon must
+    # prepare the one it just extracted, not the newest file on disk
+    extract = extractor.main
+
+    def extract_then_decoy(**options):
+        path = extract(**options)
+        write_parquet(read_parquet(path).head(10), "VolunteerHistory_2099-01_to_2099-01.parquet")
+        return path
+
+    monkeypatch.setattr(extractor, "main", extract_then_decoy)
+
+    daemon_url = daemon.url
+    status = requests.get(f"{daemon_url}/status").json()
+    assert status["data"] is None and status["lastRefresh"] is None
+    assert requests.get(f"{daemon_url}/summary").status_code == 503
+
+    # with nothing loaded the scheduler refreshes straight away; POST /refresh then runs another
+    threading.Thread(target=daemon.run_scheduler, args=(False,), daemon=True).start()
+    first = _wait_for_refresh(daemon)["lastRefresh"]
+    assert first["ok"], first
+    previous = daemon.last_refresh
+    assert requests.post(f"{daemon_url}/refresh").status_code == 202
+    status = _wait_for_refresh(daemon, previous)
+    assert status["lastRefresh"]["ok"], status["lastRefresh"]
+    assert status["lastRefresh"]["reportMonth"] == "2025-08"
+
+    extract_rows = read_parquet(status["lastRefresh"]["extract"])
+    expected = int((extract_rows["creditedHours"] != 0).sum())
+    assert status["lastRefresh"]["rows"] == expected
+    assert status["data"]["records"] == expected
+
+    summary = requests.get(f"{daemon_url}/summary").json()
+    assert summary["summary"]["Total Records"] == expected
+    months = requests.get(f"{daemon_url}/aggregates", params={"by": "month"}).json()
+    assert [row["month"] for row in months] == [f"2025-{month:02d}" for month in range(1, 9)]
+    assert requests.get(f"{daemon_url}/aggregates", params={"by": "nope"}).status_code == 400
+    assert requests.post(f"{daemon_url}/nope").status_code == 404
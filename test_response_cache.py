@@ -0,0 +1,76 @@
+import time
+
+import pytest
+import requests
+
+import volunteer_history_extractor as extractor
+from request_control import CircuitBreaker, TokenBucket
+from response_cache import CacheMissError, ResponseCache
+
+PARAMS = {"startDate": "2025-01-01", "endDate": "2025-02-01", "page": 1, "pageSize": 100}
+
+class RecordingSession(requests.Session):
+    """Keeps the status of every response it receives"""
+
+    def __init__(self):
+        super().__init__()
+        self.statuses = []
+
+    def get(self, url, **kwargs):
+        response = super().get(url, **kwargs)
+        self.statuses.append(response.status_code)
+        return response
+
+@pytest.fixture
+def fetch(mock_api):
+    url = f"{mock_api(records=1000)}/volunteerHistory"
+
+    def get(cache, session, headers=extractor.HDRS):
+        return extractor.make_api_request(url, headers, extractor.AUTH, PARAMS, session=session,
+                                          rate_limiter=TokenBucket(rate=0, capacity=1),
+                                          circuit_breaker=CircuitBreaker(), cache=cache)
+    return get
+
+def test_stale_entry_is_revalidated_with_a_304(fetch, tmp_path):
+    cache, session = ResponseCache(str(tmp_path), ttl=0), RecordingSession()
+    first = fetch(cache, session)
+    stored_at = cache.lookup(f"{extractor.BASE}/volunteerHistory", PARAMS, extractor.HDRS).stored_at
+    time.sleep(0.01)
+    assert fetch(cache, session) == first
+    assert session.statuses == [200, 304]
+    assert cache.lookup(f"{extractor.BASE}/volunteerHistory", PARAMS, extractor.HDRS).stored_at > stored_at
+
+def test_fresh_entry_is_served_without_a_request(fetch, tmp_path):
+    cache, session = ResponseCache(str(tmp_path)), RecordingSession()
+    first = fetch(cache, session)
+    assert fetch(cache, session) == first
+    assert session.statuses == [200]
+
+    other_tenant = dict(extractor.HDRS, **{"X-VM-Customer-Code": "otherymca"})
+    fetch(cache, session, headers=other_tenant)
+    assert session.statuses == [200, 200]
+
+def test_offline_replays_hits_and_raises_on_misses(fetch, tmp_path):
+    first = fetch(ResponseCache(str(tmp_path), ttl=0), RecordingSession())
+
+    offline, session = ResponseCache(str(tmp_path), ttl=0, offline=True), RecordingSession()
+    assert fetch(offline, session) == first
+    with pytest.raises(CacheMissError):
+        fetch(offline, session, headers=dict(extractor.HDRS, **{"X-VM-Customer-Code": "otherymca"}))
+    assert session.statuses == []
+
+def test_evict_drops_expired_unvalidated_and_least_recently_used_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=3600, max_bytes=250)
+    for page in range(1, 4):
+        cache.store("http://mock.test/volunteerHistory", {"page": page}, {}, b"x" * 100, {"ETag": f'"{page}"'})
+        time.sleep(0.01)
+    cache.lookup("http://mock.test/volunteerHistory", {"page": 1}, {})   # page 1 is now the most recently used
+    assert cache.evict() == 1
+    assert cache.lookup("http://mock.test/volunteerHistory", {"page": 2}, {}) is None
+    assert cache.lookup("http://mock.test/volunteerHistory", {"page": 1}, {}) is not None
+
+    cache.ttl = 0
+    cache.store("http://mock.test/volunteerHistory", {"page": 4}, {}, b"y")   # no validator: cannot be revalidated
+    assert cache.evict() == 1
+    assert cache.lookup("http://mock.test/volunteerHistory", {"page": 4}, {}) is None
+    assert cache.lookup("http://mock.test/volunteerHistory", {"page": 3}, {}) is not None
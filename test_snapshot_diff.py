@@ -0,0 +1,29 @@
+import pandas as pd
+
+from snapshot_diff import changed_months, diff_snapshots
+
+def test_diff_finds_a_known_edit(volunteer_frame):
+    old = volunteer_frame.reset_index(drop=True)
+    new = old.copy()
+    new.loc[10, 'creditedHours'] = new.loc[10, 'creditedHours'] + 1.5
+    inserted = old.iloc[[20]].assign(assignmentId=pd.array([999_999_999], dtype='Int64'))
+    new = pd.concat([new.drop(index=30), inserted], ignore_index=True)
+
+    diff = diff_snapshots(old, new)
+    changes = diff['changes']
+    assert changes['change'].value_counts().to_dict() == {'modified': 1, 'deleted': 1, 'inserted': 1}
+
+    modified = changes[changes['change'] == 'modified'].iloc[0]
+    assert modified['assignmentId'] == old.loc[10, 'assignmentId']
+    assert modified['hoursNew'] - modified['hoursOld'] == 1.5
+    assert changes.loc[changes['change'] == 'inserted', 'assignmentId'].tolist() == [999_999_999]
+    assert changes.loc[changes['change'] == 'deleted', 'assignmentId'].tolist() == [old.loc[30, 'assignmentId']]
+
+    months = diff['months']
+    assert months['hoursDelta'].sum() == new['creditedHours'].sum() - old['creditedHours'].sum()
+    assert changed_months(diff) == sorted(changes['month'].unique())
+
+def test_identical_snapshots_have_no_changes(volunteer_frame):
+    diff = diff_snapshots(volunteer_frame, volunteer_frame.sample(frac=1, random_state=0))
+    assert diff['changes'].empty
+    assert changed_months(diff) == []
@@ -0,0 +1,53 @@
+import copy
+import datetime as dt
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from mock_volunteermatters import SyntheticHistory
+from volunteer_schema import records_to_arrow, to_arrow_table
+from volunteer_storage import ParquetBatchSink, normalize_batch
+
+@pytest.fixture
+def page():
+    history = SyntheticHistory(500, dt.date(2025, 1, 1), dt.date(2025, 9, 1))
+    items, _ = history.page(dt.date(2025, 1, 1), dt.date(2025, 9, 1), 1, 500)
+    return items
+
+def _pandas_path(items):
+    return to_arrow_table(normalize_batch(items))
+
+def test_records_to_arrow_matches_the_pandas_path(page):
+    assert records_to_arrow(page).equals(_pandas_path(page))
+
+def test_datetimes_and_missing_values_match(page):
+    items = copy.deepcopy(page[:4])
+    items[1]["volunteerDate"] = "2025-03-04T10:15:00"
+    items[2]["volunteerDate"] = None
+    items[3]["creditedHours"] = None
+    del items[3]["assignment"]["need"]
+    table = records_to_arrow(items)
+    assert table.equals(_pandas_path(items))
+    assert table.column("volunteerDate").to_pylist()[1:3] == [dt.date(2025, 3, 4), None]
+
+def test_unparseable_values_fall_back_to_the_pandas_path(page, tmp_path):
+    items = copy.deepcopy(page[:6])
+    items[1]["volunteerDate"] = "2025-03-04T10:15:00"
+    items[2]["volunteerDate"] = "not a date"
+    items[3]["volunteerDate"] = "2025-02-30"
+    items[4]["assignment"]["id"] = "4711"   # an id sent as a string
+    with pytest.raises(pa.ArrowInvalid):
+        records_to_arrow(items)
+
+    with ParquetBatchSink(str(tmp_path / "history.parquet")) as sink:
+        sink.write_batch(page[6:])   # fast path
+        sink.write_batch(items)      # fallback
+    table = pq.read_table(tmp_path / "history.parquet")
+    assert table.slice(0, len(page) - 6).equals(records_to_arrow(page[6:]))
+
+    fallback = table.slice(len(page) - 6)
+    assert fallback.equals(_pandas_path(items))
+    assert fallback.column("volunteerDate").to_pylist()[:4] == [
+        dt.date.fromisoformat(items[0]["volunteerDate"]), dt.date(2025, 3, 4), None, None]
+    assert fallback.column("assignmentId").to_pylist()[4] == 4711
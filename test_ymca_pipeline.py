@@ -0,0 +1,60 @@
+import json
+import logging
+import shutil
+
+import pandas as pd
+import pytest
+
+import volunteer_history_extractor as extractor
+import ymca_pipeline
+
+@pytest.mark.parametrize("argv", [
+    ["extract", "--tenants", "tenants.json", "--incremental"],
+    ["extract", "--tenants", "tenants.json", "--shard-by", "month"],
+    ["extract", "--tenants", "tenants.json", "--excel"],
+    ["extract", "--parallel-tenants", "2"],
+])
+def test_extract_rejects_options_of_the_other_mode(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        ymca_pipeline.main(argv)
+    assert exit_info.value.code == 2
+    assert "--tenants" in capsys.readouterr().err
+
+def test_batch_extract_reports_failed_tenants(mock_api, workdir):
+    base_url = mock_api(records=1000)
+    tenants = workdir / "tenants.json"
+    tenants.write_text(f'[{{"customer_code": "good", "base": "{base_url}"}}]')
+    assert ymca_pipeline.main(["extract", "--tenants", str(tenants), "--output-dir", "out"]) == 0
+    assert (workdir / "out" / "good").is_dir()
+
+    tenants.write_text(f'[{{"customer_code": "good", "base": "{base_url}"}}, '
+                       f'{{"customer_code": "bad", "base": "{base_url}/x"}}]')
+    assert ymca_pipeline.main(["extract", "--tenants", str(tenants), "--output-dir", "out"]) == 1
+
+def _edit_cached_month(cache_dir, month, hours_delta):
+    path = next(cache_dir.glob(f"volunteerHistory_{month}-*.json"))
+    checkpoint = json.loads(path.read_text())
+    checkpoint["rows"][0]["creditedHours"] += hours_delta
+    path.write_text(json.dumps(checkpoint))
+
+def test_diff_refetch_finds_edits_hidden_by_the_month_cache(mock_api, workdir, caplog):
+    mock_api(records=2000)
+    first = extractor.main(incremental=True, run_report=False)
+    shutil.copy(first, workdir / "previous.parquet")
+    cache_dir = workdir / extractor.scoped_cache_dir(extractor.CACHE_DIR)
+    # the cached February no longer matches the API, as after a retroactive edit upstream
+    _edit_cached_month(cache_dir, "2025-02", 1.5)
+
+    latest = extractor.main(incremental=True, run_report=False)
+    assert extractor.cached_months(latest) == ["2025-01", "2025-02", "2025-03", "2025-04", "2025-05", "2025-06"]
+
+    with caplog.at_level(logging.WARNING):
+        assert ymca_pipeline.main(["diff", "previous.parquet", latest, "--output-dir", "out"]) == 0
+    assert "diff --refetch" in caplog.text
+
+    assert ymca_pipeline.main(["diff", "--refetch", "--invalidate-cache", "--output-dir", "out"]) == 0
+    by_month = pd.read_csv(max((workdir / "out").glob("Snapshot_Diff_*_by_month.csv")))
+    assert by_month.loc[by_month["modified"] > 0, "month"].tolist() == ["2025-02"]
+    assert by_month["hoursDelta"].sum() == pytest.approx(-1.5)
+    assert not list(cache_dir.glob("volunteerHistory_2025-02-*.json"))
+    assert len(list(cache_dir.glob("volunteerHistory_*.json"))) == 7
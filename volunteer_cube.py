@@ -0,0 +1,108 @@
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from volunteer_schema import month_labels
+
+logger = logging.getLogger(__name__)
+
+# Cube cells: one row per month x branch x project x need
+CUBE_KEYS = ['month', 'branchId', 'projectId', 'needId']
+# Name carried alongside each id so roll-ups stay readable without the raw rows
+CUBE_LABELS = {'branchId': 'branchName', 'projectId': 'projectName', 'needId': 'needName'}
+CUBE_FILE = "Volunteer_Cube.parquet"
+
+def build_cube(df: pd.DataFrame) -> pd.DataFrame:
+    """Aggregate cleaned volunteer rows into cube cells
+
+    Each cell holds the hour sum, the record count and the exact set of
+    volunteer (contact) ids, kept as a sorted list so cells can be merged
+    into distinct-volunteer counts at any roll-up level.
+    """
+    frame = df.assign(month=month_labels(df['volunteerDate']))
+    grouped = frame.groupby(CUBE_KEYS, dropna=False, sort=True)
+
+    cube = grouped.agg(
+        hours=('creditedHours', 'sum'),
+        records=('creditedHours', 'size'),
+        **{label: (label, 'first') for label in CUBE_LABELS.values()},
+    )
+    # plain strings: cells from runs with different categoricals then concatenate and save alike
+    cube = cube.astype({label: 'string' for label in CUBE_LABELS.values()})
+
+    pairs = frame[CUBE_KEYS + ['contactId']].dropna(subset=['contactId']).drop_duplicates()
+    volunteer_ids = pairs.sort_values('contactId').groupby(CUBE_KEYS, dropna=False)['contactId'].agg(
+        lambda ids: [int(contact_id) for contact_id in ids]
+    )
+    cube['volunteerIds'] = volunteer_ids.reindex(cube.index)
+    cube['volunteerIds'] = cube['volunteerIds'].map(lambda ids: ids if isinstance(ids, list) else [])
+    cube['volunteers'] = cube['volunteerIds'].map(len)
+
+    return cube.reset_index()
+
+def update_cube(cube: Optional[pd.DataFrame], df: pd.DataFrame) -> pd.DataFrame:
+    """Fold newly extracted rows into the cube
+
+    Every month present in `df` is rebuilt from it and replaces that month's
+    cells (so late edits are picked up); all other months are kept as-is.
+    `df` should therefore cover whole months.
+    """
+    return merge_cube_cells(cube, build_cube(df))
+
+def merge_cube_cells(cube: Optional[pd.DataFrame], new_cells: pd.DataFrame) -> pd.DataFrame:
+    """Replace the months present in `new_cells` (built with build_cube) and keep the rest"""
+    if cube is None or cube.empty:
+        return new_cells
+
+    months = set(new_cells['month'])
+    kept = cube[~cube['month'].isin(months)]
+    logger.info(f"Cube update: rebuilt {len(months)} months, kept {kept['month'].nunique()} months")
+    return pd.concat([kept, new_cells], ignore_index=True).sort_values(CUBE_KEYS, ignore_index=True)
+
+def rollup(cube: pd.DataFrame, by: List[str], where: Optional[Dict] = None) -> pd.DataFrame:
+    """Roll the cube up (or drill down) to the `by` keys, optionally filtered by `where`
+
+    e.g. rollup(cube, ['month', 'branchId']) or
+    rollup(cube, ['projectId'], where={'branchId': 19, 'month': '2025-08'})
+    Distinct volunteers are counted from the union of the cells' id sets.
+    """
+    if where:
+        for col, value in where.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            cube = cube[cube[col].isin(values)]
+
+    if not by:
+        cube = cube.assign(total='all')
+        by = ['total']
+
+    grouped = cube.groupby(by, dropna=False, sort=True)
+    result = grouped.agg(
+        hours=('hours', 'sum'),
+        records=('records', 'sum'),
+        **{label: (label, 'first') for key, label in CUBE_LABELS.items() if key in by},
+    )
+
+    ids = cube[by + ['volunteerIds']].explode('volunteerIds').dropna(subset=['volunteerIds']).drop_duplicates()
+    volunteers = ids.groupby(by, dropna=False)['volunteerIds'].size()
+    result['volunteers'] = volunteers.reindex(result.index, fill_value=0).astype('int64')
+
+    return result.reset_index()
+
+def save_cube(cube: pd.DataFrame, path: str) -> None:
+    """Write the cube to Parquet"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    cube.to_parquet(path, index=False)
+    logger.info(f"Saved cube: {path} | cells: {len(cube)}")
+
+def load_cube(path: str) -> Optional[pd.DataFrame]:
+    """Read a saved cube, or None if there is none yet"""
+    if not Path(path).exists():
+        return None
+
+    cube = pd.read_parquet(path)
+    for key in CUBE_KEYS[1:]:
+        cube[key] = cube[key].astype('Int64')
+    cube['volunteerIds'] = cube['volunteerIds'].map(list)
+    return cube
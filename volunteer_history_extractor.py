@@ -1,31 +1,101 @@
-import datetime as dt
-import requests
-import pandas as pd
+from __future__ import annotations
 
+import datetime as dt
+import hashlib
+import json
 import logging
+import math
+import os
+import re
 import sys
+import threading
 import time
-from typing import Dict, List, Any
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('volunteer_extractor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Any, Optional, Tuple
+
+from pipeline_metrics import METRICS
+from request_control import (
+    RETRYABLE_STATUS,
+    THROTTLE_RETRIES,
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+    decode_json,
+    is_retryable,
+    parse_retry_after,
 )
+from response_cache import HTTP_CACHE_DIR, HTTP_CACHE_TTL, CacheMissError, ResponseCache
+
+# requests, pandas and pyarrow are imported where they are used, so importing this
+# module (for validation, the CLI or tests) stays fast and has no side effects
+if TYPE_CHECKING:
+    import requests
+
 logger = logging.getLogger(__name__)
 
-from requests.auth import HTTPBasicAuth
+LOG_FILE = 'volunteer_extractor.log'
 
 BASE = "https://api.volunteermatters.io/api/v2"   # from Swagger "Servers"
-AUTH = HTTPBasicAuth("62lJN9CLNQbuVag36vFSmDg", "oRBbayCJRE2fdJyqKfs9Axw")
+AUTH = ("62lJN9CLNQbuVag36vFSmDg", "oRBbayCJRE2fdJyqKfs9Axw")   # (username, password) for HTTP Basic auth
 HDRS = {
     "X-VM-Customer-Code": "cincinnatiymca",
     "Accept": "application/json",
 }
 
+PAGE_SIZE = 1000
+MAX_CONCURRENCY = 8   # parallel page requests once the total count is known
+
+# Request layer: one rate limiter and circuit breaker shared by every worker thread
+REQUESTS_PER_SECOND = 20
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_RESET_TIMEOUT = 60.0
+RATE_LIMITER = TokenBucket(rate=REQUESTS_PER_SECOND, capacity=REQUESTS_PER_SECOND)
+CIRCUIT_BREAKER = CircuitBreaker(failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT)
+# Batch mode: rate limiters per upstream base, circuit breakers per tenant (see request_controls)
+_RATE_LIMITERS: Dict[str, TokenBucket] = {}
+_CIRCUIT_BREAKERS: Dict[Tuple[str, str], CircuitBreaker] = {}
+_CONTROLS_LOCK = threading.Lock()
+# Optional on-disk response cache for reruns (see configure_response_cache); off by default
+RESPONSE_CACHE: Optional[ResponseCache] = None
+
+# Field names the API may use to report the size of the full result set
+TOTAL_COUNT_KEYS = ("totalCount", "totalItems", "totalRecords", "total")
+TOTAL_PAGES_KEYS = ("totalPages", "pageCount")
+PAGE_SIZE_KEYS = ("pageSize", "perPage", "limit")   # page size the server applied, when it echoes one
+
+# Default report window: Jan 1 -> first day of the month after the report month
+REPORT_MONTH = dt.date(2025, 8, 1)   # example: August report
+START_DATE = dt.date(2025, 1, 1)
+
+# Multi-tenant batch mode: many customer codes share one connection pool and page scheduler
+BATCH_CONCURRENCY = 16      # page requests in flight across all tenants
+TENANT_CONCURRENCY = 4      # default per-tenant cap on pages in flight
+PARALLEL_TENANTS = 4        # tenants extracted at the same time
+BATCH_OUTPUT_DIR = "tenant_outputs"
+
+# Date-window sharding: split the extraction window into independently paged shards
+SHARD_BY_OPTIONS = ("month", "week")
+SHARD_CONCURRENCY = 4   # shards fetched in parallel
+SHARD_RETRIES = 3       # attempts per shard before the run gives up on it
+CHECKPOINT_DIR = "extract_checkpoints"
+
+# Incremental extraction: closed months are served from a persistent month-partitioned cache
+CACHE_DIR = "volunteer_cache"
+LOOKBACK_MONTHS = 1     # months before the report month that are still refetched for late edits
+# Parquet metadata key listing the months (YYYY-MM) an incremental extract served from the month cache
+CACHED_MONTHS_METADATA_KEY = "cachedMonths"
+
+def setup_logging(log_file: Optional[str] = LOG_FILE, level: int = logging.INFO) -> None:
+    """Log to stdout and, unless log_file is None, to the extractor log file"""
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file))
+    logging.basicConfig(level=level, format='%(asctime)s - %(levelname)s - %(message)s', handlers=handlers)
+
 def validate_config():
     """Validate that required configuration is properly set"""
     logger.info("Validating configuration...")
@@ -34,12 +104,12 @@ def validate_config():
         logger.error("BASE URL not configured - please replace <your-volunteermatters-host> with actual host")
         sys.exit(1)
     
-    # Check if AUTH is properly configured (HTTPBasicAuth object)
-    if not hasattr(AUTH, 'username') or not hasattr(AUTH, 'password'):
-        logger.error("AUTH not properly configured - should be HTTPBasicAuth object")
+    # Check if AUTH is properly configured ((username, password) pair)
+    if not isinstance(AUTH, tuple) or len(AUTH) != 2:
+        logger.error("AUTH not properly configured - should be a (username, password) tuple")
         sys.exit(1)
     
-    if "<API_KEY>" in AUTH.username or "<API_SECRET>" in AUTH.password:
+    if "<API_KEY>" in AUTH[0] or "<API_SECRET>" in AUTH[1]:
         logger.error("API credentials not configured - please replace <API_KEY> and <API_SECRET> with actual values")
         sys.exit(1)
     
@@ -49,46 +119,136 @@ def validate_config():
     
     logger.info("Configuration validation passed")
 
-def make_api_request(url: str, headers: Dict, auth: HTTPBasicAuth, params: Dict, max_retries: int = 3) -> Dict[str, Any]:
+def create_session(pool_size: int = MAX_CONCURRENCY) -> requests.Session:
+    """Create a keep-alive session with a connection pool sized for concurrent page fetches"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def configure_response_cache(directory: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL,
+                             offline: bool = False) -> ResponseCache:
+    """Turn on the shared response cache used by make_api_request (offline: replay cached pages only)"""
+    global RESPONSE_CACHE
+    RESPONSE_CACHE = ResponseCache(directory, ttl=ttl, offline=offline)
+    RESPONSE_CACHE.evict()
+    logger.info(f"Response cache: {directory} (ttl {ttl:.0f}s{', offline replay' if offline else ''})")
+    return RESPONSE_CACHE
+
+def configure_rate_limit(requests_per_second: Optional[float] = REQUESTS_PER_SECOND) -> TokenBucket:
+    """Replace the request rate limit of every upstream (0 or None: unlimited, e.g. against the mock server)"""
+    global RATE_LIMITER
+    rate = requests_per_second or 0
+    with _CONTROLS_LOCK:
+        RATE_LIMITER = TokenBucket(rate=rate, capacity=max(1, rate))
+        _RATE_LIMITERS.clear()
+    logger.info(f"Request rate limit: {f'{rate:g}/s' if rate else 'off'}")
+    return RATE_LIMITER
+
+def make_api_request(url: str, headers: Dict, auth: Tuple[str, str], params: Dict, max_retries: int = 3,
+                     session: Optional[requests.Session] = None, rate_limiter: Optional[TokenBucket] = None,
+                     circuit_breaker: Optional[CircuitBreaker] = None,
+                     cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
     """Make API request with retry logic and proper error handling"""
-    for attempt in range(max_retries):
+    import requests
+    
+    http = session or requests
+    rate_limiter = rate_limiter or RATE_LIMITER
+    circuit_breaker = circuit_breaker or CIRCUIT_BREAKER
+    cache = cache or RESPONSE_CACHE
+    
+    # fresh cached pages skip the network; stale ones are revalidated with If-None-Match / If-Modified-Since
+    cached = cache.lookup(url, params, headers) if cache else None
+    if cached is not None and cache.is_fresh(cached):
+        METRICS.increment("http_cache_hits")
+        with METRICS.timer("json_decode"):
+            return decode_json(cached.body)
+    if cache and cache.offline:
+        raise CacheMissError(f"No cached response for {url} {params} (offline mode)")
+    request_headers = dict(headers, **cached.conditional_headers()) if cached else headers
+    
+    attempt = throttled = 0
+    while True:
+        circuit_breaker.before_request()
+        rate_limiter.acquire()
+        retry_after = None
         try:
             logger.debug(f"Making API request (attempt {attempt + 1}/{max_retries}): {url}")
             logger.debug(f"Parameters: {params}")
             
-            response = requests.get(url, headers=headers, auth=auth, params=params, timeout=60)
+            request_started = time.perf_counter()
+            try:
+                response = http.get(url, headers=request_headers, auth=auth, params=params, timeout=60)
+            except requests.exceptions.RequestException:
+                METRICS.record_request(time.perf_counter() - request_started, 0, None)
+                raise
+            METRICS.record_request(time.perf_counter() - request_started, len(response.content), response.status_code)
+            if response.status_code == 304 and cached is not None:
+                # unchanged since it was cached: reuse the stored body
+                circuit_breaker.record_success()
+                cache.refresh(cached)
+                METRICS.increment("http_cache_revalidated")
+                with METRICS.timer("json_decode"):
+                    return decode_json(cached.body)
             response.raise_for_status()
             
-            data = response.json()
+            with METRICS.timer("json_decode"):
+                data = decode_json(response.content)
             logger.debug(f"API response status: {response.status_code}")
             logger.debug(f"Response keys: {list(data.keys()) if isinstance(data, dict) else 'Not a dict'}")
             
+            circuit_breaker.record_success()
+            if cache:
+                cache.store(url, params, headers, response.content, response.headers)
             return data
             
-        except requests.exceptions.Timeout as e:
-            logger.warning(f"Request timeout on attempt {attempt + 1}: {e}")
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            logger.error(f"HTTP error on attempt {attempt + 1}: {e}")
+            logger.error(f"Response content: {e.response.text[:500] if e.response is not None else 'No response'}")
+            if status not in RETRYABLE_STATUS:
+                # a deterministic client error (wrong path, bad auth, bad params) will not succeed on retry
+                raise
+            retry_after = parse_retry_after(e.response)
+            if status == 429:
+                # throttled, not down: hold back every worker (acquire waits out the pause) without
+                # tripping the breaker or using up max_retries, only the separate THROTTLE_RETRIES
+                throttled += 1
+                if throttled > THROTTLE_RETRIES:
+                    raise
+                rate_limiter.pause(backoff_delay(throttled - 1, retry_after))
+                METRICS.record_retry()
+                continue
+            circuit_breaker.record_failure()
             if attempt == max_retries - 1:
                 raise
-            time.sleep(2 ** attempt)  # exponential backoff
             
-        except requests.exceptions.HTTPError as e:
-            logger.error(f"HTTP error on attempt {attempt + 1}: {e}")
-            logger.error(f"Response content: {e.response.text if e.response else 'No response'}")
+        except requests.exceptions.Timeout as e:
+            logger.warning(f"Request timeout on attempt {attempt + 1}: {e}")
+            circuit_breaker.record_failure()
             if attempt == max_retries - 1:
                 raise
-            time.sleep(2 ** attempt)
             
         except requests.exceptions.RequestException as e:
             logger.error(f"Request error on attempt {attempt + 1}: {e}")
+            circuit_breaker.record_failure()
             if attempt == max_retries - 1:
                 raise
-            time.sleep(2 ** attempt)
             
         except ValueError as e:
             logger.error(f"JSON decode error on attempt {attempt + 1}: {e}")
             if attempt == max_retries - 1:
                 raise
-            time.sleep(2 ** attempt)
+        
+        delay = backoff_delay(attempt, retry_after)
+        METRICS.record_retry()
+        logger.info(f"Retrying in {delay:.2f}s...")
+        time.sleep(delay)
+        attempt += 1
 
 def validate_date_range(start_date: dt.date, end_date: dt.date) -> None:
     """Validate the date range is logical"""
@@ -121,8 +281,461 @@ def extract_items_from_response(data: Dict[str, Any]) -> List[Dict]:
     logger.info(f"Found {len(items)} items in response")
     return items
 
-def main():
-    """Main execution function with comprehensive error handling"""
+def get_total_count(data: Dict[str, Any]) -> Optional[int]:
+    """Read the total record count from a response, if the API reports one"""
+    if not isinstance(data, dict):
+        return None
+    
+    for key in TOTAL_COUNT_KEYS:
+        if isinstance(data.get(key), int):
+            return data[key]
+    
+    return None
+
+def get_total_pages(data: Dict[str, Any], page_size: int, items_on_page: Optional[int] = None) -> Optional[int]:
+    """Read the total page count from a response, if the API reports one"""
+    if not isinstance(data, dict):
+        return None
+    
+    for key in TOTAL_PAGES_KEYS:
+        if isinstance(data.get(key), int):
+            return data[key]
+    
+    total_count = get_total_count(data)
+    if total_count is None:
+        return None
+    
+    # divide by the page size the server actually used: the one it echoes, else a short first page
+    # with more records left (the server capped the requested size)
+    served_size = next((data[key] for key in PAGE_SIZE_KEYS if isinstance(data.get(key), int) and data[key] > 0), None)
+    if served_size is None and items_on_page and items_on_page < min(page_size, total_count):
+        served_size = items_on_page
+    if served_size is not None and served_size != page_size:
+        logger.warning(f"Server pages {served_size} records instead of the requested {page_size}")
+    return max(1, math.ceil(total_count / (served_size or page_size)))
+
+def request_target(tenant: Optional[Dict] = None) -> Tuple[str, Dict, Tuple[str, str]]:
+    """URL, headers and auth for volunteerHistory requests: the module config, or a tenant's overrides"""
+    if tenant is None:
+        return f"{BASE}/volunteerHistory", HDRS, AUTH
+    
+    headers = dict(HDRS, **{"X-VM-Customer-Code": tenant["customer_code"]})
+    auth = (tenant["username"], tenant["password"]) if tenant.get("username") else AUTH
+    return f"{tenant.get('base', BASE)}/volunteerHistory", headers, auth
+
+def request_controls(tenant: Optional[Dict] = None) -> Tuple[TokenBucket, CircuitBreaker]:
+    """Rate limiter and circuit breaker for requests of the module config, or of a tenant"""
+    if tenant is None:
+        return RATE_LIMITER, CIRCUIT_BREAKER
+    
+    # the request budget belongs to the server, so tenants on one base share a rate limiter;
+    # breakers are per tenant, so one tenant's failures never open the circuit for the others
+    base = tenant.get("base", BASE)
+    with _CONTROLS_LOCK:
+        if base == BASE:
+            rate_limiter = RATE_LIMITER
+        else:
+            rate_limiter = _RATE_LIMITERS.setdefault(
+                base, TokenBucket(rate=RATE_LIMITER.rate, capacity=RATE_LIMITER.capacity))
+        key = (base, tenant["customer_code"])
+        if key not in _CIRCUIT_BREAKERS:
+            _CIRCUIT_BREAKERS[key] = CircuitBreaker(failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+                                                    reset_timeout=CIRCUIT_RESET_TIMEOUT)
+        return rate_limiter, _CIRCUIT_BREAKERS[key]
+
+def fetch_page(session: requests.Session, params: Dict, page: int, tenant: Optional[Dict] = None,
+               controls: Optional[Tuple[TokenBucket, CircuitBreaker]] = None) -> List[Dict]:
+    """Fetch a single page of volunteer history (with request_controls(tenant) unless controls are given)"""
+    url, headers, auth = request_target(tenant)
+    rate_limiter, circuit_breaker = controls or request_controls(tenant)
+    data = make_api_request(url, headers, auth, dict(params, page=page), session=session,
+                            rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+    items = extract_items_from_response(data)
+    logger.info(f"Fetched page {page}: {len(items)} items")
+    return items
+
+def iter_volunteer_pages(session: requests.Session, params: Dict, concurrency: int = MAX_CONCURRENCY,
+                         tenant: Optional[Dict] = None,
+                         executor: Optional[ThreadPoolExecutor] = None) -> Iterator[List[Dict]]:
+    """Yield volunteer history page by page, in page order"""
+    params = dict(params)
+    first_page = params.get("page", 1)
+    url, headers, auth = request_target(tenant)
+    controls = request_controls(tenant)
+    rate_limiter, circuit_breaker = controls
+    
+    logger.info(f"Fetching page {first_page}...")
+    data = make_api_request(url, headers, auth, params, session=session,
+                            rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+    items = extract_items_from_response(data)
+    if not items:
+        logger.info("No items found on first page")
+        return
+    
+    yield items
+    total_pages = get_total_pages(data, params["pageSize"], len(items))
+    
+    if total_pages is not None:
+        # at most `concurrency` pages in flight keeps memory bounded; `executor` may be shared by several tenants
+        remaining = iter(range(first_page + 1, total_pages + 1))
+        logger.info(f"API reports {total_pages} pages; fetching the rest with concurrency {concurrency}")
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=max(1, concurrency))
+        fetched = len(items)
+        try:
+            pending = deque(executor.submit(fetch_page, session, params, page, tenant, controls)
+                            for page in islice(remaining, max(1, concurrency)))
+            while pending:
+                page_items = pending.popleft().result()
+                next_page = next(remaining, None)
+                if next_page is not None:
+                    pending.append(executor.submit(fetch_page, session, params, next_page, tenant, controls))
+                fetched += len(page_items)
+                yield page_items
+        finally:
+            if own_executor:
+                executor.shutdown(wait=True)
+        
+        total_count = get_total_count(data)
+        if total_count is not None and fetched != total_count:
+            METRICS.increment("row_count_mismatches")
+            logger.warning(f"Fetched {fetched} records but the API reported {total_count} "
+                           f"({params.get('startDate')} -> {params.get('endDate')})")
+        return
+    
+    # No total count reported: follow the pagination hints one page at a time
+    page_count = 1
+    total_items = len(items)
+    while True:
+        if data.get("hasNextPage"):
+            params["page"] += 1
+            logger.debug("Found hasNextPage=True, incrementing page")
+        elif data.get("nextPage"):
+            params["page"] = data["nextPage"]
+            logger.debug(f"Found nextPage={data['nextPage']}")
+        else:
+            logger.info("No more pages indicated, stopping pagination")
+            break
+        
+        page_count += 1
+        logger.info(f"Fetching page {page_count}...")
+        data = make_api_request(url, headers, auth, params, session=session,
+                                rate_limiter=rate_limiter, circuit_breaker=circuit_breaker)
+        items = extract_items_from_response(data)
+        if not items:
+            logger.info("No more items found, stopping pagination")
+            break
+        
+        total_items += len(items)
+        logger.info(f"Added {len(items)} items from page {page_count}. Total items: {total_items}")
+        yield items
+
+def fetch_volunteer_history(session: requests.Session, params: Dict, concurrency: int = MAX_CONCURRENCY) -> List[Dict]:
+    """Fetch all volunteer history pages into one list, in page order"""
+    rows = []
+    for items in iter_volunteer_pages(session, params, concurrency=concurrency):
+        rows.extend(items)
+    return rows
+
+def split_date_window(start_date: dt.date, end_date: dt.date, shard_by: str = "month") -> List[Tuple[dt.date, dt.date]]:
+    """Split [start_date, end_date) into month or week shards, each with an exclusive end date"""
+    if shard_by not in SHARD_BY_OPTIONS:
+        raise ValueError(f"Invalid shard_by '{shard_by}'. Use: {', '.join(SHARD_BY_OPTIONS)}")
+    
+    shards = []
+    shard_start = start_date
+    while shard_start < end_date:
+        if shard_by == "month":
+            shard_end = (shard_start.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+        else:
+            # weeks run Monday -> Monday so shards line up across runs
+            shard_end = shard_start + dt.timedelta(days=7 - shard_start.weekday())
+        shard_end = min(shard_end, end_date)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end
+    
+    return shards
+
+def scoped_cache_dir(directory: str) -> str:
+    """Subdirectory of a checkpoint / month cache directory for the configured upstream (BASE + customer code)"""
+    code = HDRS.get("X-VM-Customer-Code", "")
+    digest = hashlib.sha1(f"{BASE}|{code}".encode()).hexdigest()[:8]
+    return os.path.join(directory, f"{re.sub(r'[^A-Za-z0-9_.-]+', '_', code) or 'default'}-{digest}")
+
+def shard_checkpoint_path(checkpoint_dir: str, shard_start: dt.date, shard_end: dt.date) -> Path:
+    """Checkpoint file holding the rows of one completed shard"""
+    return Path(checkpoint_dir) / f"volunteerHistory_{shard_start:%Y-%m-%d}_{shard_end:%Y-%m-%d}.json"
+
+def load_shard_checkpoint(path: Path, fetched_after: Optional[dt.date] = None) -> Optional[List[Dict]]:
+    """Load a shard checkpoint, returning None if it is missing, unreadable or fetched before `fetched_after`"""
+    if not path.exists():
+        return None
+    
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+        rows = checkpoint["rows"]
+        if fetched_after is not None:
+            # taken while the shard was still open: it may miss later entries
+            fetched_at = dt.datetime.fromisoformat(checkpoint.get("fetchedAt") or "0001-01-01")
+            if fetched_at < dt.datetime.combine(fetched_after, dt.time()):
+                logger.info(f"Ignoring checkpoint {path}: fetched {fetched_at:%Y-%m-%d %H:%M}, "
+                            f"before the shard ended on {fetched_after}")
+                return None
+        return rows
+    except (ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+def save_shard_checkpoint(path: Path, shard_start: dt.date, shard_end: dt.date, rows: List[Dict]) -> None:
+    """Write a shard checkpoint atomically so an interrupted write never looks complete"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "startDate": shard_start.isoformat(),
+            "endDate": shard_end.isoformat(),
+            "fetchedAt": dt.datetime.now().isoformat(timespec="seconds"),
+            "rows": rows,
+        }, f)
+    os.replace(tmp_path, path)
+
+def clear_shard_checkpoints(checkpoint_dir: str, shards: List[Tuple[dt.date, dt.date]]) -> None:
+    """Remove the checkpoints of a completed run"""
+    for shard_start, shard_end in shards:
+        shard_checkpoint_path(checkpoint_dir, shard_start, shard_end).unlink(missing_ok=True)
+    
+    for directory in (Path(checkpoint_dir), Path(checkpoint_dir).parent):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass  # not empty or already gone
+    logger.info(f"Removed {len(shards)} shard checkpoints from {checkpoint_dir}")
+
+def extract_shard(session: requests.Session, shard_start: dt.date, shard_end: dt.date, checkpoint_dir: str,
+                  concurrency: int = MAX_CONCURRENCY, retries: int = SHARD_RETRIES,
+                  refresh: bool = False) -> Tuple[int, bool]:
+    """Extract one date shard, resuming from its checkpoint and retrying only this shard; returns (rows, resumed)"""
+    path = shard_checkpoint_path(checkpoint_dir, shard_start, shard_end)
+    rows = None if refresh else load_shard_checkpoint(path, fetched_after=shard_end)
+    if rows is not None:
+        logger.info(f"Shard {shard_start} -> {shard_end}: resumed {len(rows)} rows from {path}")
+        return len(rows), True
+    
+    params = {
+        "startDate": shard_start.isoformat(),
+        "endDate":   shard_end.isoformat(),
+        "page": 1,
+        "pageSize": PAGE_SIZE
+    }
+    
+    for attempt in range(retries):
+        try:
+            rows = fetch_volunteer_history(session, params, concurrency=concurrency)
+            break
+        except Exception as e:
+            logger.error(f"Shard {shard_start} -> {shard_end} failed on attempt {attempt + 1}/{retries}: {e}")
+            if attempt == retries - 1 or not is_retryable(e):
+                raise
+            time.sleep(backoff_delay(attempt))
+    
+    save_shard_checkpoint(path, shard_start, shard_end, rows)
+    logger.info(f"Shard {shard_start} -> {shard_end}: {len(rows)} rows checkpointed to {path}")
+    return len(rows), False
+
+def fetch_shards(session: requests.Session, shards: List[Tuple[dt.date, dt.date]], checkpoint_dir: str = CHECKPOINT_DIR,
+                 concurrency: int = MAX_CONCURRENCY, shard_concurrency: int = SHARD_CONCURRENCY,
+                 refresh_from: Optional[dt.date] = None) -> List[Tuple[dt.date, dt.date]]:
+    """Extract every shard into its checkpoint in parallel; returns the shards resumed from a checkpoint"""
+    # every shard is attempted even if another fails, so a rerun only fetches the shards without a checkpoint
+    with ThreadPoolExecutor(max_workers=max(1, min(shard_concurrency, len(shards)))) as executor:
+        futures = [
+            executor.submit(extract_shard, session, shard_start, shard_end, checkpoint_dir, concurrency,
+                            refresh=refresh_from is not None and shard_end > refresh_from)
+            for shard_start, shard_end in shards
+        ]
+    
+    failed, resumed = [], []
+    for shard, future in zip(shards, futures):
+        try:
+            _, from_checkpoint = future.result()
+        except Exception as e:
+            failed.append(f"{shard[0]} -> {shard[1]}: {e}")
+            continue
+        if from_checkpoint:
+            resumed.append(shard)
+    
+    if failed:
+        raise RuntimeError(f"{len(failed)} of {len(shards)} shards failed (completed shards are checkpointed "
+                           f"in {checkpoint_dir}, rerun to resume): " + "; ".join(failed))
+    return resumed
+
+def iter_shard_rows(checkpoint_dir: str, shards: List[Tuple[dt.date, dt.date]]) -> Iterator[List[Dict]]:
+    """Yield the checkpointed rows of each shard in shard order, one shard in memory at a time"""
+    for shard_start, shard_end in shards:
+        rows = load_shard_checkpoint(shard_checkpoint_path(checkpoint_dir, shard_start, shard_end))
+        rows = rows or []
+        for i in range(0, len(rows), PAGE_SIZE):
+            yield rows[i:i + PAGE_SIZE]
+
+def extract_sharded(session: requests.Session, start_date: dt.date, end_date: dt.date, shard_by: str = "month",
+                    checkpoint_dir: str = CHECKPOINT_DIR, concurrency: int = MAX_CONCURRENCY,
+                    shard_concurrency: int = SHARD_CONCURRENCY, refresh_from: Optional[dt.date] = None) -> Iterator[List[Dict]]:
+    """Extract the window shard by shard in parallel, then yield each shard's rows in shard order"""
+    shards = split_date_window(start_date, end_date, shard_by)
+    logger.info(f"Split {start_date} -> {end_date} into {len(shards)} {shard_by} shards")
+    fetch_shards(session, shards, checkpoint_dir, concurrency, shard_concurrency, refresh_from)
+    yield from iter_shard_rows(checkpoint_dir, shards)
+
+def cached_months(path: str) -> List[str]:
+    """Months (YYYY-MM) an extract served from the incremental month cache rather than the API"""
+    from volunteer_storage import read_file_metadata
+    
+    if not str(path).endswith(".parquet"):
+        return []
+    return json.loads(read_file_metadata(path).get(CACHED_MONTHS_METADATA_KEY, "[]"))
+
+def extract_window(start_date: dt.date, end_date: dt.date, parquet_out: str, concurrency: int = MAX_CONCURRENCY,
+                   session: Optional[requests.Session] = None) -> int:
+    """Page [start_date, end_date) from the API into a Parquet file, bypassing the month cache; returns the row count"""
+    from volunteer_storage import ParquetBatchSink
+    
+    params = {
+        "startDate": start_date.isoformat(),
+        "endDate":   end_date.isoformat(),
+        "page": 1,
+        "pageSize": PAGE_SIZE
+    }
+    owns_session = session is None
+    if owns_session:
+        session = create_session(pool_size=concurrency)
+    try:
+        with ParquetBatchSink(parquet_out) as sink:
+            for items in iter_volunteer_pages(session, params, concurrency=concurrency):
+                sink.write_batch(items)
+    finally:
+        if owns_session:
+            session.close()
+    logger.info(f"Fetched {start_date} -> {end_date} from the API: {sink.rows_written} rows in {parquet_out}")
+    return sink.rows_written
+
+def invalidate_cached_months(cache_dir: str, months: List[str]) -> int:
+    """Delete the cached month shards for `months` (YYYY-MM) so the next incremental run refetches them"""
+    removed = 0
+    for month in months:
+        for path in Path(cache_dir).glob(f"volunteerHistory_{month}-*_*.json"):
+            path.unlink()
+            removed += 1
+    if removed:
+        logger.info(f"Invalidated {removed} cached month shards in {cache_dir}: {', '.join(months)}")
+    return removed
+
+def refresh_cutoff(report_month: dt.date, lookback_months: int = LOOKBACK_MONTHS) -> dt.date:
+    """First day of the oldest month that is still refetched; earlier months count as closed"""
+    month = report_month.replace(day=1)
+    for _ in range(lookback_months):
+        month = (month - dt.timedelta(days=1)).replace(day=1)
+    return month
+
+def report_window(report_month: dt.date = REPORT_MONTH, start_date: dt.date = START_DATE) -> Tuple[dt.date, dt.date]:
+    """Extraction window [start_date, end_date) for a report month"""
+    # endDate must be the **first day of the next month**
+    end_date = (report_month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+    return start_date, end_date
+
+def current_report_month(today: Optional[dt.date] = None) -> dt.date:
+    """The last complete month: the month being reported on `today` (default: now)"""
+    today = today or dt.date.today()
+    return (today.replace(day=1) - dt.timedelta(days=1)).replace(day=1)
+
+def output_name(start_date: dt.date, end_date: dt.date) -> str:
+    """Base Excel file name of an extraction (the Parquet output shares it)"""
+    return f"VolunteerHistory_{start_date:%Y-%m}_to_{(end_date - dt.timedelta(days=1)):%Y-%m}.xlsx"
+
+def load_tenants(path: str) -> List[Dict]:
+    """Load tenant configs from a JSON list (customer_code, optional base/username/password/max_concurrency)"""
+    with open(path) as f:
+        tenants = json.load(f)
+    
+    if not isinstance(tenants, list):
+        raise ValueError(f"{path} must contain a JSON list of tenant configs")
+    for i, tenant in enumerate(tenants):
+        if not isinstance(tenant, dict) or not tenant.get("customer_code"):
+            raise ValueError(f"Tenant #{i + 1} in {path} has no customer_code")
+        placeholders = [key for key in ("customer_code", "username", "password") if "<" in str(tenant.get(key, ""))]
+        if placeholders:
+            raise ValueError(f"Tenant #{i + 1} in {path} still has placeholder values for: {', '.join(placeholders)}")
+    
+    logger.info(f"Loaded {len(tenants)} tenants from {path}")
+    return tenants
+
+def extract_tenant(session: requests.Session, executor: ThreadPoolExecutor, tenant: Dict, start_date: dt.date,
+                   end_date: dt.date, output_dir: str = BATCH_OUTPUT_DIR) -> Dict[str, Any]:
+    """Extract one tenant's window into <output_dir>/<customer_code>/, reporting instead of raising on failure"""
+    from volunteer_storage import ParquetBatchSink
+    
+    code = tenant["customer_code"]
+    parquet_out = Path(output_dir) / code / output_name(start_date, end_date).replace('.xlsx', '.parquet')
+    params = {
+        "startDate": start_date.isoformat(),
+        "endDate":   end_date.isoformat(),
+        "page": 1,
+        "pageSize": PAGE_SIZE
+    }
+    
+    started = time.monotonic()
+    try:
+        with ParquetBatchSink(str(parquet_out)) as sink:
+            for items in iter_volunteer_pages(session, params, tenant.get("max_concurrency", TENANT_CONCURRENCY),
+                                              tenant=tenant, executor=executor):
+                sink.write_batch(items)
+    except Exception as e:
+        logger.error(f"[{code}] extraction failed: {e}")
+        return {"customer_code": code, "ok": False, "rows": 0, "path": None, "error": str(e)}
+    
+    seconds = time.monotonic() - started
+    logger.info(f"[{code}] saved {parquet_out} | rows: {sink.rows_written} | {seconds:.1f}s")
+    return {"customer_code": code, "ok": True, "rows": sink.rows_written,
+            "path": str(parquet_out) if sink.rows_written else None, "seconds": round(seconds, 2)}
+
+def run_batch(tenants: List[Dict], report_month: dt.date = REPORT_MONTH, start_date: dt.date = START_DATE,
+              output_dir: str = BATCH_OUTPUT_DIR, batch_concurrency: int = BATCH_CONCURRENCY,
+              parallel_tenants: int = PARALLEL_TENANTS) -> List[Dict[str, Any]]:
+    """Refresh many associations in one process over one pooled session and page scheduler"""
+    start_date, end_date = report_window(report_month, start_date)
+    validate_date_range(start_date, end_date)
+    logger.info(f"Batch extraction of {len(tenants)} tenants, {start_date} -> {end_date}")
+    
+    session = create_session(pool_size=batch_concurrency)
+    # Tenant drivers wait on page futures, so they get their own pool to avoid starving the page workers
+    with ThreadPoolExecutor(max_workers=batch_concurrency) as page_executor, \
+            ThreadPoolExecutor(max_workers=max(1, parallel_tenants)) as tenant_executor:
+        try:
+            futures = [
+                tenant_executor.submit(extract_tenant, session, page_executor, tenant, start_date, end_date, output_dir)
+                for tenant in tenants
+            ]
+            results = [future.result() for future in futures]
+        finally:
+            session.close()
+    
+    failed = [result["customer_code"] for result in results if not result["ok"]]
+    logger.info(f"Batch done: {len(results) - len(failed)} succeeded, {len(failed)} failed"
+                + (f" ({', '.join(failed)})" if failed else ""))
+    return results
+
+def main(concurrency: int = MAX_CONCURRENCY, shard_by: Optional[str] = None, checkpoint_dir: str = CHECKPOINT_DIR,
+         shard_concurrency: int = SHARD_CONCURRENCY, incremental: bool = False, cache_dir: str = CACHE_DIR,
+         lookback_months: int = LOOKBACK_MONTHS, excel: bool = False, run_report: bool = True,
+         profile_dir: Optional[str] = None, report_month: dt.date = REPORT_MONTH, start_date: dt.date = START_DATE,
+         session: Optional[requests.Session] = None):
+    """Main execution function with comprehensive error handling; returns the Parquet output path"""
+    from volunteer_storage import ParquetBatchSink, export_csv, export_excel
+    
+    METRICS.reset()
+    if profile_dir:
+        METRICS.enable_profiling(profile_dir)
     try:
         logger.info("Starting volunteer history extraction...")
         
@@ -130,11 +743,7 @@ def main():
         validate_config()
         
         # ---- date window: Jan 1, 2025 -> first day of month being reported ----
-        report_month = dt.date(2025, 8, 1)   # example: August report
-        start_date   = dt.date(2025, 1, 1)
-        # endDate must be the **first day of the next month**
-        next_month = (report_month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
-        end_date = next_month  # e.g., 2025-09-01
+        start_date, end_date = report_window(report_month, start_date)  # e.g., 2025-01-01 -> 2025-09-01
         
         # Validate date range
         validate_date_range(start_date, end_date)
@@ -143,124 +752,97 @@ def main():
             "startDate": start_date.isoformat(),
             "endDate":   end_date.isoformat(),
             "page": 1,
-            "pageSize": 1000
+            "pageSize": PAGE_SIZE
         }
         
         logger.info(f"Starting data extraction with parameters: {params}")
         
-        rows = []
-        page_count = 0
+        # incremental: closed months come from the month cache, only the report month
+        # and the lookback months before it are refetched
+        refresh_from = None
+        if incremental:
+            shard_by = "month"
+            checkpoint_dir = cache_dir
+            refresh_from = refresh_cutoff(report_month, lookback_months)
+        # checkpoints and cached months belong to one upstream (BASE + customer code)
+        checkpoint_dir = scoped_cache_dir(checkpoint_dir)
+        if incremental:
+            logger.info(f"Incremental mode: months before {refresh_from} are served from {checkpoint_dir}")
         
-        while True:
-            page_count += 1
-            logger.info(f"Fetching page {page_count}...")
-            
-            try:
-                data = make_api_request(f"{BASE}/volunteerHistory", HDRS, AUTH, params)
-                items = extract_items_from_response(data)
-                
-                if not items:
-                    logger.info("No more items found, stopping pagination")
-                    break
-                
-                rows.extend(items)
-                logger.info(f"Added {len(items)} items from page {page_count}. Total items: {len(rows)}")
-                
-                # pagination handling: adapt to your API (examples below)
-                if data.get("hasNextPage"):
-                    params["page"] += 1
-                    logger.debug("Found hasNextPage=True, incrementing page")
-                elif data.get("nextPage"):
-                    params["page"] = data["nextPage"]
-                    logger.debug(f"Found nextPage={data['nextPage']}")
+        # Output files for your dashboard pipeline
+        out = output_name(start_date, end_date)
+        parquet_out = out.replace('.xlsx', '.parquet')
+        
+        owns_session = session is None
+        if owns_session:
+            session = create_session(pool_size=concurrency * shard_concurrency if shard_by else concurrency)
+        try:
+            with METRICS.stage("extract"):
+                metadata = None
+                if shard_by:
+                    shards = split_date_window(start_date, end_date, shard_by)
+                    logger.info(f"Split {start_date} -> {end_date} into {len(shards)} {shard_by} shards")
+                    resumed = fetch_shards(session, shards, checkpoint_dir, concurrency=concurrency,
+                                           shard_concurrency=shard_concurrency, refresh_from=refresh_from)
+                    if incremental:
+                        # snapshot_diff needs to know which months were not fetched from the API this time
+                        metadata = {CACHED_MONTHS_METADATA_KEY: json.dumps([f"{start:%Y-%m}" for start, _ in resumed])}
+                    batches = iter_shard_rows(checkpoint_dir, shards)
                 else:
-                    logger.info("No more pages indicated, stopping pagination")
-                    break
-                    
-            except Exception as e:
-                logger.error(f"Error processing page {page_count}: {e}")
-                raise
+                    batches = iter_volunteer_pages(session, params, concurrency=concurrency)
+                
+                # Each page batch is normalized and appended to the Parquet sink as it arrives
+                with ParquetBatchSink(parquet_out, metadata=metadata) as sink:
+                    for items in batches:
+                        sink.write_batch(items)
+        except Exception as e:
+            logger.error(f"Error fetching volunteer history: {e}")
+            raise
+        finally:
+            if owns_session:
+                session.close()
         
-        if not rows:
+        if sink.rows_written == 0:
             logger.warning("No data retrieved! Check your API configuration and date range.")
             sys.exit(1)
         
-        logger.info(f"Total rows retrieved: {len(rows)}")
+        logger.info(f"Total rows retrieved: {sink.rows_written}")
+        logger.info(f"Successfully saved: {parquet_out} | rows: {sink.rows_written}")
+        print(f"Saved: {parquet_out}  |  rows: {sink.rows_written}")
         
-        # Create DataFrame with error handling
-        try:
-            df = pd.DataFrame(rows)
-            logger.info(f"DataFrame created with shape: {df.shape}")
-            if not df.empty:
-                logger.info(f"DataFrame columns: {list(df.columns)}")
-                logger.debug(f"Sample data (first 3 rows):\n{df.head(3).to_string()}")
-        except Exception as e:
-            logger.error(f"Error creating DataFrame: {e}")
-            raise
-        
-        # Optional: select/rename the columns you need
-        # df = df[["volunteerName","project","hours","startDate","endDate", ...]]
+        # Optional Excel copy for the dashboard, streamed from the Parquet sink
+        if excel:
+            try:
+                with METRICS.stage("excel_export"):
+                    row_count = export_excel(parquet_out, out)
+                logger.info(f"Successfully saved: {out} | rows: {row_count}")
+                print(f"Saved: {out}  |  rows: {row_count}")
+            except Exception as e:
+                logger.error(f"Error saving to Excel: {e}")
+                # Fallback to CSV
+                csv_out = out.replace('.xlsx', '.csv')
+                export_csv(parquet_out, csv_out)
+                logger.info(f"Saved as CSV instead: {csv_out}")
         
-        # Save to Excel for your dashboard pipeline
-        out = f"VolunteerHistory_{start_date:%Y-%m}_to_{(end_date - dt.timedelta(days=1)):%Y-%m}.xlsx"
+        # The merged output is written, so the shard checkpoints are no longer needed
+        # (the incremental cache is kept for the next run)
+        if shard_by and not incremental:
+            clear_shard_checkpoints(checkpoint_dir, split_date_window(start_date, end_date, shard_by))
         
-        try:
-            df.to_excel(out, index=False)
-            logger.info(f"Successfully saved: {out} | rows: {len(df)}")
-            print(f"Saved: {out}  |  rows: {len(df)}")
-        except Exception as e:
-            logger.error(f"Error saving to Excel: {e}")
-            # Fallback to CSV
-            csv_out = out.replace('.xlsx', '.csv')
-            df.to_csv(csv_out, index=False)
-            logger.info(f"Saved as CSV instead: {csv_out}")
+        if run_report:
+            METRICS.write_report(parquet_out.replace('.parquet', '.run_report.json'))
+        return parquet_out
             
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
         sys.exit(1)
+    except (CircuitOpenError, CacheMissError) as e:
+        logger.error(f"Stopping the run: {e}")
+        sys.exit(1)
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         raise
 
 if __name__ == "__main__":
+    setup_logging()
     main()
-    
-# ---- Date window: Jan 1, 2025 -> first day of the month AFTER report month ----
-report_month = dt.date(2025, 8, 1)   # Example: August 2025
-start_date   = dt.date(2025, 1, 1)
-end_date     = (report_month.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
-
-params = {
-    "startDate": start_date.isoformat(),
-    "endDate":   end_date.isoformat(),
-    "page": 1,
-    "pageSize": 1000
-}
-
-rows = []
-while True:
-    url = f"{BASE}/volunteerHistory"
-    r = requests.get(url, headers=HDRS, auth=AUTH, params=params, timeout=60)
-    print(f"Requesting: {r.url}")
-    print("Status:", r.status_code)
-    if not r.ok:
-        raise SystemExit(f"❌ {r.status_code} {r.reason}: {r.text}")
-
-    data = r.json()
-    items = data.get("items") or data.get("results") or data
-    if not items:
-        break
-    rows.extend(items)
-
-    if data.get("hasNextPage"):
-        params["page"] += 1
-    elif data.get("nextPage"):
-        params["page"] = data["nextPage"]
-    else:
-        break
-
-# ---- Save to Excel ----
-df = pd.DataFrame(rows)
-out = f"VolunteerHistory_{start_date:%Y-%m}_to_{(end_date - dt.timedelta(days=1)):%Y-%m}.xlsx"
-df.to_excel(out, index=False)
-print(f"✅ Saved: {out} | rows: {len(df)}")
\ No newline at end of file
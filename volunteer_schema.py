@@ -0,0 +1,267 @@
+import ast
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = "1"
+
+# Scalar columns flattened out of each record's nested assignment object
+# (assignment -> contact, assignment -> need -> project -> branch)
+ASSIGNMENT_COLUMNS = {
+    "assignmentId": "Int64",
+    "contactId": "Int64",
+    "contactEmail": "string",
+    "contactName": "string",
+    "needId": "Int64",
+    "needName": "string",
+    "needType": "string",
+    "projectId": "Int64",
+    "projectName": "string",
+    "branchId": "Int64",
+    "branchCode": "string",
+    "branchName": "string",
+    "branchTimeZone": "string",
+}
+
+# pandas dtypes of the flattened volunteer history frame
+VOLUNTEER_HISTORY_COLUMNS = {
+    "volunteerDate": "datetime64[ns]",
+    "volunteerComments": "string",
+    "creditedHours": "float64",
+    "manuallyReported": "boolean",
+    **ASSIGNMENT_COLUMNS,
+}
+
+# Labels repeated on every row of the same contact / need / project / branch. In
+# compact frames they are categoricals: each distinct value is stored once and
+# rows hold small integer codes, so they cost a few bytes per row instead of a string.
+CATEGORY_COLUMNS = [
+    "contactEmail", "contactName", "needName", "needType",
+    "projectName", "branchCode", "branchName", "branchTimeZone",
+]
+
+# Star schema: dimension table -> (id column, attributes that depend only on that id)
+DIMENSIONS = {
+    "contacts": ("contactId", ["contactEmail", "contactName"]),
+    "needs": ("needId", ["needName", "needType"]),
+    "projects": ("projectId", ["projectName"]),
+    "branches": ("branchId", ["branchCode", "branchName", "branchTimeZone"]),
+}
+
+# Top-level record fields kept as-is; everything else comes from the nested assignment
+RECORD_COLUMNS = ["volunteerDate", "volunteerComments", "creditedHours", "manuallyReported"]
+
+# Typed on-disk schema shared by the extractor output and data_preparation
+VOLUNTEER_HISTORY_SCHEMA = pa.schema(
+    [
+        pa.field("volunteerDate", pa.date32()),
+        pa.field("volunteerComments", pa.string()),
+        pa.field("creditedHours", pa.float64()),
+        pa.field("manuallyReported", pa.bool_()),
+    ]
+    + [pa.field(name, pa.int64() if dtype == "Int64" else pa.string()) for name, dtype in ASSIGNMENT_COLUMNS.items()],
+    metadata={"volunteer_history_schema_version": SCHEMA_VERSION},
+)
+
+def parse_assignment(value: Any) -> Optional[Dict]:
+    """Return an assignment as a dict, parsing the JSON / Python-repr text older extracts stored"""
+    if isinstance(value, dict):
+        return value
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        return json.loads(value)
+    except ValueError:
+        pass
+    try:
+        # Excel extracts written from a DataFrame hold the dict's repr
+        parsed = ast.literal_eval(value)
+        return parsed if isinstance(parsed, dict) else None
+    except (ValueError, SyntaxError):
+        return None
+
+def _assignment_fields(assignment: Optional[Dict]) -> tuple:
+    """Pull the ASSIGNMENT_COLUMNS values out of one assignment, walking each level once"""
+    if not assignment:
+        return (None,) * len(ASSIGNMENT_COLUMNS)
+
+    contact = assignment.get("contact") or {}
+    name = contact.get("name") or {}
+    need = assignment.get("need") or {}
+    project = need.get("project") or {}
+    branch = project.get("branch") or {}
+
+    full_name = " ".join(part for part in (name.get("first"), name.get("last")) if part)
+    return (
+        assignment.get("id"),
+        contact.get("id"),
+        contact.get("email"),
+        full_name or None,
+        need.get("id"),
+        need.get("name"),
+        need.get("needType"),
+        project.get("id"),
+        project.get("name"),
+        branch.get("id"),
+        branch.get("code"),
+        branch.get("name"),
+        branch.get("timeZoneId"),
+    )
+
+def flatten_assignments(assignments: List[Any]) -> pd.DataFrame:
+    """Flatten a sequence of nested assignments into typed scalar columns in one batched pass"""
+    values = [_assignment_fields(parse_assignment(assignment)) for assignment in assignments]
+    flat = pd.DataFrame.from_records(values, columns=list(ASSIGNMENT_COLUMNS))
+    for col, dtype in ASSIGNMENT_COLUMNS.items():
+        if dtype == "Int64" and flat[col].dtype == object:
+            # ids sent as strings ("4711"); anything that is not a number becomes missing
+            flat[col] = pd.to_numeric(flat[col], errors="coerce")
+    return flat.astype(ASSIGNMENT_COLUMNS)
+
+def flatten_assignment_column(df: pd.DataFrame) -> pd.DataFrame:
+    """Replace the nested 'assignment' column of a frame with its flattened scalar columns"""
+    if "assignment" not in df.columns:
+        return df
+
+    flat = flatten_assignments(df["assignment"].tolist())
+    flat.index = df.index
+    unparsed = int(flat["assignmentId"].isna().sum() - df["assignment"].isna().sum())
+    if unparsed > 0:
+        logger.warning(f"Could not parse the assignment of {unparsed} rows")
+
+    position = df.columns.get_loc("assignment")
+    df = df.drop(columns="assignment")
+    return pd.concat([df.iloc[:, :position], flat, df.iloc[:, position:]], axis=1)
+
+def flatten_volunteer_records(items: List[Dict]) -> pd.DataFrame:
+    """Turn a batch of API records into a flat DataFrame with typed id/name columns"""
+    return flatten_assignment_column(pd.DataFrame(items))
+
+def project_record_columns(items: List[Dict]) -> Dict[str, list]:
+    """Project API records straight into one value list per schema column
+
+    Each record is walked once and only the fields the pipeline uses are
+    kept; no intermediate DataFrame or flattened dicts are built.
+    """
+    rows = [
+        tuple(item.get(col) for col in RECORD_COLUMNS) + _assignment_fields(parse_assignment(item.get("assignment")))
+        for item in items
+    ]
+    names = RECORD_COLUMNS + list(ASSIGNMENT_COLUMNS)
+    if not rows:
+        return {name: [] for name in names}
+    return {name: list(values) for name, values in zip(names, zip(*rows))}
+
+def _date_array(values: list) -> pa.Array:
+    """ISO date / datetime strings -> date32 (raises if a value does not parse cleanly)"""
+    timestamps = pc.cast(pa.array(values, type=pa.string()), pa.timestamp("s"))
+    return pc.cast(timestamps, pa.date32())
+
+def records_to_arrow(items: List[Dict], schema: pa.Schema = VOLUNTEER_HISTORY_SCHEMA) -> pa.Table:
+    """Build the on-disk table for a batch of API records without going through pandas
+
+    Fields outside the projected columns are read from the top level of each
+    record, as the DataFrame path would. Raises pa.ArrowInvalid / pa.ArrowTypeError when a value does not fit its
+    column type (e.g. a string id); callers fall back to the pandas path,
+    which coerces such values.
+    """
+    columns = project_record_columns(items)
+    arrays = []
+    for field in schema:
+        values = columns.get(field.name)
+        if values is None:
+            values = [item.get(field.name) for item in items]
+        if pa.types.is_date32(field.type):
+            arrays.append(_date_array(values))
+        else:
+            arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Date / datetime values -> datetime64, unparseable ones as NaT
+
+    ISO strings are parsed row by row rather than in the format inferred from
+    the first row, so a batch mixing '2025-03-04' and '2025-03-04T10:15:00'
+    keeps both, as records_to_arrow does; other formats (legacy Excel text)
+    are parsed element-wise.
+    """
+    dates = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return dates
+
+def month_labels(dates: pd.Series) -> pd.Series:
+    """'YYYY-MM' label of each date (None for missing ones)
+
+    Same result as dates.dt.strftime('%Y-%m'), but only the distinct months
+    are formatted, which matters at hundreds of thousands of rows.
+    """
+    months = dates.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    uniques, inverse = np.unique(months, return_inverse=True)
+    labels = np.datetime_as_string(uniques, unit="M").astype(object)
+    labels[np.isnat(uniques)] = None
+    return pd.Series(labels[inverse], index=dates.index)
+
+def apply_volunteer_dtypes(df: pd.DataFrame, compact: bool = False) -> pd.DataFrame:
+    """Cast the known volunteer history columns to their typed dtypes (dates parsed, nullable ids)
+
+    compact=True holds the CATEGORY_COLUMNS labels as categoricals.
+    """
+    df = df.copy()
+    for col, dtype in VOLUNTEER_HISTORY_COLUMNS.items():
+        if col not in df.columns:
+            continue
+        if compact and col in CATEGORY_COLUMNS:
+            df[col] = df[col].astype("category")
+        elif dtype.startswith("datetime64"):
+            df[col] = parse_dates(df[col])
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+def split_dimensions(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """Split a flattened frame into a fact table and the DIMENSIONS tables
+
+    The fact table keeps the record fields and every id column; each
+    dimension table has one row per distinct id with its attributes (the
+    first value seen, as the cube does for labels). join_dimensions() puts
+    the labels back.
+    """
+    attributes = [attr for _, attrs in DIMENSIONS.values() for attr in attrs]
+    facts = df.drop(columns=[col for col in attributes if col in df.columns])
+    dimensions = {name: dimension_table(df, name) for name, (id_col, _) in DIMENSIONS.items() if id_col in df.columns}
+    return facts, dimensions
+
+def dimension_table(df: pd.DataFrame, name: str) -> pd.DataFrame:
+    """One DIMENSIONS table: each distinct id of the frame with its attributes, sorted by id"""
+    id_col, attrs = DIMENSIONS[name]
+    attrs = [attr for attr in attrs if attr in df.columns]
+    table = df[[id_col] + attrs].dropna(subset=[id_col]).drop_duplicates(subset=id_col)
+    for attr in attrs:
+        if isinstance(table[attr].dtype, pd.CategoricalDtype):
+            table[attr] = table[attr].cat.remove_unused_categories()
+    return table.sort_values(id_col, ignore_index=True)
+
+def join_dimensions(facts: pd.DataFrame, dimensions: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Denormalize a fact table back into the flattened column layout"""
+    df = facts.copy()
+    for name, table in dimensions.items():
+        id_col = DIMENSIONS[name][0]
+        labels = table.set_index(id_col).reindex(df[id_col])
+        for attr in labels.columns:
+            df[attr] = labels[attr].to_numpy()
+    order = [col for col in VOLUNTEER_HISTORY_COLUMNS if col in df.columns]
+    return df[order + [col for col in df.columns if col not in order]]
+
+def to_arrow_table(df: pd.DataFrame, schema: pa.Schema = VOLUNTEER_HISTORY_SCHEMA) -> pa.Table:
+    """Conform a flattened frame to the on-disk schema; missing columns are written as nulls"""
+    df = apply_volunteer_dtypes(df.reindex(columns=schema.names))
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from pipeline_metrics import METRICS
+from volunteer_schema import (
+    CATEGORY_COLUMNS,
+    VOLUNTEER_HISTORY_SCHEMA,
+    apply_volunteer_dtypes,
+    flatten_volunteer_records,
+    records_to_arrow,
+    to_arrow_table,
+)
+
+logger = logging.getLogger(__name__)
+
+PARQUET_BATCH_SIZE = 65536   # rows per batch when reading a sink back lazily
+
+def normalize_batch(items: List[Dict]) -> pd.DataFrame:
+    """Turn one page of API records into a flat DataFrame
+
+    The nested 'assignment' object is flattened into typed id/name columns;
+    any other nested value is stored as JSON text so every row group of the
+    sink shares the same flat schema.
+    """
+    df = flatten_volunteer_records(items)
+    for col in df.columns:
+        if df[col].map(lambda value: isinstance(value, (dict, list))).any():
+            df[col] = df[col].map(
+                lambda value: json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value
+            )
+    return df
+
+def infer_sink_schema(df: pd.DataFrame) -> pa.Schema:
+    """Infer the sink schema from the first batch, widened so later pages still fit"""
+    fields = []
+    for field in pa.Schema.from_pandas(df, preserve_index=False):
+        if pa.types.is_null(field.type):
+            field = field.with_type(pa.string())   # all-empty in the first page
+        elif pa.types.is_integer(field.type) and not pd.api.types.is_extension_array_dtype(df[field.name]):
+            # raw JSON numbers, e.g. creditedHours: 2 on one page, 1.5 on the next
+            # (the flattened Int64 id columns keep their integer type)
+            field = field.with_type(pa.float64())
+        fields.append(field)
+    return pa.schema(fields)
+
+class ParquetBatchSink:
+    """Append page batches to a Parquet file as they arrive, one row group per batch
+
+    Batches are conformed to `schema` (the typed volunteer history schema by
+    default; pass None to infer one from the first batch). `metadata` is
+    stored as key-value metadata of the file. The file is written under a
+    temporary name and moved into place on a clean close, so a failed
+    extraction never leaves a truncated output.
+    """
+
+    def __init__(self, path: str, schema: Optional[pa.Schema] = VOLUNTEER_HISTORY_SCHEMA,
+                 metadata: Optional[Dict[str, str]] = None):
+        self.path = Path(path)
+        self.schema = schema
+        self.metadata = metadata
+        self.rows_written = 0
+        self.batches_written = 0
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._writer = None
+        self._dropped_columns = set()
+
+    def write_batch(self, items: List[Dict]) -> int:
+        """Normalize one batch of records and append it as a row group
+
+        With a known schema the records are projected straight into Arrow
+        columns; the pandas path is used to infer a schema, or for a batch
+        whose values need coercing (e.g. ids sent as strings).
+        """
+        if not items:
+            return 0
+
+        table = None
+        if self.schema is not None:
+            self._check_columns(set(items[0]) - {"assignment"})
+            with METRICS.timer("to_arrow"):
+                try:
+                    table = records_to_arrow(items, self.schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError) as e:
+                    logger.debug(f"Falling back to the DataFrame path for this batch: {e}")
+
+        if table is None:
+            with METRICS.timer("normalize"):
+                df = normalize_batch(items)
+            if self.schema is None:
+                self.schema = infer_sink_schema(apply_volunteer_dtypes(df))
+            self._check_columns(set(df.columns))
+
+            with METRICS.timer("to_arrow"):
+                table = to_arrow_table(df, self.schema)
+
+        with METRICS.timer("parquet_write"):
+            if self._writer is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                schema = self.schema
+                if self.metadata:
+                    schema = schema.with_metadata({**(schema.metadata or {}), **self.metadata})
+                self._writer = pq.ParquetWriter(self._tmp_path, schema)
+            self._writer.write_table(table)
+
+        self.rows_written += table.num_rows
+        self.batches_written += 1
+        return table.num_rows
+
+    def _check_columns(self, columns) -> None:
+        """Warn once about record fields the sink schema has no column for"""
+        extra = columns - set(self.schema.names) - self._dropped_columns
+        if extra:
+            logger.warning(f"Dropping columns not in the sink schema: {sorted(extra)}")
+            self._dropped_columns |= extra
+
+    def close(self) -> None:
+        """Finish the file and move it into place"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._tmp_path, self.path)
+            logger.info(f"Sink {self.path}: {self.rows_written} rows in {self.batches_written} row groups")
+
+    def abort(self) -> None:
+        """Discard a partially written file"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+def write_parquet(df: pd.DataFrame, path: str, schema: pa.Schema = VOLUNTEER_HISTORY_SCHEMA,
+                  metadata: Optional[Dict[str, str]] = None) -> None:
+    """Write a whole flattened frame as Parquet with the typed schema, plus optional key-value metadata"""
+    table = to_arrow_table(df, schema)
+    if metadata:
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+    pq.write_table(table, path)
+
+def read_file_metadata(path: str) -> Dict[str, str]:
+    """Key-value metadata of a Parquet file (Arrow's own schema entry left out)"""
+    metadata = pq.read_metadata(path).metadata or {}
+    return {key.decode(): value.decode() for key, value in metadata.items() if not key.startswith(b"ARROW:")}
+
+def read_parquet(path: str, columns: Optional[List[str]] = None, filters: Optional[List] = None) -> pd.DataFrame:
+    """Read a Parquet file back into a compact frame with the typed volunteer history dtypes
+
+    `filters` (pyarrow DNF, e.g. [('assignmentId', '==', 42)]) are applied while reading.
+    The CATEGORY_COLUMNS labels are dictionary-decoded straight into categoricals,
+    so the repeated strings are never materialized per row.
+    """
+    df = pd.read_parquet(path, columns=columns, filters=filters, read_dictionary=CATEGORY_COLUMNS)
+    return apply_volunteer_dtypes(df, compact=True)
+
+def iter_parquet_batches(path: str, batch_size: int = PARQUET_BATCH_SIZE,
+                         columns: Optional[List[str]] = None) -> Iterator[pd.DataFrame]:
+    """Read a Parquet file lazily as a sequence of compact, typed DataFrames"""
+    parquet_file = pq.ParquetFile(path, read_dictionary=CATEGORY_COLUMNS)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, columns=columns):
+        yield apply_volunteer_dtypes(batch.to_pandas(), compact=True)
+
+def export_excel(parquet_path: str, excel_path: str) -> int:
+    """Stream a Parquet sink into an Excel workbook without loading it all into memory"""
+    parquet_file = pq.ParquetFile(parquet_path)
+    return write_excel(parquet_file.schema_arrow.names, parquet_file.iter_batches(batch_size=PARQUET_BATCH_SIZE),
+                       excel_path)
+
+def write_excel(names: List[str], batches: Iterable[pa.RecordBatch], excel_path: str) -> int:
+    """Write Arrow record batches to a write-only Excel workbook, one batch in memory at a time"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(list(names))
+
+    row_count = 0
+    for batch in batches:
+        for row in zip(*(column.to_pylist() for column in batch.columns)):
+            sheet.append(list(row))
+            row_count += 1
+
+    workbook.save(excel_path)
+    return row_count
+
+def export_csv(parquet_path: str, csv_path: str) -> int:
+    """Stream a Parquet sink into a CSV file batch by batch"""
+    row_count = 0
+    for i, df in enumerate(iter_parquet_batches(parquet_path)):
+        df.to_csv(csv_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+        row_count += len(df)
+    return row_count
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""Single entry point for the volunteer reporting pipeline
+
+    python ymca_pipeline.py validate                      # config + report window, no network
+    python ymca_pipeline.py extract --incremental --excel
+    python ymca_pipeline.py extract --tenants tenants.json --report-month 2025-08
+    python ymca_pipeline.py extract --http-cache http_cache --offline   # replay cached pages
+    python ymca_pipeline.py prepare --excel
+    python ymca_pipeline.py prepare --chunked             # out of core, for multi-year histories
+    python ymca_pipeline.py prepare --rules adjustment_rules.json   # manual adjustments + branch credits
+    python ymca_pipeline.py report                        # summary from the latest Raw Data
+    python ymca_pipeline.py report --by branch --workers 4   # one report + export per branch, in parallel
+    python ymca_pipeline.py diff                          # changes between the two newest extracts
+    python ymca_pipeline.py diff --refetch --invalidate-cache   # closed months of the newest extract vs the API
+    python ymca_pipeline.py serve --rules adjustment_rules.json   # scheduled refreshes + local JSON endpoint
+
+Extracts made with --incremental take closed months from the month cache, so
+two of them never differ there; `diff --refetch` downloads the closed months
+again to find retroactive edits, and --invalidate-cache drops the changed
+months from the cache so the next incremental extract picks them up.
+
+Only argparse is imported up front; each subcommand imports the modules it
+needs (pandas, pyarrow and requests are never loaded for validate or --help).
+"""
+import argparse
+import datetime as dt
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+# extract options of a single run that batch mode (--tenants) does not support, and the batch-only ones
+SINGLE_EXTRACT_OPTIONS = {
+    "concurrency": "--concurrency", "shard_by": "--shard-by", "shard_concurrency": "--shard-concurrency",
+    "checkpoint_dir": "--checkpoint-dir", "incremental": "--incremental", "cache_dir": "--cache-dir",
+    "lookback_months": "--lookback-months", "excel": "--excel", "profile_dir": "--profile-dir",
+    "run_report": "--no-run-report",
+}
+BATCH_EXTRACT_OPTIONS = {
+    "output_dir": "--output-dir", "batch_concurrency": "--batch-concurrency", "parallel_tenants": "--parallel-tenants",
+}
+
+def parse_month(value: str) -> dt.date:
+    """'2025-08' -> date(2025, 8, 1)"""
+    try:
+        return dt.datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got '{value}'")
+
+def run_validate(args) -> int:
+    import volunteer_history_extractor as extractor
+
+    extractor.setup_logging(log_file=None)
+    extractor.validate_config()
+    start_date, end_date = extractor.report_window(args.report_month or extractor.REPORT_MONTH)
+    extractor.validate_date_range(start_date, end_date)
+    if args.tenants:
+        try:
+            extractor.load_tenants(args.tenants)
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid tenants file: {e}")
+            return 1
+    if args.rules and not check_rules(args.rules):
+        return 1
+    return 0
+
+def check_rules(path: str) -> bool:
+    from adjustment_rules import load_rules
+
+    try:
+        load_rules(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Invalid rules file: {e}")
+        return False
+    return True
+
+def run_extract(args) -> int:
+    import volunteer_history_extractor as extractor
+
+    extractor.setup_logging()
+    options = vars(args)
+    report_month = options.pop("report_month", None) or extractor.REPORT_MONTH
+    tenants_file = options.pop("tenants", None)
+    batch_options = {key: options.pop(key) for key in ("output_dir", "batch_concurrency", "parallel_tenants")
+                     if key in options}
+    cache_dir = options.pop("http_cache", None)
+    cache_ttl = options.pop("http_cache_ttl", None)
+    offline = options.pop("offline", False)
+    if "requests_per_second" in options:
+        extractor.configure_rate_limit(options.pop("requests_per_second"))
+    if cache_dir or offline:
+        from response_cache import HTTP_CACHE_DIR, HTTP_CACHE_TTL
+        extractor.configure_response_cache(cache_dir or HTTP_CACHE_DIR,
+                                           ttl=HTTP_CACHE_TTL if cache_ttl is None else cache_ttl, offline=offline)
+
+    if tenants_file:
+        results = extractor.run_batch(extractor.load_tenants(tenants_file), report_month=report_month,
+                                      **batch_options)
+        return 0 if all(result["ok"] for result in results) else 1
+
+    extractor.main(report_month=report_month, **options)
+    return 0
+
+def run_prepare(args) -> int:
+    import data_preparation
+
+    data_preparation.setup_logging()
+    if args.rules and not check_rules(args.rules):
+        return 1
+    result = data_preparation.main(export_excel=args.excel, output_dir=args.output_dir, profile_dir=args.profile_dir,
+                                   chunked=args.chunked, batch_size=args.batch_size, rules_file=args.rules)
+    return 0 if result is not None else 1
+
+def run_report(args) -> int:
+    import data_preparation
+
+    data_preparation.setup_logging()
+    if args.rules and not check_rules(args.rules):
+        return 1
+    if args.by is None:
+        return 0 if data_preparation.rebuild_report(args.output_dir, rules_file=args.rules) else 1
+
+    from group_reports import generate_group_reports
+    data_file, _ = data_preparation.latest_report_data(args.output_dir, rules_file=args.rules)
+    if data_file is None:
+        logger.error(f"No Raw_Data_*.parquet found in {args.output_dir} - run the prepare step first")
+        return 1
+    results = generate_group_reports(data_file, by=args.by, output_dir=args.output_dir, formats=args.formats,
+                                     max_workers=args.workers)
+    return 0 if results else 1
+
+def run_diff(args) -> int:
+    import os
+    from pathlib import Path
+
+    import data_preparation
+    import volunteer_history_extractor as extractor
+    from snapshot_diff import changed_months, diff_snapshots, find_snapshots, save_diff
+
+    data_preparation.setup_logging()
+    report_month = args.report_month or extractor.REPORT_MONTH
+    # Changes in closed months are the ones the incremental cache would not pick up on its own
+    cutoff = extractor.refresh_cutoff(report_month,
+                                      extractor.LOOKBACK_MONTHS if args.lookback_months is None else args.lookback_months)
+    if args.refetch:
+        if args.new:
+            logger.error("--refetch compares one extract (OLD, default: the newest) with the API")
+            return 1
+        snapshots = [Path(args.old)] if args.old else find_snapshots(count=1)
+        start_date, _ = extractor.report_window(report_month)
+        if not snapshots or cutoff <= start_date:
+            logger.error("Need a VolunteerHistory_* extract with closed months to compare with the API")
+            return 1
+        old_file = snapshots[0]
+        Path(args.output_dir).mkdir(exist_ok=True)
+        new_file = os.path.join(args.output_dir, extractor.output_name(start_date, cutoff)
+                                .replace("VolunteerHistory_", "Refetched_").replace(".xlsx", ".parquet"))
+        extractor.validate_config()
+        extractor.extract_window(start_date, cutoff, new_file)
+    elif args.old and args.new:
+        old_file, new_file = args.old, args.new
+    elif args.old or args.new:
+        logger.error("Pass both OLD and NEW snapshots, or neither to compare the two newest extracts")
+        return 1
+    else:
+        snapshots = find_snapshots()
+        if len(snapshots) < 2:
+            logger.error("Need two VolunteerHistory_* extracts to compare")
+            return 1
+        old_file, new_file = snapshots
+
+    logger.info(f"Comparing {old_file} -> {new_file}")
+    old, new = data_preparation.load_volunteer_data(old_file), data_preparation.load_volunteer_data(new_file)
+    if old is None or new is None:
+        return 1
+
+    diff = diff_snapshots(old, new)
+    save_diff(diff, args.output_dir)
+    for month in diff['months'].itertuples():
+        logger.info(f"  {month.month}: +{month.inserted} -{month.deleted} ~{month.modified} records, "
+                    f"hours {month.hoursOld:g} -> {month.hoursNew:g} ({month.hoursDelta:+g})")
+
+    # closed months the newer extract took from the month cache are whatever was cached earlier
+    unchecked = [month for month in extractor.cached_months(new_file) if month < f"{cutoff:%Y-%m}"]
+    if unchecked:
+        logger.warning(f"{new_file} took {', '.join(unchecked)} from the month cache, so edits made upstream "
+                       f"since they were cached cannot show up here; run diff --refetch to compare them with the API")
+    stale = changed_months(diff, before=cutoff)
+    if stale:
+        logger.warning(f"Closed months changed since the previous extract: {', '.join(stale)}")
+        if args.invalidate_cache:
+            cache_dir = extractor.scoped_cache_dir(args.cache_dir or extractor.CACHE_DIR)
+            extractor.invalidate_cached_months(cache_dir, stale)
+    return 0
+
+def run_serve(args) -> int:
+    import data_preparation
+    import volunteer_history_extractor as extractor
+    from pipeline_daemon import serve
+
+    data_preparation.setup_logging()
+    if args.rules and not check_rules(args.rules):
+        return 1
+    if args.requests_per_second is not None:
+        extractor.configure_rate_limit(args.requests_per_second)
+    serve(host=args.host, port=args.port, refresh_on_start=args.refresh_on_start, output_dir=args.output_dir,
+          interval=args.interval * 3600, jitter=args.jitter, rules_file=args.rules, keep_runs=args.keep_runs)
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="YMCA volunteer reporting pipeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser("validate", help="check the API config and report window without fetching")
+    validate.add_argument("--report-month", type=parse_month, help="YYYY-MM (default: the extractor's REPORT_MONTH)")
+    validate.add_argument("--tenants", help="also check a multi-tenant JSON config")
+    validate.add_argument("--rules", help="also check an adjustment rules file")
+    validate.set_defaults(func=run_validate)
+
+    # Unset extract options are not forwarded, so the extractor's own defaults apply
+    extract = commands.add_parser("extract", help="download volunteer history to Parquet",
+                                  argument_default=argparse.SUPPRESS)
+    extract.add_argument("--report-month", type=parse_month, help="YYYY-MM (default: the extractor's REPORT_MONTH)")
+    extract.add_argument("--concurrency", type=int, help="pages in flight")
+    extract.add_argument("--shard-by", choices=("month", "week"), help="page date-window shards in parallel")
+    extract.add_argument("--shard-concurrency", type=int, help="shards fetched in parallel")
+    extract.add_argument("--checkpoint-dir", help="shard checkpoint directory")
+    extract.add_argument("--incremental", action="store_true", help="serve closed months from the month cache")
+    extract.add_argument("--cache-dir", help="incremental month cache directory")
+    extract.add_argument("--lookback-months", type=int, help="months before the report month to refetch")
+    extract.add_argument("--excel", action="store_true", help="also export an Excel copy")
+    extract.add_argument("--profile-dir", help="cProfile each stage into this directory")
+    extract.add_argument("--no-run-report", dest="run_report", action="store_false", help="skip the JSON run report")
+    extract.add_argument("--http-cache", metavar="DIR", help="cache API responses on disk for reruns")
+    extract.add_argument("--http-cache-ttl", type=float, help="seconds a cached page is reused without revalidation")
+    extract.add_argument("--offline", action="store_true", help="replay cached responses only, never touch the network")
+    extract.add_argument("--requests-per-second", type=float, help="request rate limit per upstream (0: off; default 20)")
+    extract.add_argument("--tenants", help="batch mode: JSON list of tenant configs (full window per tenant, "
+                                           "no sharding, incremental cache or Excel copy)")
+    extract.add_argument("--output-dir", help="batch mode: per-tenant output directory")
+    extract.add_argument("--batch-concurrency", type=int, help="batch mode: page requests in flight overall")
+    extract.add_argument("--parallel-tenants", type=int, help="batch mode: tenants extracted at once")
+    extract.set_defaults(func=run_extract)
+
+    prepare = commands.add_parser("prepare", help="clean the latest extract and build the Raw Data, cube and summary")
+    prepare.add_argument("--excel", action="store_true", help="also export the Raw Data as Excel")
+    prepare.add_argument("--output-dir", default="processed_data")
+    prepare.add_argument("--profile-dir", help="cProfile each stage into this directory")
+    prepare.add_argument("--chunked", action="store_true", help="process out of core with bounded memory")
+    prepare.add_argument("--batch-size", type=int, default=65536, help="rows per batch in chunked mode")
+    prepare.add_argument("--rules", help="JSON adjustment / branch credit rules applied after the Raw Data is saved")
+    prepare.set_defaults(func=run_prepare)
+
+    report = commands.add_parser("report", help="rebuild the summary report from the latest Raw Data")
+    report.add_argument("--output-dir", default="processed_data")
+    report.add_argument("--rules", help="apply these adjustment rules to the Raw Data now, saved as "
+                                        "Readjusted_Data_*.parquet (default: the Adjusted Data saved by prepare, "
+                                        "if any)")
+    report.add_argument("--by", choices=("branch", "project"),
+                        help="one summary and export per branch / project instead of the overall summary")
+    report.add_argument("--workers", type=int, help="worker processes for --by (default: one per core, at most 8)")
+    report.add_argument("--formats", nargs="*", choices=("csv", "excel"), default=["csv", "excel"],
+                        help="exports written next to each --by summary")
+    report.set_defaults(func=run_report)
+
+    diff = commands.add_parser(
+        "diff", help="inserted / deleted / modified records between two extracts",
+        description="Compare two extracts, or with --refetch an extract's closed months with the API. Incremental "
+                    "extracts take closed months from the month cache, so only --refetch finds retroactive edits "
+                    "to them; --invalidate-cache then drops the changed months from the cache.")
+    diff.add_argument("old", nargs="?", help="older snapshot (default: second newest extract; "
+                                             "with --refetch: newest extract)")
+    diff.add_argument("new", nargs="?", help="newer snapshot (default: newest extract)")
+    diff.add_argument("--refetch", action="store_true",
+                      help="compare the closed months of OLD with a fresh download from the API, bypassing "
+                           "the month cache (incremental extracts never differ in closed months otherwise)")
+    diff.add_argument("--output-dir", default="processed_data")
+    diff.add_argument("--report-month", type=parse_month, help="YYYY-MM; months before its lookback are closed")
+    diff.add_argument("--lookback-months", type=int)
+    diff.add_argument("--invalidate-cache", action="store_true",
+                      help="drop changed closed months from the incremental cache so the next run refetches them")
+    diff.add_argument("--cache-dir", help="incremental month cache directory")
+    diff.set_defaults(func=run_diff)
+
+    serve = commands.add_parser("serve", help="keep running: refresh on a schedule and serve the latest aggregates")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8780)
+    serve.add_argument("--interval", type=float, default=6.0, help="hours between scheduled refreshes")
+    serve.add_argument("--jitter", type=float, default=0.1, help="random +/- fraction of the interval")
+    serve.add_argument("--output-dir", default="processed_data")
+    serve.add_argument("--rules", help="adjustment rules applied on every refresh (as in prepare)")
+    serve.add_argument("--requests-per-second", type=float, help="request rate limit per upstream (0: off; default 20)")
+    serve.add_argument("--keep-runs", type=int, default=3,
+                       help="timestamped Raw Data / Summary / Run Report files kept per kind in --output-dir")
+    serve.add_argument("--no-initial-refresh", dest="refresh_on_start", action="store_false",
+                       help="serve the data already on disk and wait for the first scheduled refresh")
+    serve.set_defaults(func=run_serve)
+
+    return parser
+
+def check_extract_options(parser: argparse.ArgumentParser, args) -> None:
+    """Reject extract options that do not apply to the chosen mode (single run or --tenants batch)"""
+    options = vars(args)
+    if "tenants" in options:
+        unsupported = [flag for key, flag in SINGLE_EXTRACT_OPTIONS.items() if key in options]
+        if unsupported:
+            parser.error(f"extract --tenants does not support {', '.join(unsupported)}")
+    else:
+        batch_only = [flag for key, flag in BATCH_EXTRACT_OPTIONS.items() if key in options]
+        if batch_only:
+            parser.error(f"extract {', '.join(batch_only)} needs --tenants")
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "extract":
+        check_extract_options(parser, args)
+    func = args.func
+    del args.func, args.command
+    return func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())